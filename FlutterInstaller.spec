@@ -1,12 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+# component_registry.py names its probes, version fetchers and install steps
+# as "module:function" strings and imports them on first use, which the
+# import analysis cannot follow
+component_modules = ['system_probes', 'version_catalogs', 'install_steps', 'install_profile']
 
 a = Analysis(
     ['flutter_installer_ui\\main.py'],
     pathex=[],
     binaries=[],
     datas=[('install_flutter_windows.ps1', '.')],
-    hiddenimports=[],
+    hiddenimports=component_modules,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -16,19 +20,35 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# Console entry point for unattended installs; it never imports tkinter
+cli = Analysis(
+    ['flutter_installer_ui\\cli.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=component_modules,
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['tkinter'],
+    noarchive=False,
+    optimize=0,
+)
+cli_pyz = PYZ(cli.pure)
+
+# One-dir build: the executable starts straight from its folder instead of
+# unpacking a one-file bundle to a temp directory on every launch. UPX is off
+# because decompressing every DLL at load time costs more than it saves.
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='FlutterInstaller',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +56,32 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+cli_exe = EXE(
+    cli_pyz,
+    cli.scripts,
+    [],
+    exclude_binaries=True,
+    name='FlutterInstallerCli',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    cli_exe,
+    cli.binaries,
+    cli.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='FlutterInstaller',
+)
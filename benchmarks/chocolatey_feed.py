@@ -0,0 +1,120 @@
+# Pages through a large synthetic Chocolatey feed served from a local HTTP
+# server, the way ChocolateyFeedClient.versions() reads the real one, and
+# compares it with reading each page whole and parsing it as one document.
+#
+#   python benchmarks/chocolatey_feed.py [pages] [entries per page] [Mbit/s]
+#
+# The optional bandwidth (0: unlimited) delays each response by its size
+# on the wire, which is where gzip pays off; on loopback alone the
+# incremental parse costs more CPU than parsing each page in one go.
+
+import gzip
+import http.server
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+from chocolatey_feed import ChocolateyFeedClient  # noqa: E402
+
+PAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+PER_PAGE = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+MBIT = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+# Roughly what the real feed sends per entry when the projection is ignored
+DESCRIPTION = "Git (for Windows) focuses on offering a lightweight, native set of Git SCM tools. " * 12
+
+
+def page(number, base):
+    entries = []
+    for index in range(PER_PAGE):
+        version = f"2.{PAGES * PER_PAGE - number * PER_PAGE - index}.0"
+        entries.append(
+            f"<entry><id>{base}/api/v2/Packages(Id='git',Version='{version}')</id><title type=\"text\">git</title>"
+            f"<summary type=\"text\">{DESCRIPTION}</summary>"
+            f"<content type=\"application/zip\" src=\"{base}/api/v2/package/git/{version}\" />"
+            f"<m:properties><d:Version>{version}</d:Version><d:Description>{DESCRIPTION}</d:Description>"
+            f"<d:DownloadCount m:type=\"Edm.Int32\">123456</d:DownloadCount></m:properties></entry>")
+    link = ""
+    if number + 1 < PAGES:
+        link = f"<link rel=\"next\" href=\"{base}/api/v2/FindPackagesById()?id='git'&amp;$skip={(number + 1) * PER_PAGE}\" />"
+    return ('<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom" '
+            'xmlns:d="http://schemas.microsoft.com/ado/2007/08/dataservices" '
+            'xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata">'
+            + "".join(entries) + link + "</feed>").encode()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body leave in one write, as from a real server; split
+    # writes on a kept-alive connection stall on delayed ACKs
+    wbufsize = -1
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        number = int(query.get("$skip", ["0"])[0]) // PER_PAGE
+        body = self.server.pages[number]
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = self.server.compressed[number]
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if MBIT:
+            time.sleep(len(body) * 8 / (MBIT * 1e6))
+        self.wfile.write(body)
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def whole_pages(base):
+    # Each page read in full and parsed as one document, without compression
+    versions = []
+    url = f"{base}/api/v2/FindPackagesById()?id='git'"
+    while url:
+        with urllib.request.urlopen(url) as response:
+            root = ET.fromstring(response.read())
+        versions.extend(e.text for e in root.iter("{http://schemas.microsoft.com/ado/2007/08/dataservices}Version"))
+        link = [l for l in root.iter("{http://www.w3.org/2005/Atom}link") if l.get("rel") == "next"]
+        url = link[0].get("href") if link else None
+    return versions
+
+
+def measure(name, function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    versions = function()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<34} {len(versions):>7} versions {elapsed:>7.2f} s  peak {peak / 1048576:>6.1f} MB")
+
+
+def main():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    base = f"http://127.0.0.1:{server.server_port}"
+    server.pages = [page(number, base) for number in range(PAGES)]
+    server.compressed = [gzip.compress(body) for body in server.pages]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    size = sum(len(body) for body in server.pages)
+    packed = sum(len(body) for body in server.compressed)
+    print(f"{PAGES} pages x {PER_PAGE} entries: {size / 1048576:.1f} MB of XML, {packed / 1048576:.1f} MB gzipped, "
+          f"{f'{MBIT:g} Mbit/s' if MBIT else 'unlimited bandwidth'}")
+
+    client = ChocolateyFeedClient(feed_url=base + "/api/v2/", max_pages=PAGES + 1)
+    measure("streamed, gzip, pooled connection", lambda: client.versions("git")[0])
+    client.close()
+    measure("whole pages, one connection each", lambda: whole_pages(base))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
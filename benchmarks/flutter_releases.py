@@ -0,0 +1,129 @@
+# Parses and sorts 10k `git ls-remote --tags` refs, the way the installer
+# used to build the Flutter version list, and with FlutterReleaseIndex:
+# once into an empty index and again into an index that already has them.
+#
+#   python benchmarks/flutter_releases.py [refs] [repeats]
+#
+# The refs are generated from a fixed seed and mix stable tags, pre-release
+# tags, peeled ^{} refs and unrelated tags in the proportions of the real
+# repository's tag list.
+
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+import flutter_releases  # noqa: E402
+from flutter_releases import FlutterReleaseIndex  # noqa: E402
+
+REFS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+REPEATS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def recorded_refs(count, seed=4):
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < count:
+        major, minor, patch = rng.randint(0, 3), rng.randint(0, 29), rng.randint(0, 12)
+        kind = rng.random()
+        if kind < 0.35:
+            tag = f"{major}.{minor}.{patch}"
+        elif kind < 0.45:
+            tag = f"v{major}.{minor}.{patch}+hotfix.{rng.randint(1, 9)}"
+        elif kind < 0.8:
+            tag = f"{major}.{minor}.{patch}-{rng.randint(0, 30)}.{rng.randint(0, 5)}.pre"
+        elif kind < 0.9:
+            tag = f"{major}.{minor}.{patch}-rc{rng.randint(1, 4)}"
+        else:
+            tag = f"engine-{rng.getrandbits(32):08x}"
+        sha = f"{rng.getrandbits(160):040x}"
+        lines.append(f"{sha}\trefs/tags/{tag}")
+        if rng.random() < 0.3:
+            lines.append(f"{sha}\trefs/tags/{tag}^{{}}")
+    return "\n".join(lines[:count]) + "\n"
+
+
+def old_versions(stdout):
+    # _get_flutter_versions before the release index, minus the subprocess
+    tags = stdout.strip().split("\n")
+    versions = []
+    for tag in tags:
+        tag_name = tag.split("refs/tags/")[-1]
+        tag_name = tag_name.replace("^{}", "")
+        if (tag_name in ["stable", "beta", "dev", "master"] or
+            (tag_name.count('.') >= 2 and
+             not tag_name.endswith('.0') and
+             not tag_name.startswith('v') and
+             not 'rc' in tag_name.lower() and
+             not 'preview' in tag_name.lower())):
+            versions.append(tag_name)
+    versions = list(set(versions))
+
+    def version_key(v):
+        if v in ["stable", "beta", "dev", "master"]:
+            return (0, v)
+        parts = []
+        for part in v.split('.'):
+            try:
+                parts.append(int(part))
+            except ValueError:
+                match = re.match(r'(\d+)', part)
+                if match:
+                    parts.append(int(match.group(1)))
+                else:
+                    parts.append(0)
+        return (1, tuple(parts))
+
+    versions.sort(key=version_key, reverse=True)
+    return versions
+
+
+def best_of(function):
+    best = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    stdout = recorded_refs(REFS)
+    # The index asks git for the filtered refs; the server-side pattern only drops the engine tags
+    filtered = "".join(line + "\n" for line in stdout.splitlines() if "refs/tags/engine-" not in line)
+    flutter_releases.subprocess.run = lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, filtered, "")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "flutter_releases.json")
+
+        def cold():
+            index = FlutterReleaseIndex(path=path, manifest_url=None)
+            index._refresh_from_git()
+            return index.versions()
+
+        def warm():
+            index._refresh_from_git()
+            return index.versions()
+
+        old_time, old = best_of(lambda: old_versions(stdout))
+        cold_time, new = best_of(cold)
+        index = FlutterReleaseIndex(path=path, manifest_url=None)
+        index._refresh_from_git()
+        warm_time, _ = best_of(warm)
+
+    print(f"{REFS} refs, best of {REPEATS}")
+    print(f"{'before: filter + sort with re.match per part':46} {old_time * 1000:7.1f} ms  {len(old):5} versions")
+    print(f"{'release index, empty':46} {cold_time * 1000:7.1f} ms  {len(new):5} versions")
+    print(f"{'release index, every ref already known':46} {warm_time * 1000:7.1f} ms  {len(new):5} versions")
+    dropped = sum(1 for tag in new if tag.endswith(".0") and not tag.startswith("v"))
+    print(f"x.y.0 releases the old filter dropped: {dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Compares a full `git clone -b <channel>` (what install_flutter_windows.ps1
+# does) with FlutterSdkFetcher's shallow release-tag fetch, blobless
+# channel fetch and mirror-seeded fetch, using a local bare repository as
+# the stand-in for github.com/flutter/flutter.
+#
+#   python benchmarks/flutter_sdk.py [commits] [files changed per commit]
+#
+# The remote is reached through a file:// URL, so git negotiates and sends a
+# pack as it would over HTTPS. Every byte the remote's upload-pack writes is
+# counted, including the lazy blob fetches a blobless checkout makes. The
+# generated history has the same shape as Flutter's: the working tree is a
+# small fraction of everything ever committed.
+
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+from flutter_sdk import FlutterSdkFetcher  # noqa: E402
+
+COMMITS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+CHANGED = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+FILES = 200
+FILE_SIZE = 16 * 1024
+TAG = "3.24.5"
+MIRRORED_TAG = "3.24.4"
+BEHIND = 5
+ENV = dict(os.environ, GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1",
+           GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+           GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+
+
+def git(*args, cwd=None, stdin=None):
+    subprocess.run(["git"] + list(args), cwd=cwd, input=stdin, env=ENV, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def add_commits(path, first, last, rng):
+    # One fast-import stream: commits first..last on "stable", each rewriting
+    # CHANGED files (all of them in the first) with incompressible content
+    stream = []
+    for number in range(first, last + 1):
+        stream.append(b"commit refs/heads/stable\n")
+        stream.append(f"committer bench <bench@example.com> {1600000000 + number * 3600} +0000\n".encode())
+        message = f"Change {number}\n".encode()
+        stream.append(f"data {len(message)}\n".encode() + message)
+        if number == first and first > 1:
+            stream.append(b"from refs/heads/stable^0\n")
+        changed = range(FILES) if number == 1 else rng.sample(range(FILES), CHANGED)
+        for index in changed:
+            content = rng.randbytes(FILE_SIZE)
+            stream.append(f"M 644 inline packages/flutter/lib/src/file_{index:03}.dart\n".encode())
+            stream.append(f"data {len(content)}\n".encode() + content + b"\n")
+    git("fast-import", "--quiet", cwd=path, stdin=b"".join(stream))
+    git("repack", "-a", "-d", "--quiet", cwd=path)
+
+
+def upload_pack(directory, name):
+    # An upload-pack that appends everything it sends to <name>.bytes
+    script = os.path.join(directory, f"{name}-upload-pack")
+    with open(script, "w") as f:
+        f.write(f'#!/bin/sh\ngit -c uploadpack.allowFilter=true upload-pack "$@" | tee -a "{script}.bytes"\n')
+    os.chmod(script, 0o755)
+    return script
+
+
+def sent(script):
+    try:
+        return os.path.getsize(script + ".bytes")
+    except OSError:
+        return 0
+
+
+class Context:
+    # The parts of an install StepContext FlutterSdkFetcher uses. Both remotes
+    # get a counting upload-pack, including for the fetches git starts itself
+    # during a blobless checkout.
+    def __init__(self, origin, mirror=None):
+        self.origin = origin
+        self.mirror = mirror
+
+    def log(self, line):
+        pass
+
+    def run(self, args, env=None):
+        args = list(args)
+        if "remote.mirror.uploadpack" in args:
+            args[-1] = self.mirror
+        code = subprocess.run(args, env=env or ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+        if code == 0 and args[-4:-1] == ["remote", "add", "origin"]:
+            # args: git -C <repository> remote add origin <url>
+            subprocess.run(args[:3] + ["config", "remote.origin.uploadpack", self.origin], env=env or ENV, check=True)
+        return code
+
+
+def measure(name, origin, mirror, function, *args):
+    started = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - started
+    return name, elapsed, sent(origin), sent(mirror) if mirror else 0
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        remote = os.path.join(directory, "flutter.git")
+        url = "file://" + remote.replace(os.sep, "/")
+        rng = random.Random(12)
+        git("init", "--quiet", "--bare", remote)
+        # Lets file:// clients make blobless fetches, as GitHub allows
+        git("config", "uploadpack.allowFilter", "true", cwd=remote)
+        add_commits(remote, 1, COMMITS - BEHIND, rng)
+        git("tag", MIRRORED_TAG, "stable", cwd=remote)
+        # A mirror on a share, last updated BEHIND commits ago
+        mirror = os.path.join(directory, "mirror.git")
+        git("clone", "--quiet", "--mirror", url, mirror)
+        add_commits(remote, COMMITS - BEHIND + 1, COMMITS, rng)
+        git("tag", TAG, "stable", cwd=remote)
+
+        rows = []
+        origin = upload_pack(directory, "origin-clone")
+        rows.append(measure("git clone -b stable (before)", origin, None, git,
+                            "clone", "--quiet", "-u", origin, "-b", "stable", url, os.path.join(directory, "clone")))
+        for name, version in ((f"release tag {TAG}, depth 1", TAG), ("stable channel, blobless", "stable")):
+            origin = upload_pack(directory, f"origin-{version}")
+            fetcher = FlutterSdkFetcher(Context(origin), repo_url=url, mirror="", env=ENV)
+            rows.append(measure(name, origin, None, fetcher.fetch_git, version, os.path.join(directory, version)))
+
+        for version in (MIRRORED_TAG, TAG, "stable"):
+            origin = upload_pack(directory, f"origin-mirrored-{version}")
+            from_mirror = upload_pack(directory, f"mirror-{version}")
+            fetcher = FlutterSdkFetcher(Context(origin, from_mirror), repo_url=url, mirror=mirror, env=ENV)
+            rows.append(measure(f"{version}, mirror {BEHIND} commits behind", origin, from_mirror,
+                                fetcher.fetch_git, version, os.path.join(directory, f"mirrored-{version}")))
+
+        packed = sum(os.path.getsize(os.path.join(root, name)) for root, _dirs, files in os.walk(remote)
+                     for name in files if name.endswith(".pack"))
+        print(f"remote: {COMMITS} commits, {FILES} files of {FILE_SIZE // 1024} KB, "
+              f"{packed / 1e6:.1f} MB packed, checkout {FILES * FILE_SIZE / 1e6:.1f} MB")
+        print(f"{'':38} {'from remote':>11} {'from mirror':>11} {'wall':>7}")
+        for name, elapsed, from_origin, from_mirror in rows:
+            print(f"{name:38} {from_origin / 1e6:8.1f} MB {from_mirror / 1e6:8.1f} MB {elapsed:6.2f} s")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Runs the default install plan through InstallOrchestrator with
+# simulated_executor and compares the wall time with running every step one
+# after another, as install_flutter_windows.ps1 does.
+#
+#   python benchmarks/install_orchestrator.py [clock scale]
+#
+# Step durations are rough timings of a fresh install on a 100 Mbit/s
+# connection, in seconds; the clock scale (default 0.002) shrinks them so a
+# run takes a few seconds. The critical path is the longest chain of
+# dependencies, the best any number of workers can do.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+from install_orchestrator import InstallOrchestrator, simulated_executor  # noqa: E402
+from install_steps import build_install_plan  # noqa: E402
+
+SCALE = float(sys.argv[1]) if len(sys.argv) > 1 else 0.002
+DURATIONS = {
+    "chocolatey": 40,
+    "git": 70,
+    "androidstudio": 420,
+    "openjdk": 90,
+    "flutter": 240,
+    "flutter-precache": 150,
+    "cmdline-tools": 30,
+    "sdk-packages": 200,
+    "environment": 3,
+    "flutter-doctor": 25,
+}
+
+
+def critical_path(steps):
+    finish = {}
+    for step in steps:
+        # Plan order is a topological order
+        start = max((finish[d] for d in step.depends_on + step.after if d in finish), default=0)
+        finish[step.step_id] = start + DURATIONS.get(step.step_id, 0)
+    return max(finish.values())
+
+
+def main():
+    steps = build_install_plan(sdk_root=os.path.join(os.sep, "sdk"))
+    serial = sum(DURATIONS.get(step.step_id, 0) for step in steps)
+    print(f"{len(steps)} steps, simulated at {SCALE:g} s per second of install time")
+    print(f"{'one step at a time (install script)':40} {serial:6.0f} s")
+    for workers in (1, 2, 3, 4):
+        orchestrator = InstallOrchestrator(steps, max_workers=workers, on_log=lambda step_id, line: None,
+                                           executor=simulated_executor(DURATIONS, clock_scale=SCALE))
+        started = time.perf_counter()
+        orchestrator.run()
+        elapsed = (time.perf_counter() - started) / SCALE
+        print(f"{f'orchestrator, max_workers={workers}':40} {elapsed:6.0f} s  {serial / elapsed:4.2f}x")
+    print(f"{'critical path':40} {critical_path(steps):6.0f} s  {serial / critical_path(steps):4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
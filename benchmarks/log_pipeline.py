@@ -0,0 +1,170 @@
+# Feeds 100k installer output lines from a reader thread to the log view,
+# once the way the installer used to (an after() callback per line for the
+# insert and one for the progress bar) and once through LogPipeline and
+# TextWidgetLog, and reports how many UI callbacks ran and how late a 10 ms
+# heartbeat on the UI thread fired.
+#
+#   python benchmarks/log_pipeline.py [lines]
+#
+# Headless: the event loop is a stand-in for Tk's (timers run in due order
+# on one thread, after() may be called from any thread) and the widget
+# keeps a list of lines. The numbers measure callback traffic and event
+# loop latency, not Tk's text layout, which only adds to the per-line cost.
+
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+from log_pipeline import LogPipeline, TextWidgetLog  # noqa: E402
+
+LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+HEARTBEAT_MS = 10
+LINE = "Progress: Downloading git.install 2.45.1... 42%\n"
+
+
+class EventLoop:
+    def __init__(self):
+        self._timers = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._ids = set()
+        self.callbacks = 0
+
+    def after(self, ms, callback, *args):
+        with self._lock:
+            after_id = next(self._order)
+            heapq.heappush(self._timers, (time.perf_counter() + ms / 1000, after_id, callback, args))
+            self._ids.add(after_id)
+        return after_id
+
+    def after_cancel(self, after_id):
+        with self._lock:
+            self._ids.discard(after_id)
+
+    def run(self, done):
+        while not done():
+            with self._lock:
+                due = self._timers and self._timers[0][0] <= time.perf_counter()
+                if due:
+                    _, after_id, callback, args = heapq.heappop(self._timers)
+                    due = after_id in self._ids
+                    self._ids.discard(after_id)
+            if due:
+                self.callbacks += 1
+                callback(*args)
+            elif not self._timers:
+                time.sleep(0.0005)
+            else:
+                time.sleep(max(0.0, min(self._timers[0][0] - time.perf_counter(), 0.0005)))
+
+
+class LinesText:
+    # The parts of a Tk Text widget the log view uses
+    def __init__(self, loop):
+        self.loop = loop
+        self.lines = [""]
+        self.inserts = 0
+
+    def after(self, ms, callback, *args):
+        return self.loop.after(ms, callback, *args)
+
+    def after_cancel(self, after_id):
+        self.loop.after_cancel(after_id)
+
+    def insert(self, index, text):
+        self.inserts += 1
+        parts = text.split("\n")
+        self.lines[-1] += parts[0]
+        self.lines.extend(parts[1:])
+
+    def index(self, index):
+        return f"{len(self.lines)}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+class Heartbeat:
+    # Reschedules itself every HEARTBEAT_MS and records how late each beat ran
+    def __init__(self, loop):
+        self.loop = loop
+        self.delays = []
+        self._schedule()
+
+    def _schedule(self):
+        self.due = time.perf_counter() + HEARTBEAT_MS / 1000
+        self.loop.after(HEARTBEAT_MS, self._beat)
+
+    def _beat(self):
+        self.delays.append(time.perf_counter() - self.due)
+        self._schedule()
+
+    def percentile(self, fraction):
+        delays = sorted(self.delays)
+        return delays[min(int(len(delays) * fraction), len(delays) - 1)] * 1000
+
+
+def per_line_callbacks():
+    loop = EventLoop()
+    widget = LinesText(loop)
+    heartbeat = Heartbeat(loop)
+    progress = [0]
+
+    def step():
+        progress[0] += 1
+
+    def reader():
+        for _ in range(LINES):
+            loop.after(0, widget.insert, "end", LINE)
+            loop.after(0, step)
+
+    started = time.perf_counter()
+    threading.Thread(target=reader, daemon=True).start()
+    loop.run(lambda: progress[0] >= LINES)
+    return time.perf_counter() - started, loop, widget, heartbeat
+
+
+def batched_pipeline():
+    loop = EventLoop()
+    widget = LinesText(loop)
+    heartbeat = Heartbeat(loop)
+    pipeline = LogPipeline()
+    progress = [0]
+
+    def on_batch(lines):
+        progress[0] += len(lines)
+
+    log = TextWidgetLog(widget, pipeline, interval_ms=50, max_lines=5000, on_batch=on_batch)
+    log.start()
+
+    def reader():
+        for _ in range(LINES):
+            pipeline.push(LINE)
+
+    started = time.perf_counter()
+    threading.Thread(target=reader, daemon=True).start()
+    loop.run(lambda: progress[0] >= LINES)
+    return time.perf_counter() - started, loop, widget, heartbeat
+
+
+def main():
+    print(f"{LINES} lines, {HEARTBEAT_MS} ms heartbeat on the UI thread")
+    print(f"{'':28} {'shown after':>11} {'callbacks':>10} {'inserts':>8} {'widget lines':>13} "
+          f"{'beat p50':>9} {'p99':>8} {'max':>8}")
+    for name, run in (("after() per line (before)", per_line_callbacks), ("LogPipeline, 50 ms batches", batched_pipeline)):
+        elapsed, loop, widget, heartbeat = run()
+        print(f"{name:28} {elapsed:9.2f} s {loop.callbacks:10} {widget.inserts:8} {len(widget.lines) - 1:13} "
+              f"{heartbeat.percentile(0.5):6.1f} ms {heartbeat.percentile(0.99):5.1f} ms "
+              f"{max(heartbeat.delays) * 1000:5.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Sorts 50k version strings with the key function main.py used before the
+# versions module, and with versions.sort_versions on a cold and a warm
+# parse cache; then finds the newest 17.x the old way (a scan of the sorted
+# list) and with VersionIndex.
+#
+#   python benchmarks/versions.py [count] [repeats]
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+import versions  # noqa: E402
+from versions import VersionIndex, sort_versions  # noqa: E402
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+REPEATS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def version_strings(count, seed=5):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        text = f"{rng.randint(8, 23)}.{rng.randint(0, 2)}.{rng.randint(0, 30)}"
+        kind = rng.random()
+        if kind < 0.1:
+            text += f".{rng.randint(1, 9)}"
+        elif kind < 0.3:
+            text += f"-{rng.choice(['alpha', 'beta', 'rc'])}.{rng.randint(1, 12)}"
+        elif kind < 0.35:
+            text += f"+build.{rng.randint(1, 99)}"
+        texts.append(text)
+    return texts
+
+
+def old_sort(texts):
+    # _sort_versions before the versions module
+    def version_key(v):
+        parts = []
+        for part in v.split('.'):
+            try:
+                parts.append(int(part))
+            except ValueError:
+                import re
+                match = re.match(r'(\d+)', part)
+                if match:
+                    parts.append(int(match.group(1)))
+                else:
+                    parts.append(0)
+        return tuple(parts)
+
+    return sorted(texts, key=version_key, reverse=True)
+
+
+def old_newest_17(ordered):
+    # _auto_configure's scan for the first 17.x in the newest-first list
+    latest_17 = "17"
+    for v in ordered:
+        if v.startswith("17."):
+            latest_17 = v
+            break
+    return latest_17
+
+
+def best_of(function, setup=None):
+    best = None
+    for _ in range(REPEATS):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    texts = version_strings(COUNT)
+    distinct = len(set(texts))
+    old_time, old = best_of(lambda: old_sort(texts))
+    cold_time, new = best_of(lambda: sort_versions(texts), setup=versions._parse.cache_clear)
+    warm_time, _ = best_of(lambda: sort_versions(texts))
+    index_time, index = best_of(lambda: VersionIndex(texts))
+    scan_time, scanned = best_of(lambda: old_newest_17(old))
+    lookup_time, found = best_of(lambda: index.newest((17,)))
+
+    print(f"{COUNT} version strings ({distinct} distinct), best of {REPEATS}")
+    print(f"{'before: split and re.match per part':40} {old_time * 1000:8.1f} ms")
+    print(f"{'sort_versions, empty parse cache':40} {cold_time * 1000:8.1f} ms")
+    print(f"{'sort_versions, every string parsed':40} {warm_time * 1000:8.1f} ms")
+    print(f"{'VersionIndex build':40} {index_time * 1000:8.1f} ms")
+    print(f"{'newest 17.x: scan (before)':40} {scan_time * 1e6:8.1f} us  {scanned}")
+    print(f"{'newest 17.x: VersionIndex.newest':40} {lookup_time * 1e6:8.1f} us  {found}")
+    # Newest first, so a pre-release directly above its own release is out of order
+    misordered = sum(1 for a, b in zip(old, old[1:]) if re.search(r"-(alpha|beta|rc)", a) and a.split("-")[0] == b)
+    print(f"pre-releases the old key sorted directly above their release: {misordered}")
+
+
+if __name__ == "__main__":
+    main()
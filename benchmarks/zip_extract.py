@@ -0,0 +1,118 @@
+# Extracts a synthetic 1 GiB NDK-style archive (one top-level folder, a mix
+# of compressible and incompressible members) the way the install script
+# did (Expand-Archive into a temporary folder, then move the contents into
+# place) and with zip_extract.extract_zip, and reports wall time and the
+# peak extra disk space used on the volume while extracting.
+#
+#   python benchmarks/zip_extract.py [MiB of member data] [workers ...]
+#
+# Disk use is sampled from the free space of the volume every 10 ms, so
+# other activity on it shows up as noise. Parallel inflation only pays off
+# with more than one core.
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+from zip_extract import extract_zip  # noqa: E402
+
+MIB = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+WORKERS = [int(n) for n in sys.argv[2:]] or [1, 4]
+TOP = "android-ndk-r27c"
+
+
+def make_archive(path, total):
+    # Member sizes from 4 KiB to 16 MiB; about half the data compresses well, like binaries and headers
+    rng = random.Random(15)
+    written = 0
+    index = 0
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        while written < total:
+            kib = rng.choice([4, 4, 16, 64, 64, 256, 1024, 16384])
+            size = min(int(kib * 1024 * rng.uniform(0.5, 1.0)), total - written)
+            if index % 2:
+                data = rng.randbytes(size)
+            else:
+                line = rng.randbytes(48).hex().encode() + b"\n"
+                data = (line * (size // len(line) + 1))[:size]
+            zf.writestr(f"{TOP}/toolchains/llvm/prebuilt/lib{index // 200}/file_{index:05}.so", data)
+            written += size
+            index += 1
+    return index
+
+
+def used(path):
+    usage = shutil.disk_usage(path)
+    return usage.total - usage.free
+
+
+class PeakDisk:
+    # Samples the volume's used space in a thread until stopped
+    def __init__(self, path):
+        self.path = path
+        self.base = used(path)
+        self.peak = self.base
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, used(self.path))
+            self._stop.wait(0.01)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, used(self.path))
+        return self.peak - self.base
+
+
+def script_flow(archive, destination, copy):
+    # Expand-Archive into latest.partial, Move-Item the wrapped folder into place, remove the rest.
+    # With copy, the temporary folder is on another volume, so the move copies every file.
+    staging = destination + ".partial"
+    with zipfile.ZipFile(archive) as zf:
+        zf.extractall(staging)
+    if copy:
+        shutil.copytree(os.path.join(staging, TOP), destination)
+    else:
+        os.replace(os.path.join(staging, TOP), destination)
+    shutil.rmtree(staging)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        archive = os.path.join(directory, "ndk.zip")
+        members = make_archive(archive, MIB * 1024 * 1024)
+        print(f"{members} members, {MIB} MiB of data, {os.path.getsize(archive) / 2**20:.0f} MiB zipped, "
+              f"{os.cpu_count()} CPU")
+        runs = [("Expand-Archive + Move-Item (before)", lambda d: script_flow(archive, d, copy=False)),
+                ("the same, TEMP on another volume", lambda d: script_flow(archive, d, copy=True))]
+        for workers in WORKERS:
+            runs.append((f"extract_zip, {workers} worker{'s' if workers > 1 else ''}",
+                         lambda d, w=workers: extract_zip(archive, d, strip_prefix="auto", workers=w)))
+        for name, run in runs:
+            destination = os.path.join(directory, "ndk", "27.2.12479018")
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            peak = PeakDisk(directory)
+            started = time.perf_counter()
+            run(destination)
+            elapsed = time.perf_counter() - started
+            extra = peak.stop()
+            print(f"{name:38} {elapsed:6.1f} s  peak extra disk {extra / 2**30:5.2f} GiB")
+            shutil.rmtree(os.path.join(directory, "ndk"))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
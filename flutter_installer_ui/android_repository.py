@@ -0,0 +1,188 @@
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+from app_paths import data_file, write_json_atomic
+from catalog_cache import DEFAULT_TTL, NotModified, open_url, response_validators
+from versions import sort_versions
+
+INDEX_FORMAT = 1
+REPOSITORY_URL = "https://dl.google.com/android/repository/repository2-3.xml"
+HOST_OS = "windows"
+
+
+def _local_name(tag):
+    return tag.rpartition("}")[2]
+
+
+def _revision_text(element):
+    # <revision><major>27</major><minor>0</minor><micro>12077973</micro><preview>1</preview></revision>
+    parts = {_local_name(child.tag): (child.text or "").strip() for child in element}
+    numbers = [parts[name] for name in ("major", "minor", "micro") if parts.get(name)]
+    text = ".".join(numbers)
+    if parts.get("preview"):
+        text += f"-rc{parts['preview']}"
+    return text
+
+
+def parse_repository(stream):
+    # Reads <remotePackage> entries one at a time and clears each once it is
+    # indexed, so memory stays flat however large the manifest is.
+    # Returns {package path: {"revision", "channel", "display_name", "obsolete", "archives"}}
+    channels = {}
+    packages = {}
+    root = None
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        name = _local_name(element.tag)
+        if name == "channel" and element.get("id"):
+            channels[element.get("id")] = (element.text or "").strip()
+        elif name == "remotePackage":
+            package = {"revision": None, "channel": None, "display_name": None,
+                       "obsolete": element.get("obsolete") == "true", "archives": []}
+            for child in element:
+                child_name = _local_name(child.tag)
+                if child_name == "revision":
+                    package["revision"] = _revision_text(child)
+                elif child_name == "display-name":
+                    package["display_name"] = (child.text or "").strip()
+                elif child_name == "channelRef":
+                    package["channel"] = child.get("ref")
+                elif child_name == "archives":
+                    package["archives"] = [_parse_archive(archive) for archive in child]
+            packages[element.get("path")] = package
+            root.clear()
+    for package in packages.values():
+        package["channel"] = channels.get(package["channel"], "stable")
+    return packages
+
+
+def _parse_archive(element):
+    archive = {"host_os": None, "host_arch": None}
+    for child in element:
+        name = _local_name(child.tag)
+        if name == "complete":
+            for part in child:
+                part_name = _local_name(part.tag)
+                if part_name == "url":
+                    archive["url"] = (part.text or "").strip()
+                elif part_name == "size":
+                    archive["size"] = int(part.text)
+                elif part_name == "checksum":
+                    # repository2-1 had untyped SHA-1 checksums
+                    archive["algorithm"] = part.get("type", "sha1")
+                    archive["checksum"] = (part.text or "").strip()
+        elif name == "host-os":
+            archive["host_os"] = (child.text or "").strip()
+        elif name == "host-arch":
+            archive["host_arch"] = (child.text or "").strip()
+    return archive
+
+
+class AndroidRepository:
+    # Index of Google's Android SDK repository manifest: package paths
+    # (ndk;27.0.12077973, cmdline-tools;latest, ...), their revisions and
+    # the download URL and checksum of each archive per host OS. It is kept
+    # on disk and refetched (conditionally) once it is older than the TTL.
+
+    def __init__(self, path=None, url=REPOSITORY_URL, ttl=None):
+        self.path = path or data_file("android_repository.json")
+        self.url = url
+        if ttl is None:
+            ttl = float(os.environ.get("FLUTTER_INSTALLER_CATALOG_TTL", DEFAULT_TTL))
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.validators = {}
+        self.fetched_at = 0
+        self.packages = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("format") != INDEX_FORMAT or data.get("url") != self.url:
+            return
+        self.validators = data.get("validators", {})
+        self.fetched_at = data.get("fetched_at", 0)
+        self.packages = data.get("packages", {})
+
+    def save(self):
+        with self._lock:
+            data = {
+                "format": INDEX_FORMAT,
+                "url": self.url,
+                "validators": self.validators,
+                "fetched_at": self.fetched_at,
+                "packages": self.packages,
+            }
+        write_json_atomic(self.path, data)
+
+    def is_fresh(self):
+        return bool(self.packages) and time.time() - self.fetched_at < self.ttl
+
+    def refresh(self, force=False):
+        # Returns True when the manifest was downloaded and parsed again
+        if not force and self.is_fresh():
+            return False
+        try:
+            response = open_url(self.url, self.validators)
+        except NotModified:
+            with self._lock:
+                self.fetched_at = time.time()
+            self.save()
+            return False
+        # The response is parsed as it arrives; the manifest is never held in memory whole
+        with response:
+            validators = response_validators(response.headers)
+            packages = parse_repository(response)
+        with self._lock:
+            self.packages = packages
+            self.validators = validators
+            self.fetched_at = time.time()
+        self.save()
+        return True
+
+    def ensure_loaded(self):
+        # Best effort for the installer: a stale index beats none
+        try:
+            self.refresh()
+        except (OSError, ValueError, ET.ParseError, urllib.error.URLError, http.client.HTTPException) as e:
+            print(f"Error refreshing the Android repository manifest: {e}")
+        return bool(self.packages)
+
+    def ndk_versions(self, include_previews=False):
+        # Side-by-side NDK versions, newest first
+        with self._lock:
+            versions = [
+                path[len("ndk;"):] for path, package in self.packages.items()
+                if path.startswith("ndk;") and not package["obsolete"]
+                and (include_previews or package["channel"] == "stable")
+            ]
+        return sort_versions(versions)
+
+    def latest_ndk(self):
+        versions = self.ndk_versions()
+        return versions[0] if versions else None
+
+    def archive(self, package_path, host_os=HOST_OS, host_arch="x64"):
+        # Returns {"url", "size", "checksum", "algorithm", ...} with an absolute URL, or None
+        with self._lock:
+            package = self.packages.get(package_path)
+        if not package:
+            return None
+        for archive in package["archives"]:
+            if archive["host_os"] not in (None, host_os) or archive["host_arch"] not in (None, host_arch):
+                continue
+            return dict(archive, url=urllib.parse.urljoin(self.url, archive["url"]), revision=package["revision"])
+        return None
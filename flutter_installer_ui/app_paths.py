@@ -0,0 +1,31 @@
+import json
+import os
+import tempfile
+
+
+def data_dir():
+    # Caches and state that should survive between runs live under the user profile.
+    # FLUTTER_INSTALLER_HOME lets fleet images point this at a shared or prepared location.
+    path = os.environ.get("FLUTTER_INSTALLER_HOME") or os.path.join(os.path.expanduser("~"), ".flutter_installer")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_file(name):
+    return os.path.join(data_dir(), name)
+
+
+def write_json_atomic(path, data):
+    # Write to a sibling temp file first so a crash never leaves a half-written file behind;
+    # mkstemp gives every writer its own temp file, so threads saving at once never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+
+import telemetry
+from app_paths import data_file, write_json_atomic
+from download_manager import DownloadError, downloads_dir, file_digest
+from progress_protocol import format_bytes
+
+# Downloaded archives kept by checksum, so each one is downloaded once.
+#
+# The local store lives in ~/.flutter_installer/artifacts and is capped in
+# size; the least recently used entries are evicted first. Read-only stores
+# listed in FLUTTER_INSTALLER_ARTIFACT_SHARES (a network share or a USB drive
+# holding a copy of another machine's artifacts folder) are checked first,
+# and used in place without copying once their size and digest check out.
+#
+# Layout: <store>/<algorithm>/<digest>/<file name>, plus index.json which
+# records sizes, last use and the URL each artifact was downloaded from
+# (for artifacts whose checksum we do not know in advance).
+
+INDEX_FORMAT = 1
+SHARES_ENV = "FLUTTER_INSTALLER_ARTIFACT_SHARES"
+SIZE_ENV = "FLUTTER_INSTALLER_ARTIFACT_CACHE_MB"
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024 * 1024
+
+
+def _load_index(root):
+    try:
+        with open(os.path.join(root, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = None
+    if not isinstance(index, dict) or index.get("format") != INDEX_FORMAT:
+        index = {"format": INDEX_FORMAT, "entries": {}, "urls": {}}
+    return index
+
+
+class ArtifactCache:
+    def __init__(self, root=None, max_bytes=None, shares=None):
+        self.root = root or data_file("artifacts")
+        if max_bytes is None:
+            megabytes = os.environ.get(SIZE_ENV)
+            max_bytes = int(megabytes) * 1024 * 1024 if megabytes else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+        if shares is None:
+            shares = [s for s in os.environ.get(SHARES_ENV, "").split(os.pathsep) if s]
+        self.shares = [(share, _load_index(share)) for share in shares if os.path.isdir(share)]
+        self.index = _load_index(self.root)
+        # Share roots whose files were already verified in full (a mounted offline
+        # bundle), and share files checked during this session
+        self._trusted = set()
+        self._verified = set()
+        # Last-use times changed by lookups; written with the next store() or flush()
+        self._touched = False
+        # Offline installs read from shares (an offline bundle) and never download
+        self.offline = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+    def _key(self, checksum, algorithm, url, index):
+        if checksum:
+            return f"{algorithm}:{checksum.lower()}"
+        return index["urls"].get(url) if url else None
+
+    def _entry_path(self, root, key, entry):
+        algorithm, _, digest = key.partition(":")
+        return os.path.join(root, algorithm, digest, entry["name"])
+
+    def _share_copy_ok(self, root, key, entry, path, log):
+        # A share is written by another machine, so its files are checked
+        # against the key they are stored under before they are used
+        if root in self._trusted or path in self._verified:
+            return True
+        algorithm, _, digest = key.partition(":")
+        try:
+            ok = os.path.getsize(path) == entry["size"] and file_digest(path, algorithm) == digest
+        except (OSError, ValueError):
+            ok = False
+        if not ok:
+            log(f"Ignoring {path}: its size or {algorithm} does not match")
+            return False
+        with self._lock:
+            self._verified.add(path)
+        return True
+
+    def lookup(self, checksum=None, algorithm="sha256", url=None, log=print):
+        # Returns the path of a cached copy, or None
+        for root, index in self.shares:
+            key = self._key(checksum, algorithm, url, index)
+            entry = index["entries"].get(key) if key else None
+            if entry:
+                path = self._entry_path(root, key, entry)
+                if os.path.isfile(path) and self._share_copy_ok(root, key, entry, path, log):
+                    return path
+        with self._lock:
+            key = self._key(checksum, algorithm, url, self.index)
+            entry = self.index["entries"].get(key) if key else None
+            if not entry:
+                return None
+            path = self._entry_path(self.root, key, entry)
+            if not os.path.isfile(path):
+                del self.index["entries"][key]
+                return None
+            entry["last_used"] = time.time()
+            self._touched = True
+            return path
+
+    def fetch(self, url, checksum=None, algorithm="sha256", download=None, log=print, name=None):
+        # Returns a path to read the artifact from. On a miss, download(url, path)
+        # fetches it and the result is moved into the store. name is the file
+        # name to keep it under, for URLs that do not end in one.
+        path = self.lookup(checksum, algorithm, url, log)
+        name = name or url.rsplit("/", 1)[-1]
+        if path:
+            size = os.path.getsize(path)
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += size
+            log(f"Using cached {name} ({format_bytes(size)}): {path}")
+            telemetry.record("cache", name, time.time(), 0.0, "hit", bytes=size)
+            return path
+
+        if self.offline:
+            raise DownloadError(f"{name} is not in the offline bundle and downloads are disabled")
+        with self._lock:
+            self.misses += 1
+        download_path = os.path.join(downloads_dir(), name)
+        download(url, download_path)
+        size = os.path.getsize(download_path)
+        with self._lock:
+            self.bytes_downloaded += size
+        return self.store(download_path, checksum, algorithm, url)
+
+    def add_share(self, root, verified=False):
+        # verified: every file in the share has just been checked against its digest
+        self.shares.insert(0, (root, _load_index(root)))
+        if verified:
+            self._trusted.add(root)
+
+    def store(self, path, checksum=None, algorithm="sha256", url=None):
+        # Moves a downloaded file into the store and returns its new path
+        if not checksum:
+            algorithm = "sha256"
+            checksum = file_digest(path, algorithm)
+        key = f"{algorithm}:{checksum.lower()}"
+        entry = {"name": os.path.basename(path), "size": os.path.getsize(path), "last_used": time.time()}
+        target = self._entry_path(self.root, key, entry)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        with self._lock:
+            self.index["entries"][key] = entry
+            if url:
+                self.index["urls"][url] = key
+            self._evict(keep=key)
+            self._save()
+        return target
+
+    def _evict(self, keep):
+        entries = self.index["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = entries.pop(key)
+            total -= entry["size"]
+            path = self._entry_path(self.root, key, entry)
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+            self.index["urls"] = {url: k for url, k in self.index["urls"].items() if k != key}
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        write_json_atomic(os.path.join(self.root, "index.json"), self.index)
+        self._touched = False
+
+    def flush(self):
+        # Writes the last-use times lookups have changed since the last save
+        with self._lock:
+            if self._touched:
+                self._save()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.bytes_saved = self.bytes_downloaded = 0
+
+    def summary(self):
+        requests = self.hits + self.misses
+        if not requests:
+            return "Artifact cache: not used"
+        return (f"Artifact cache: {self.hits} of {requests} artifacts reused ({self.hits * 100 // requests}% hit rate), "
+                f"{format_bytes(self.bytes_saved)} not downloaded, {format_bytes(self.bytes_downloaded)} downloaded")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def artifact_cache():
+    # Shared by every install step so the summary covers the whole run
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ArtifactCache()
+        return _cache
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+
+from app_paths import data_file, write_json_atomic
+
+CACHE_FORMAT = 1
+DEFAULT_TTL = 12 * 60 * 60
+
+
+class NotModified(Exception):
+    pass
+
+
+class CatalogCache:
+    # On-disk cache of version catalogs keyed by source ("flutter", "git",
+    # "openjdk", "androidstudio", "ndk"). Entries older than the TTL are still
+    # served (stale-while-revalidate) but flagged so the caller refreshes them.
+
+    def __init__(self, path=None, ttl=None):
+        self.path = path or data_file("catalog_cache.json")
+        if ttl is None:
+            ttl = float(os.environ.get("FLUTTER_INSTALLER_CATALOG_TTL", DEFAULT_TTL))
+        self.ttl = ttl
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "revalidated": 0, "stored": 0}
+        self._lock = threading.Lock()
+        # Held from snapshot to rename, so an older snapshot never lands after a newer one
+        self._save_lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Silently drop caches written by an incompatible version of the installer
+        if not isinstance(data, dict) or data.get("format") != CACHE_FORMAT:
+            return {}
+        return data.get("sources", {})
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                data = {"format": CACHE_FORMAT, "sources": dict(self._entries)}
+            try:
+                write_json_atomic(self.path, data)
+            except OSError as e:
+                print(f"Error saving catalog cache: {e}")
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+            elif self.is_fresh(entry):
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale"] += 1
+            return dict(entry) if entry else None
+
+    def store(self, key, versions, validators=None):
+        entry = {"fetched_at": time.time(), "versions": list(versions)}
+        entry.update(validators or {})
+        with self._lock:
+            self._entries[key] = entry
+            self.stats["stored"] += 1
+        self.save()
+
+    def revalidated(self, key):
+        # The server answered 304 Not Modified: the cached list is good for another TTL
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]["fetched_at"] = time.time()
+            self.stats["revalidated"] += 1
+        self.save()
+
+    def summary(self):
+        return ", ".join(f"{name}={count}" for name, count in self.stats.items())
+
+
+def validators_from(entry):
+    if not entry:
+        return {}
+    return {name: entry[name] for name in ("etag", "last_modified") if entry.get(name)}
+
+
+def conditional_headers(validators=None):
+    # Headers that let the server answer 304 when our cached copy is current
+    headers = {}
+    validators = validators or {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(headers):
+    validators = {}
+    if headers.get("ETag"):
+        validators["etag"] = headers.get("ETag")
+    if headers.get("Last-Modified"):
+        validators["last_modified"] = headers.get("Last-Modified")
+    return validators
+
+
+def open_url(url, validators=None, timeout=30):
+    # The response, for callers that stream the body; raises NotModified.
+    # urllib is imported here so that it stays off the startup path.
+    import urllib.error
+    import urllib.request
+    request = urllib.request.Request(url, headers=conditional_headers(validators))
+    try:
+        return urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            raise NotModified(url)
+        raise
+
+
+def fetch_url(url, validators=None, timeout=30):
+    # Returns (body, validators) or raises NotModified
+    with open_url(url, validators, timeout) as response:
+        return response.read(), response_validators(response.headers)
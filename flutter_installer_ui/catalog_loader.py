@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+
+import telemetry
+from catalog_cache import NotModified, validators_from
+
+
+class VersionCatalogLoader:
+    # Runs every version lookup (git ls-remote, Chocolatey feeds, sdkmanager)
+    # in parallel so the window can be shown before any of them has finished.
+    # Results are handed to `on_result(key, versions)` from a background
+    # thread; the UI is responsible for marshalling them onto the Tk thread.
+    #
+    # With a CatalogCache, cached lists are delivered immediately and stale
+    # ones are refreshed in the background, so `on_result` may be called a
+    # second time for the same key when newer data arrives.
+
+    def __init__(self, sources, timeout=20, timeouts=None, cache=None):
+        # sources: {key: (fetch_function, fallback_versions)}
+        # fetch_function(validators) returns a version list, or a
+        # (versions, validators) tuple for HTTP sources that support revalidation.
+        # timeouts: optional {key: seconds} overriding the default timeout
+        self.sources = dict(sources)
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.cache = cache
+        self.results = {}
+        self.durations = {}
+
+    def start(self, on_result, on_complete=None):
+        thread = threading.Thread(target=self.run, args=(on_result, on_complete), daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, on_result, on_complete=None):
+        # on_complete is called even if a lookup blew up, so the caller can
+        # always finish whatever it started for this load
+        try:
+            self._run(on_result)
+        finally:
+            if on_complete:
+                on_complete(self.results)
+        return self.results
+
+    def _run(self, on_result):
+        # One daemon thread per source: a hung `git ls-remote` or sdkmanager
+        # must neither delay the other sources nor keep the app alive on exit.
+        finished = queue.Queue()
+        started = time.monotonic()
+        deadlines = {}
+        pending = set()
+        for key, (fetch, _fallback) in self.sources.items():
+            entry = self.cache.lookup(key) if self.cache else None
+            if entry:
+                self._deliver(key, entry["versions"], on_result)
+                if self.cache.is_fresh(entry):
+                    continue
+
+            deadlines[key] = started + self.timeouts.get(key, self.timeout)
+            pending.add(key)
+            threading.Thread(target=self._fetch, args=(key, fetch, validators_from(entry), finished), daemon=True).start()
+
+        while pending:
+            remaining = min(deadlines[key] for key in pending) - time.monotonic()
+            try:
+                key, result = finished.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                key, result = None, None
+            if key in pending:
+                pending.discard(key)
+                self._handle_result(key, result, on_result)
+
+            # Give up on sources that exceeded their own timeout
+            now = time.monotonic()
+            for key in [k for k in pending if deadlines[k] <= now]:
+                pending.discard(key)
+                print(f"Timed out loading {key} versions after {self.timeouts.get(key, self.timeout)}s")
+                self._handle_result(key, None, on_result)
+
+        if self.cache:
+            print(f"Catalog cache: {self.cache.summary()}")
+
+    def _fetch(self, key, fetch, validators, finished):
+        started = time.monotonic()
+        with telemetry.span("catalog", key) as span:
+            try:
+                result = fetch(validators)
+            except NotModified as e:
+                result = e
+                span["status"] = "not-modified"
+            except Exception as e:
+                print(f"Error loading {key} versions: {e}")
+                result = None
+                span["status"] = "error"
+        self.durations[key] = time.monotonic() - started
+        finished.put((key, result))
+
+    def _handle_result(self, key, result, on_result):
+        if isinstance(result, NotModified):
+            self.cache.revalidated(key)
+            return
+
+        validators = None
+        if isinstance(result, tuple):
+            result, validators = result
+
+        if result:
+            if self.cache:
+                self.cache.store(key, result, validators)
+            self._deliver(key, result, on_result)
+        elif key not in self.results:
+            # Keep serving a stale cached list rather than replacing it with the fallback
+            self._deliver(key, None, on_result)
+
+    def _deliver(self, key, versions, on_result):
+        if not versions:
+            versions = list(self.sources[key][1])
+        self.results[key] = versions
+        on_result(key, versions)
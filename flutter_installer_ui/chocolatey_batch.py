@@ -0,0 +1,255 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+from app_paths import data_file
+from artifact_cache import artifact_cache
+from chocolatey_feed import ChocolateyFeedClient, ChocolateyFeedError, resolve_dependencies
+from download_manager import ChunkedDownloader, DownloadError
+from install_orchestrator import FAILED, OK, SKIPPED
+from tool_detection import chocolatey_package_version
+from versions import satisfies
+
+# Every Chocolatey package of an install in one transaction. Separate
+# `choco install` runs each pay for Chocolatey's startup, a source query and
+# dependency resolution; here the packages (with their dependencies) are
+# resolved against the feed once, their nupkgs are downloaded in parallel
+# into a local folder, and a single `choco install packages.config` installs
+# them all from it with pinned versions.
+#
+# Chocolatey installs the packages in the order they are listed and reports
+# each one as it finishes, so every package's install step completes as soon
+# as its own package does: the Flutter clone can start once Git is in while
+# Android Studio is still being installed.
+
+# Chocolatey's per-package results
+RESULT_LINE = re.compile(r"^The (?:install|upgrade) of ([\w.\-]+) was (NOT )?successful", re.I)
+ALREADY_INSTALLED_LINE = re.compile(r"^([\w.\-]+) v\S+ already installed", re.I)
+NOT_FOUND_LINE = re.compile(r"^([\w.\-]+) not installed\. The package was not found", re.I)
+PREFETCH_WORKERS = 4
+
+
+def packages_dir():
+    # A local package folder; Chocolatey reads <id>.<version>.nupkg files from it
+    path = data_file("chocolatey-packages")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_packages_config(path, packages, source=None):
+    # packages: [(package id, version or None)], in install order
+    root = ET.Element("packages")
+    for package_id, version in packages:
+        element = ET.SubElement(root, "package", id=package_id)
+        if version:
+            element.set("version", version)
+        if source:
+            element.set("source", source)
+    if hasattr(ET, "indent"):
+        ET.indent(root)
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+    return path
+
+
+def link_or_copy(source, target):
+    # Chocolatey wants every nupkg in one folder; a hard link costs no space
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class ChocolateyBatch:
+    # Shared by the install steps of the packages it lists. The first step
+    # to run starts the transaction on a background thread; each step then
+    # waits for its own package, and Chocolatey's output is routed to the log
+    # of the step whose package is being installed.
+
+    def __init__(self, packages, source=None, feed=None, prefetch=True):
+        # packages: [(package id, version or "latest")] in install order.
+        # source: ;-separated package folders (an offline bundle); nothing is
+        # prefetched then.
+        self.packages = [(package_id, version) for package_id, version in packages]
+        self.source = source
+        self.feed = feed
+        self.prefetch = prefetch and not source
+        self.results = {}
+        self.durations = {}
+        self.reboot_required = False
+        self._lock = threading.Lock()
+        self._started = False
+        self._done = {package_id: threading.Event() for package_id, _ in self.packages}
+        self._contexts = {}
+        self._buffered = {package_id: [] for package_id, _ in self.packages}
+        self._installing = []
+
+    def start(self, choco, env, cache_location):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, args=(choco, env, cache_location),
+                         name="chocolatey-batch", daemon=True).start()
+
+    def wait(self, package_id, context):
+        # Blocks until package_id is installed; returns OK, SKIPPED or FAILED
+        with self._lock:
+            for line in self._buffered[package_id]:
+                context.log(line)
+            self._buffered[package_id] = []
+            self._contexts[package_id] = context
+        self._done[package_id].wait()
+        with self._lock:
+            del self._contexts[package_id]
+        return self.results[package_id]
+
+    def _log(self, package_id, line):
+        with self._lock:
+            context = self._contexts.get(package_id)
+            if context:
+                context.log(line)
+            else:
+                self._buffered[package_id].append(line)
+
+    def _current(self):
+        # The package Chocolatey is working on: the first unfinished one in
+        # config order, or the last one for the closing summary
+        for package_id in self._installing:
+            if package_id not in self.results:
+                return package_id
+        return self._installing[-1] if self._installing else self.packages[0][0]
+
+    def _finish(self, package_id, status, release=True):
+        if package_id not in self.results:
+            self.results[package_id] = status
+        if release:
+            self._done[package_id].set()
+
+    def _run(self, choco, env, cache_location):
+        try:
+            self._install(choco, env, cache_location)
+        except Exception:
+            self._log(self._current(), traceback.format_exc())
+        finally:
+            for package_id, _ in self.packages:
+                self._finish(package_id, FAILED)
+
+    def _install(self, choco, env, cache_location):
+        pending = []
+        for package_id, version in self.packages:
+            installed = chocolatey_package_version(package_id)
+            if installed and (version in (None, "", "latest") or satisfies(installed, version)):
+                self._log(package_id, f"{package_id} {installed} is already installed.")
+                self.durations[package_id] = 0.0
+                self._finish(package_id, SKIPPED)
+            else:
+                pending.append((package_id, None if version in (None, "", "latest") else version))
+        if not pending:
+            return
+        self._installing = [package_id for package_id, _ in pending]
+
+        source = self.source
+        if self.prefetch:
+            prefetched = self._prefetch(pending)
+            if prefetched:
+                pending, source = prefetched
+        config = write_packages_config(data_file("packages.config"), pending, source)
+
+        # Installers downloaded by packages are kept between runs; Chocolatey
+        # reuses a file there when its checksum still matches
+        args = [choco, "install", config, "-y", "--no-progress", f"--cache-location={cache_location}"]
+        self._log(self._current(), f"> {subprocess.list2cmdline(args)}")
+        started = mark = time.monotonic()
+        mark_time = time.time()
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=env,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+        for line in iter(process.stdout.readline, ''):
+            self._log(self._current(), line)
+            status = self._parse(line.strip())
+            if status is None:
+                continue
+            package_id, status = status
+            if package_id in self._installing and package_id not in self.results:
+                now = time.monotonic()
+                self.durations[package_id] = now - mark
+                telemetry.record("chocolatey", package_id, mark_time, now - mark, status, step=package_id)
+                mark = now
+                mark_time = time.time()
+                self._log(package_id, f"{package_id}: {status} after {self.durations[package_id]:.1f}s")
+                # The last package's step also collects Chocolatey's summary
+                self._finish(package_id, status, release=package_id != self._installing[-1])
+        process.stdout.close()
+        code = process.wait()
+        # 3010: installed, reboot required
+        self.reboot_required = code == 3010
+        for package_id in self._installing:
+            self._finish(package_id, OK if code in (0, 3010) else FAILED, release=False)
+        timings = ", ".join(f"{package_id} {self.durations.get(package_id, 0.0):.1f}s" for package_id in self._installing)
+        self._log(self._installing[-1], f"Chocolatey installed {len(self._installing)} packages in one run "
+                                        f"({time.monotonic() - started:.1f}s): {timings}")
+
+    def _parse(self, line):
+        # (package id, status) when the line reports a package's result
+        match = RESULT_LINE.match(line)
+        if match:
+            return match.group(1).lower(), FAILED if match.group(2) else OK
+        match = ALREADY_INSTALLED_LINE.match(line)
+        if match:
+            return match.group(1).lower(), OK
+        match = NOT_FOUND_LINE.match(line)
+        if match:
+            return match.group(1).lower(), FAILED
+        return None
+
+    def _prefetch(self, pending):
+        # Resolves the packages and their dependencies against the feed and
+        # downloads every nupkg at once into packages_dir(). Returns the
+        # packages with their versions pinned and the folder to install from,
+        # or None to let Chocolatey use its own sources.
+        def log(line):
+            self._log(self._current(), line)
+
+        started = time.monotonic()
+        feed = self.feed or ChocolateyFeedClient()
+        folder = packages_dir()
+        try:
+            packages = resolve_dependencies(feed, pending)
+        except (OSError, ValueError, ET.ParseError, ChocolateyFeedError) as e:
+            log(f"Cannot resolve the Chocolatey packages ({e}); installing from the configured sources")
+            return None
+        missing = [p for p in packages if not os.path.isfile(os.path.join(folder, f"{p['id'].lower()}.{p['version']}.nupkg"))]
+
+        def download(url, path):
+            ChunkedDownloader().download(url, path, log=log)
+
+        def fetch(package):
+            # Through the artifact cache, so a share or an earlier run's copy is reused
+            name = f"{package['id'].lower()}.{package['version']}.nupkg"
+            cached = artifact_cache().fetch(package["url"], download=download, log=log, name=name)
+            link_or_copy(cached, os.path.join(folder, name))
+            return os.path.getsize(cached)
+
+        try:
+            with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="nupkg") as pool:
+                fetched = sum(pool.map(fetch, missing))
+        except (OSError, DownloadError) as e:
+            log(f"Cannot download the Chocolatey packages ({e}); installing from the configured sources")
+            return None
+        log(f"Prefetched {len(missing)} of {len(packages)} Chocolatey packages ({fetched / 1048576.0:.1f} MB) "
+            f"in {time.monotonic() - started:.1f}s")
+        versions = {package["id"].lower(): package["version"] for package in packages}
+        return [(package_id, versions.get(package_id, version)) for package_id, version in pending], folder
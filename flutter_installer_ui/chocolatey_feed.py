@@ -0,0 +1,255 @@
+import collections
+import gzip
+import http.client
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+from catalog_cache import NotModified, conditional_headers, response_validators
+
+FEED_URL = "https://community.chocolatey.org/api/v2/"
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+DATASERVICES = "{http://schemas.microsoft.com/ado/2007/08/dataservices}"
+
+
+class ChocolateyFeedError(Exception):
+    pass
+
+
+class ConnectionPool:
+    # Keep-alive HTTP(S) connections shared by every package lookup, so paging
+    # through a feed (and querying several packages) reuses the TLS session.
+
+    def __init__(self, timeout=30, max_idle=4):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme, netloc):
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        return self.connect(scheme, netloc)
+
+    def connect(self, scheme, netloc):
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def release(self, scheme, netloc, connection):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            connections = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+
+class ChocolateyFeedClient:
+    # Reads package versions from the Chocolatey OData (Atom) feed. Only the
+    # Version column is requested, responses may be gzip-compressed, and each
+    # page is parsed incrementally while following <link rel="next"> until
+    # the full history has been read.
+
+    def __init__(self, feed_url=FEED_URL, timeout=30, max_pages=100):
+        self.feed_url = feed_url
+        self.max_pages = max_pages
+        self.pool = ConnectionPool(timeout=timeout)
+
+    def package_url(self, package_id):
+        query = urllib.parse.urlencode({"id": f"'{package_id}'", "$select": "Version"}, safe="'$")
+        return urllib.parse.urljoin(self.feed_url, f"FindPackagesById()?{query}")
+
+    def versions(self, package_id, validators=None):
+        # Returns (versions, validators) or raises NotModified when the first
+        # page is unchanged since `validators` were recorded.
+        url = self.package_url(package_id)
+        versions = []
+        first_page_validators = {}
+        pages = 0
+        while url and pages < self.max_pages:
+            headers = {"Accept-Encoding": "gzip"}
+            if pages == 0:
+                headers.update(conditional_headers(validators))
+
+            page_versions, url, page_validators = self._read_page(url, headers, parse_feed)
+            if url:
+                # Some feeds drop the projection from their next links
+                url = with_query(url, "$select", "Version")
+            if pages == 0:
+                first_page_validators = page_validators
+            versions.extend(page_versions)
+            pages += 1
+
+        if url:
+            print(f"Chocolatey feed for {package_id} truncated after {pages} pages")
+        return versions, first_page_validators
+
+    def package(self, package_id, version=None):
+        # Returns {"id", "version", "url", "dependencies"} for one release (the
+        # latest when version is None); dependencies are (id, version range) pairs
+        if version:
+            query = urllib.parse.urlencode({"id": f"'{package_id}'", "$filter": f"Version eq '{version}'"}, safe="'$")
+        else:
+            query = urllib.parse.urlencode({"id": f"'{package_id}'", "$filter": "IsLatestVersion"}, safe="'$")
+        url = urllib.parse.urljoin(self.feed_url, f"FindPackagesById()?{query}")
+        packages, _next_url, _validators = self._read_page(url, {"Accept-Encoding": "gzip"}, parse_packages)
+        for package in packages:
+            if package["id"].lower() == package_id.lower():
+                return package
+        raise ChocolateyFeedError(f"{package_id} {version or 'latest'} is not in {self.feed_url}")
+
+    def _read_page(self, url, headers, parse, redirects=5):
+        parts = urllib.parse.urlsplit(url)
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        connection = self.pool.acquire(parts.scheme, parts.netloc)
+        try:
+            connection.request("GET", target, headers=headers)
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException):
+            # A pooled connection may have been closed by the server; retry once on a fresh one
+            connection.close()
+            connection = self.pool.connect(parts.scheme, parts.netloc)
+            try:
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+            except BaseException:
+                connection.close()
+                raise
+
+        reusable = False
+        try:
+            if response.status in (301, 302, 303, 307, 308) and redirects:
+                response.read()
+                reusable = not response.will_close
+                location = urllib.parse.urljoin(url, response.getheader("Location"))
+                return self._read_page(location, headers, parse, redirects - 1)
+            if response.status == 304:
+                response.read()
+                reusable = not response.will_close
+                raise NotModified(url)
+            if response.status != 200:
+                raise ChocolateyFeedError(f"{url} returned HTTP {response.status} {response.reason}")
+
+            stream = response
+            if (response.getheader("Content-Encoding") or "").lower() == "gzip":
+                stream = gzip.GzipFile(fileobj=response)
+            items, next_url = parse(stream)
+            # Drain anything the parser left behind so the connection can be reused
+            response.read()
+            reusable = not response.will_close
+            return items, next_url, response_validators(response.headers)
+        finally:
+            if reusable:
+                self.pool.release(parts.scheme, parts.netloc, connection)
+            else:
+                connection.close()
+
+    def close(self):
+        self.pool.close()
+
+
+def with_query(url, name, value):
+    # url with the query parameter `name` added, or replaced if it is already there
+    parts = urllib.parse.urlsplit(url)
+    query = [(key, item) for key, item in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if key != name]
+    query.append((name, value))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query, safe="'$(),")))
+
+
+def parse_feed(stream):
+    # Stream the Atom document, keeping only version strings and the next-page
+    # link; finished <entry> elements are dropped so memory stays flat.
+    versions = []
+    next_url = None
+    root = None
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag == DATASERVICES + "Version":
+            if element.text:
+                versions.append(element.text.strip())
+        elif element.tag == ATOM + "entry":
+            root.clear()
+        elif element.tag == ATOM + "link" and element.get("rel") == "next":
+            next_url = element.get("href")
+    return versions, next_url
+
+
+def parse_dependencies(text):
+    # "chocolatey-core.extension:1.3.3|git.install:[2.45.1]" -> [(id, range), ...]
+    dependencies = []
+    for item in (text or "").split("|"):
+        package_id, _, version_range = item.strip().partition(":")
+        if package_id:
+            # Framework-specific entries carry a third ":framework" part
+            dependencies.append((package_id, version_range.split(":")[0]))
+    return dependencies
+
+
+def parse_packages(stream):
+    # Full entries: id, version, download URL and dependencies
+    packages = []
+    next_url = None
+    root = None
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag == ATOM + "entry":
+            package = {"id": None, "version": None, "url": None, "dependencies": []}
+            for child in element.iter():
+                if child.tag == ATOM + "title" and child.text:
+                    package["id"] = child.text.strip()
+                elif child.tag == ATOM + "content":
+                    package["url"] = child.get("src")
+                elif child.tag == DATASERVICES + "Version" and child.text:
+                    package["version"] = child.text.strip()
+                elif child.tag == DATASERVICES + "Dependencies":
+                    package["dependencies"] = parse_dependencies(child.text)
+            packages.append(package)
+            root.clear()
+        elif element.tag == ATOM + "link" and element.get("rel") == "next":
+            next_url = element.get("href")
+    return packages, next_url
+
+
+def exact_version(version_range):
+    # "[2.45.1]" pins a dependency; anything else is a minimum the latest release satisfies
+    if version_range.startswith("[") and version_range.endswith("]") and "," not in version_range:
+        return version_range[1:-1]
+    return None
+
+
+def resolve_dependencies(feed, packages, local=None):
+    # Walks (package id, version) pairs and their dependencies breadth first
+    # and returns each package entry once, in that order. local maps
+    # lower-cased ids to packages (e.g. internalized nupkgs) that replace the feed's.
+    local = local or {}
+    pending = collections.deque(packages)
+    seen = set()
+    resolved = []
+    while pending:
+        package_id, version = pending.popleft()
+        if package_id.lower() in seen:
+            continue
+        seen.add(package_id.lower())
+        package = local.get(package_id.lower())
+        if package is None:
+            package = feed.package(package_id, None if version in (None, "", "latest") else version)
+        resolved.append(package)
+        pending.extend((dependency, exact_version(version_range)) for dependency, version_range in package["dependencies"])
+    return resolved
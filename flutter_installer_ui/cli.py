@@ -0,0 +1,376 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import telemetry
+from component_registry import load_error, selected_components, versioned_components
+from install_profile import (PRECACHE_PLATFORMS, ProfileError, load_profile, parse_components, parse_platforms,
+                             parse_profile, resolve_profile)
+from probe_state import ProbeStateStore
+from system_probes import READY_STATUSES, check_admin_privileges, run_system_check
+
+# Headless entry point for unattended and fleet installs:
+#
+#   FlutterInstallerCli check
+#   FlutterInstallerCli install --profile flutter.json
+#   FlutterInstallerCli install --flutter 3.24.5 --openjdk 17.0.12 --dry-run
+#   FlutterInstallerCli install --with googlechrome,vctools
+#   FlutterInstallerCli profile > flutter.json
+#   FlutterInstallerCli report \\fileserver\installer-spans
+#
+# Results go to stdout as one JSON document; progress and step output go to
+# stderr. Tkinter is never imported, and the installer and network modules
+# only when a command needs them, so a check starts in a fraction of a second.
+# check, install and bundle record their timings next to the log (see
+# telemetry.py); report summarises them across runs and machines.
+
+EXIT_OK = 0
+EXIT_FAILED = 1        # install steps failed, or check found missing components
+EXIT_USAGE = 2         # bad arguments or profile (argparse also exits with 2)
+EXIT_NOT_ADMIN = 3
+EXIT_ERROR = 4
+
+DEFAULT_LOG_FILE = os.path.join(os.path.expanduser("~"), "flutter_installer.log")
+# Commands whose runs are recorded for `report`
+TRACED_COMMANDS = ("check", "install", "bundle")
+
+
+def is_admin():
+    try:
+        return check_admin_privileges() == "Activated"
+    except AttributeError:
+        # ctypes.windll only exists on Windows
+        return False
+
+
+def emit(args, result):
+    text = json.dumps(result, indent=1, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text, file=args.results)
+
+
+def command_check(args):
+    started = time.monotonic()
+    optional = parse_components(args.with_components) if args.with_components is not None else None
+    components = [component.name for component in selected_components(optional) if component.key != "admin"]
+    lock = threading.Lock()
+
+    def on_result(component, status, detail):
+        if not args.quiet:
+            with lock:
+                print(f"{component}: {status}" + (f" ({detail})" if detail else ""))
+
+    results = run_system_check(components, on_result, store=ProbeStateStore(), incremental=args.incremental)
+    report = {}
+    for component in components:
+        status, detail = results[component]
+        ready = status in READY_STATUSES
+        report[component] = {"status": status, "ready": ready, "version": detail if ready else None,
+                             "detail": None if ready else detail}
+    ready = all(entry["ready"] for entry in report.values())
+    args.run_fields["ready"] = ready
+    emit(args, {
+        "command": "check",
+        "ready": ready,
+        "administrator": is_admin(),
+        "components": report,
+        "elapsed": round(time.monotonic() - started, 3),
+    })
+    return EXIT_OK if ready else EXIT_FAILED
+
+
+def read_profile(args):
+    profile = load_profile(args.profile) if args.profile else parse_profile({})
+    for component in versioned_components():
+        value = getattr(args, component.key)
+        if value:
+            profile[component.key] = value
+    if args.precache is not None:
+        profile["precache"] = parse_platforms(args.precache)
+    if args.with_components is not None:
+        profile["components"] = parse_components(args.with_components)
+    return profile
+
+
+def component_catalog(component):
+    # The version list Auto Configure picks a component's version from
+    from version_catalogs import CatalogClients, fetch_versions
+    with telemetry.span("catalog", component.catalog_key) as span:
+        try:
+            return fetch_versions(component, CatalogClients())
+        except (OSError, ValueError) as e:
+            print(f"Error reading {component.name} versions: {e}")
+            span["status"] = "error"
+            return []
+
+
+def command_profile(args):
+    profile = resolve_profile(read_profile(args), component_catalog)
+    emit(args, dict(profile, format=1))
+    return EXIT_OK
+
+
+def load_catalogs(versions):
+    # The Flutter release index and Android repository manifest, refreshed if
+    # they can be; a saved copy is used offline
+    from android_repository import AndroidRepository
+    from flutter_releases import CHANNELS, FlutterReleaseIndex
+    flutter_releases = FlutterReleaseIndex()
+    with telemetry.span("catalog", "flutter") as span:
+        try:
+            flutter_releases.refresh()
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error refreshing Flutter releases: {e}")
+            span["status"] = "error"
+
+    if (flutter_releases.releases and versions["flutter"] not in CHANNELS
+            and flutter_releases.release(versions["flutter"]) is None):
+        raise ProfileError(f"Unknown Flutter version {versions['flutter']}")
+    android_repository = AndroidRepository()
+    with telemetry.span("catalog", "android-repository") as span:
+        if not android_repository.ensure_loaded():
+            span["status"] = "error"
+    return flutter_releases, android_repository
+
+
+def command_bundle(args):
+    from chocolatey_feed import ChocolateyFeedClient, ChocolateyFeedError
+    from download_manager import DownloadError
+    from offline_bundle import BundleError, export_bundle, resolve_artifacts
+    versions = resolve_profile(read_profile(args), component_catalog)
+    flutter_releases, android_repository = load_catalogs(versions)
+    try:
+        profile, artifacts = resolve_artifacts(versions, flutter_releases, android_repository,
+                                               ChocolateyFeedClient(), args.nupkg)
+        manifest = export_bundle(args.directory, profile, artifacts)
+    except BundleError as e:
+        raise ProfileError(str(e))
+    except (OSError, ChocolateyFeedError, DownloadError) as e:
+        emit(args, {"command": "bundle", "succeeded": False, "error": str(e)})
+        return EXIT_FAILED
+    emit(args, {
+        "command": "bundle",
+        "succeeded": True,
+        "directory": os.path.abspath(args.directory),
+        "profile": profile,
+        "artifacts": {artifact["id"]: {"file": artifact["file"], "size": artifact["size"]} for artifact in manifest["artifacts"]},
+    })
+    return EXIT_OK
+
+
+def command_install(args):
+    started = time.monotonic()
+    profile = read_profile(args)
+    if not args.dry_run and not is_admin():
+        emit(args, {"command": "install", "succeeded": False, "error": "Administrator privileges are required"})
+        return EXIT_NOT_ADMIN
+
+    from artifact_cache import artifact_cache
+    from install_journal import InstallJournal
+    from install_orchestrator import OK, SKIPPED, InstallOrchestrator
+    from install_steps import build_install_plan
+
+    if args.bundle:
+        from offline_bundle import BundleError, OfflineBundle
+        if (args.profile or args.precache is not None or args.with_components is not None
+                or any(getattr(args, component.key) for component in versioned_components())):
+            raise ProfileError("An offline bundle installs the versions it was exported with")
+        try:
+            bundle = OfflineBundle(args.bundle)
+            bundle.verify()
+        except BundleError as e:
+            raise ProfileError(str(e))
+        bundle.mount()
+        versions = bundle.profile
+        args.run_fields["bundle"] = True
+        steps = build_install_plan(bundle=bundle)
+    else:
+        versions = resolve_profile(profile, component_catalog)
+        flutter_releases, android_repository = load_catalogs(versions)
+        steps = build_install_plan(
+            versions,
+            flutter_releases=flutter_releases,
+            android_repository=android_repository,
+            precache_platforms=versions["precache"]
+        )
+    args.run_fields["profile"] = versions
+    if args.dry_run:
+        emit(args, {
+            "command": "install",
+            "dry_run": True,
+            "profile": versions,
+            "steps": [{"id": step.step_id, "title": step.title, "depends_on": list(step.depends_on),
+                       "after": list(step.after)} for step in steps],
+        })
+        return EXIT_OK
+
+    with open(args.log_file, "w", encoding="utf-8") as log:
+        log_lock = threading.Lock()
+
+        def on_log(step_id, line):
+            line = f"[{step_id}] {line}"
+            with log_lock:
+                log.write(line)
+                log.flush()
+                if not args.quiet:
+                    sys.stdout.write(line)
+
+        journal = InstallJournal()
+        if args.fresh:
+            journal.clear()
+        orchestrator = InstallOrchestrator(
+            steps,
+            log_dir=os.path.join(os.path.dirname(args.log_file), "flutter_installer_steps"),
+            on_log=on_log,
+            journal=journal
+        )
+        artifact_cache().reset_stats()
+        results = orchestrator.run()
+        artifact_cache().flush()
+        on_log("installer", artifact_cache().summary() + "\n")
+
+    succeeded = orchestrator.succeeded()
+    emit(args, {
+        "command": "install",
+        "profile": versions,
+        "succeeded": succeeded,
+        "failed": [step.step_id for step in steps if results.get(step.step_id) not in (OK, SKIPPED)],
+        "steps": {
+            step.step_id: {
+                "title": step.title,
+                "status": results.get(step.step_id),
+                "duration": round(orchestrator.durations[step.step_id], 1) if step.step_id in orchestrator.durations else None,
+            }
+            for step in steps
+        },
+        "reboot_required": any(outputs.get("reboot_required") for outputs in orchestrator.outputs.values()),
+        "log_file": args.log_file,
+        "elapsed": round(time.monotonic() - started, 1),
+    })
+    return EXIT_OK if succeeded else EXIT_FAILED
+
+
+def print_report(summary):
+    print(f"{summary['runs']} runs, {summary['installs']} completed installs")
+    critical = summary["critical_path"]
+    if critical:
+        print(f"Critical path ({critical['runs']} of {summary['installs']} installs; {critical['variants']} variants):")
+        for entry in critical["steps"]:
+            waited = f", waited {entry['median_waited']:.0f}s" if entry["median_waited"] >= 1 else ""
+            print(f"  {entry['step']:<20} {entry['median']:8.1f}s median{waited}")
+    print("Slowest phases (median / p90 / max seconds):")
+    for phase in summary["slowest_phases"]:
+        throughput = f"  {phase['mb_per_s']:.1f} MB/s" if "mb_per_s" in phase else ""
+        failures = f"  {phase['failed']} failed" if phase["failed"] else ""
+        print(f"  {phase['kind'] + ' ' + phase['name']:<48} {phase['median']:8.1f} {phase['p90']:8.1f} {phase['max']:8.1f}"
+              f"  x{phase['count']}{throughput}{failures}")
+    if summary["groups"]:
+        print(f"Installs by {summary['group_by']}:")
+        for name, group in summary["groups"].items():
+            print(f"  {name:<24} {group['installs']:3} installs, {group['succeeded']} succeeded, "
+                  f"median {group['median_duration']:.0f}s, max {group['max_duration']:.0f}s, slowest step {group['slowest_step']}")
+
+
+def command_report(args):
+    runs = telemetry.load_runs(args.paths or [telemetry.spans_path(DEFAULT_LOG_FILE)])
+    summary = telemetry.summarize(runs, group_by=args.group_by, top=args.top)
+    if not args.quiet:
+        print_report(summary)
+    emit(args, dict(summary, command="report"))
+    return EXIT_OK if runs else EXIT_FAILED
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output", help="also write the JSON result to this file")
+    common.add_argument("--quiet", action="store_true", help="do not print progress to stderr")
+    parser = argparse.ArgumentParser(prog="FlutterInstallerCli",
+                                     description="Check or install the Flutter development environment without the GUI.")
+    commands = parser.add_subparsers(dest="command")
+
+    check = commands.add_parser("check", parents=[common], help="report which components are installed")
+    check.add_argument("--incremental", action="store_true",
+                       help="reuse the last results for components whose files have not changed")
+    check.add_argument("--with", dest="with_components", metavar="COMPONENTS",
+                       help="comma-separated optional components to check (default: those selected in components.json)")
+    check.set_defaults(handler=command_check)
+
+    for name, handler, description in (
+            ("install", command_install, "install the components named in a profile"),
+            ("bundle", command_bundle, "download everything a profile needs into an offline bundle"),
+            ("profile", command_profile, "print the resolved profile (Auto Configure's choices by default)")):
+        command = commands.add_parser(name, parents=[common], help=description)
+        command.add_argument("--profile", help="JSON profile with the versions to install")
+        for component in versioned_components():
+            command.add_argument("--" + component.key.replace("_", "-"), dest=component.key, metavar="VERSION",
+                                 help=f"{component.name} version (overrides the profile)")
+        command.add_argument("--with", dest="with_components", metavar="COMPONENTS",
+                             help="comma-separated optional components to install (overrides the profile; "
+                                  "empty for none)")
+        command.add_argument("--precache", metavar="PLATFORMS",
+                             help=f"comma-separated platforms to warm up the Flutter tool cache for "
+                                  f"({', '.join(PRECACHE_PLATFORMS)}; empty for none)")
+        command.set_defaults(handler=handler)
+    install = commands.choices["install"]
+    install.add_argument("--dry-run", action="store_true", help="resolve versions and print the plan without installing")
+    install.add_argument("--bundle", metavar="DIRECTORY", help="install only from an offline bundle, without downloading")
+    install.add_argument("--log-file", default=DEFAULT_LOG_FILE)
+    install.add_argument("--fresh", action="store_true",
+                         help="start over instead of resuming an unfinished install from its journal")
+    bundle = commands.choices["bundle"]
+    bundle.add_argument("directory", help="folder to write the bundle to")
+    bundle.add_argument("--nupkg", action="append", default=[], metavar="FILE",
+                        help="local (e.g. internalized) package to bundle instead of the community feed's")
+
+    report = commands.add_parser("report", parents=[common], help="summarise the recorded timings of past runs")
+    report.add_argument("paths", nargs="*", metavar="PATH",
+                        help="span files, or folders of them collected from several machines "
+                             "(default: the ones next to this machine's log)")
+    report.add_argument("--group-by", default="machine",
+                        help="compare installs by a run field (machine, windows_build) or profile entry (flutter, openjdk, ...)")
+    report.add_argument("--top", type=int, default=10, help="number of slowest phases to list")
+    report.set_defaults(handler=command_report)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help(sys.stderr)
+        return EXIT_USAGE
+    if load_error():
+        print(load_error(), file=sys.stderr)
+    # The result is the only thing written to stdout; everything the
+    # installer modules print goes to stderr with the progress output
+    args.results = sys.stdout
+    args.run_fields = {}
+    recorder = None
+    if args.command in TRACED_COMMANDS and not getattr(args, "dry_run", False):
+        recorder = telemetry.start_run(telemetry.spans_path(getattr(args, "log_file", DEFAULT_LOG_FILE)),
+                                       args.command, interface="cli")
+    code = EXIT_ERROR
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            code = args.handler(args)
+    except ProfileError as e:
+        emit(args, {"command": args.command, "error": str(e)})
+        code = EXIT_USAGE
+    except Exception as e:
+        emit(args, {"command": args.command, "error": f"{type(e).__name__}: {e}"})
+        code = EXIT_ERROR
+    finally:
+        if recorder:
+            telemetry.finish_run(recorder, "ok" if code == EXIT_OK else "failed", exit_code=code, **args.run_fields)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
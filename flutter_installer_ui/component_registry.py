@@ -0,0 +1,266 @@
+import collections
+import importlib
+import json
+import os
+import re
+import threading
+
+from app_paths import data_file
+from flutter_releases import CHANNELS
+
+# Every component the installer knows about, declared once. The GUI's cards
+# and version dropdowns, the system check, profiles and the command-line
+# options, offline bundles and the install plan are all built from this
+# list, so adding a component means adding an entry here (or to
+# components.json), not editing each of them.
+#
+# Probes, fingerprints, version fetchers and install step factories are
+# named as "module:function" and only imported when first called: the
+# modules behind a component that is not selected are never loaded and its
+# probe and version fetcher never run.
+#
+# Optional components are installed only when selected. Chocolatey packages
+# can be added without code changes in components.json in the data
+# directory (or the file FLUTTER_INSTALLER_COMPONENTS names):
+#
+#   {"format": 1, "components": [
+#     {"key": "googlechrome", "name": "Google Chrome", "package": "googlechrome",
+#      "description": "Browser for Flutter web debugging", "icon": "🌐", "selected": true},
+#     {"key": "vctools", "name": "Visual Studio Build Tools (C++)", "package": "visualstudio2022-workload-vctools",
+#      "description": "Compiler for Flutter Windows desktop apps", "icon": "🖥️", "weight": 20}]}
+#
+# Each extra component is probed through Chocolatey's package folder, lists
+# the feed's versions and installs in the shared Chocolatey run.
+
+COMPONENTS_FILE = "components.json"
+COMPONENTS_ENV = "FLUTTER_INSTALLER_COMPONENTS"
+KEY = re.compile(r"^[a-z][a-z0-9_]*$")
+REFERENCE = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*:[A-Za-z_][A-Za-z0-9_]*$")
+# Step ids of the plan that are not a component's own
+RESERVED_STEPS = ("flutter-precache", "flutter-doctor", "installer")
+
+
+class ComponentError(Exception):
+    pass
+
+
+class Lazy:
+    # A "module:function" reference, imported on the first call. Arguments
+    # given here are passed before the caller's.
+
+    def __init__(self, reference, *args):
+        if not isinstance(reference, str) or not REFERENCE.match(reference):
+            raise ComponentError(f"{reference!r} is not a \"module:function\" reference")
+        self.reference = reference
+        self.args = args
+        self._function = None
+
+    def __call__(self, *args, **kwargs):
+        if self._function is None:
+            module, _, name = self.reference.partition(":")
+            try:
+                self._function = getattr(importlib.import_module(module), name)
+            except (ImportError, AttributeError) as e:
+                raise ComponentError(f"Cannot load {self.reference}: {e}")
+        return self._function(*(self.args + args), **kwargs)
+
+
+def _lazy(reference):
+    return Lazy(reference) if isinstance(reference, str) else reference
+
+
+class Component:
+    # key names the component in profiles, on the command line and in the
+    # install journal; name is what the UI and the system check show.
+    #
+    #   probe()                      -> status, or (status, version); see system_probes.py
+    #   fingerprint()                -> digest of what the probe reads, to skip unchanged probes
+    #   versions(clients, validators) -> version list, or (versions, validators); see version_catalogs.py
+    #   recommend(versions)          -> Auto Configure's choice, default_version without it
+    #   install(plan, component)     -> its InstallSteps; see install_steps.py
+    #
+    # A component with a Chocolatey package is installed in the shared
+    # Chocolatey run unless it names its own install. default_version is None
+    # for components without a version choice.
+
+    def __init__(self, key, name, description, icon, probe, probe_timeout=5, fingerprint=None,
+                 versions=None, catalog_key=None, catalog_timeout=None, default_version=None, initial_versions=None,
+                 recommend=None, recommendation=None, install=None, step_id=None, depends_on=(), package=None,
+                 weight=5, optional=False, selected=False):
+        self.key = key
+        self.name = name
+        self.description = description
+        self.icon = icon
+        self.probe = _lazy(probe)
+        self.probe_timeout = probe_timeout
+        self.fingerprint = _lazy(fingerprint)
+        self.versions = _lazy(versions)
+        self.catalog_key = catalog_key or key
+        self.catalog_timeout = catalog_timeout
+        self.default_version = default_version
+        self.initial_versions = list(initial_versions or ([default_version] if default_version else []))
+        self.recommend = _lazy(recommend)
+        self.recommendation = recommendation
+        if install is None and package:
+            install = "install_steps:package_steps"
+        self.install = _lazy(install)
+        self.step_id = step_id or key
+        self.depends_on = tuple(depends_on)
+        self.package = package
+        self.weight = weight
+        self.optional = optional
+        self.selected = selected
+
+    def recommended_version(self, versions=()):
+        if self.recommend is not None:
+            return self.recommend(versions)
+        return self.default_version
+
+
+BUILTIN_COMPONENTS = (
+    Component("admin", "Administrator Privileges", "Required for installation", "🔐",
+              probe="system_probes:check_admin_privileges"),
+    Component("chocolatey", "Chocolatey", "Package manager for Windows", "📦",
+              probe="system_probes:check_chocolatey", probe_timeout=15, fingerprint="system_probes:chocolatey_fingerprint",
+              install="install_steps:chocolatey_steps"),
+    Component("git", "Git", "Version control system", "🔀",
+              probe="system_probes:check_git", probe_timeout=15, fingerprint="system_probes:git_fingerprint",
+              versions=Lazy("version_catalogs:chocolatey_versions", "git"), default_version="latest",
+              recommendation="most recent stable version", package="git", depends_on=("chocolatey",)),
+    Component("android_studio", "Android Studio", "Official IDE for Android development", "📱",
+              probe="system_probes:check_android_studio", fingerprint="system_probes:android_studio_fingerprint",
+              versions=Lazy("version_catalogs:chocolatey_versions", "androidstudio"), catalog_key="androidstudio",
+              default_version="latest", recommendation="most recent stable release",
+              package="androidstudio", step_id="androidstudio", depends_on=("chocolatey",), weight=25),
+    Component("openjdk", "OpenJDK", "Java development kit", "☕",
+              probe="system_probes:check_openjdk", probe_timeout=30, fingerprint="system_probes:openjdk_fingerprint",
+              versions=Lazy("version_catalogs:chocolatey_versions", "openjdk"), default_version="latest",
+              recommend="install_profile:recommended_openjdk", recommendation="recommended for Flutter development",
+              package="openjdk", depends_on=("chocolatey",), weight=10),
+    # The Flutter release index may have to fall back to git ls-remote
+    Component("flutter", "Flutter SDK", "Flutter framework and tools", "🎯",
+              probe="system_probes:check_flutter_sdk", fingerprint="system_probes:flutter_fingerprint",
+              versions="version_catalogs:flutter_versions", catalog_timeout=30, default_version="stable",
+              initial_versions=CHANNELS, recommendation="recommended for production",
+              install="install_steps:flutter_steps", depends_on=("git",), weight=20),
+    Component("cmdline_tools", "Android SDK Command-line Tools", "Android development tools", "🛠️",
+              probe="system_probes:check_android_sdk_tools", fingerprint="system_probes:android_sdk_tools_fingerprint",
+              install="install_steps:cmdline_tools_steps", step_id="cmdline-tools"),
+    Component("ndk", "NDK", "Native development kit", "⚙️",
+              probe="system_probes:check_ndk", fingerprint="system_probes:ndk_fingerprint",
+              versions="version_catalogs:ndk_versions", default_version="latest",
+              recommendation="compatible with current Android Studio",
+              install="install_steps:sdk_packages_steps", step_id="sdk-packages", depends_on=("cmdline_tools", "openjdk"),
+              weight=15),
+    # The environment check reads the registry, which is as cheap as fingerprinting it
+    Component("environment", "Environment Variables", "System PATH configuration", "🌍",
+              probe="system_probes:check_environment_variables", install="install_steps:environment_steps", weight=1),
+)
+
+_lock = threading.Lock()
+_registry = None
+_load_error = None
+
+
+def components_path():
+    return os.environ.get(COMPONENTS_ENV) or data_file(COMPONENTS_FILE)
+
+
+def load_extra_components(path):
+    # The Chocolatey-package components declared in a components.json
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        raise ComponentError(f"Cannot read {path}: {e}")
+    if not isinstance(data, dict) or data.get("format", 1) != 1 or not isinstance(data.get("components"), list):
+        raise ComponentError(f"{path} must be an object with a \"components\" list")
+
+    reserved = set(RESERVED_STEPS)
+    for component in BUILTIN_COMPONENTS:
+        reserved.update((component.key, component.step_id))
+    known = set(component.key for component in BUILTIN_COMPONENTS)
+    for entry in data["components"]:
+        if not isinstance(entry, dict) or not all(isinstance(entry.get(field), str) for field in ("key", "name", "package")):
+            raise ComponentError(f"{path}: every component needs a key, a name and a package")
+        key = entry["key"]
+        if not KEY.match(key) or key in reserved:
+            raise ComponentError(f"{path}: {key!r} cannot be used as a component key")
+        reserved.add(key)
+        known.add(key)
+    extras = []
+    for entry in data["components"]:
+        key, package = entry["key"], entry["package"].lower()
+        depends_on = entry.get("depends_on", [])
+        if not isinstance(depends_on, list) or not all(isinstance(dependency, str) for dependency in depends_on):
+            raise ComponentError(f"{path}: depends_on of {key!r} must be a list of component keys")
+        for dependency in depends_on:
+            # Extra components can depend on each other in any order
+            if dependency not in known:
+                raise ComponentError(f"{path}: {key!r} depends on unknown component {dependency!r}")
+            if dependency == key:
+                raise ComponentError(f"{path}: {key!r} depends on itself")
+        extras.append(Component(
+            key, entry["name"], entry.get("description", f"Chocolatey package {package}"), entry.get("icon", "🧩"),
+            probe=Lazy("system_probes:check_chocolatey_package", package),
+            fingerprint=Lazy("system_probes:chocolatey_package_fingerprint", package),
+            versions=Lazy("version_catalogs:chocolatey_versions", package), catalog_key=package,
+            default_version=entry.get("version", "latest"), package=package,
+            depends_on=("chocolatey",) + tuple(depends_on),
+            weight=entry.get("weight", 5), optional=True, selected=bool(entry.get("selected", False))))
+    return extras
+
+
+def registry():
+    # key -> Component, built-ins first; components.json is read once
+    global _registry, _load_error
+    with _lock:
+        if _registry is None:
+            entries = list(BUILTIN_COMPONENTS)
+            try:
+                entries.extend(load_extra_components(components_path()))
+            except ComponentError as e:
+                # The built-ins still load; the GUI and the CLI show the error
+                _load_error = f"Extra components not loaded: {e}"
+            _registry = collections.OrderedDict((component.key, component) for component in entries)
+        return _registry
+
+
+def load_error():
+    # Why components.json was ignored, or None
+    registry()
+    return _load_error
+
+
+def components():
+    return list(registry().values())
+
+
+def component(key):
+    return registry()[key]
+
+
+def component_named(name):
+    for entry in registry().values():
+        if entry.name == name:
+            return entry
+    raise KeyError(name)
+
+
+def versioned_components():
+    # The components a profile names a version for
+    return [entry for entry in registry().values() if entry.default_version]
+
+
+def default_selection():
+    # Keys of the optional components installed unless a profile says otherwise
+    return [entry.key for entry in registry().values() if entry.optional and entry.selected]
+
+
+def selected_components(optional=None):
+    # Every required component plus the optional ones in `optional` (keys),
+    # or those selected by default when it is None
+    chosen = set(default_selection() if optional is None else optional)
+    return [entry for entry in registry().values() if not entry.optional or entry.key in chosen]
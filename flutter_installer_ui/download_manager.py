@@ -0,0 +1,297 @@
+import hashlib
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+import urllib.parse
+
+import telemetry
+from app_paths import data_file, write_json_atomic
+from chocolatey_feed import ConnectionPool
+
+STATE_FORMAT = 1
+CHUNK_SIZE = 8 * 1024 * 1024
+READ_SIZE = 256 * 1024
+REDIRECTS = (301, 302, 303, 307, 308)
+PROGRESS_INTERVAL = 0.1
+
+
+class DownloadError(Exception):
+    pass
+
+
+def downloads_dir():
+    path = data_file("downloads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_digest(path, algorithm="sha256"):
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkedDownloader:
+    # Downloads a file over several connections at once. The file is split
+    # into fixed-size chunks fetched with HTTP Range requests and written in
+    # place into a preallocated "<path>.part". Finished chunks are recorded
+    # in "<path>.part.json", so an interrupted download only refetches the
+    # chunks that were in flight. Servers without Range support get a
+    # single plain stream instead.
+    #
+    # A file already at the destination is kept when it matches the
+    # checksum, or without one, when it has the size the server reports.
+    #
+    # on_progress(done, total) is called from the worker threads.
+
+    def __init__(self, connections=4, chunk_size=CHUNK_SIZE, retries=3, timeout=30):
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.pool = ConnectionPool(timeout=timeout, max_idle=connections)
+
+    def download(self, url, path, checksum=None, algorithm="sha256", on_progress=None, log=print):
+        if os.path.exists(path) and checksum:
+            if file_digest(path, algorithm) == checksum.lower():
+                log(f"{os.path.basename(path)} is already downloaded")
+                return path
+            os.remove(path)
+
+        with telemetry.span("download", os.path.basename(path), host=urllib.parse.urlsplit(url).netloc) as span:
+            span["bytes"] = self._download(url, path, checksum, algorithm, on_progress, log)
+        return path
+
+    def _download(self, url, path, checksum, algorithm, on_progress, log):
+        # Returns the number of bytes fetched
+        try:
+            url, size, validator, length = self._probe(url)
+        except (OSError, http.client.HTTPException) as e:
+            if os.path.exists(path):
+                # Only left there without a checksum; it cannot be compared, but is better than nothing
+                log(f"Cannot reach {url} to check {os.path.basename(path)}; using the downloaded file")
+                return 0
+            raise DownloadError(f"Cannot reach {url}: {e}")
+        if os.path.exists(path):
+            if length is not None and os.path.getsize(path) == length:
+                log(f"{os.path.basename(path)} is already downloaded")
+                return 0
+            log(f"{os.path.basename(path)} does not have the server's size; downloading it again")
+            os.remove(path)
+        part = path + ".part"
+        state_path = part + ".json"
+        started = time.monotonic()
+        if size is None:
+            log(f"{urllib.parse.urlsplit(url).netloc} does not support ranged downloads; using a single connection")
+            try:
+                fetched = self._download_stream(url, part, on_progress)
+            except (OSError, http.client.HTTPException) as e:
+                raise DownloadError(f"Download of {url} failed: {e}")
+        else:
+            fetched = self._download_chunks(url, part, state_path, size, validator, on_progress, log)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        log(f"Downloaded {fetched / 1048576.0:.1f} MB in {elapsed:.1f}s ({fetched / 1048576.0 / elapsed:.1f} MB/s)")
+
+        if checksum:
+            actual = file_digest(part, algorithm)
+            if actual != checksum.lower():
+                self._discard(part, state_path)
+                raise DownloadError(f"{algorithm} mismatch for {url}: expected {checksum}, got {actual}")
+        os.replace(part, path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return fetched
+
+    def _request(self, url, headers, redirects=5):
+        # Returns (final url, response, connection); the caller releases the connection
+        parts = urllib.parse.urlsplit(url)
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        connection = self.pool.acquire(parts.scheme, parts.netloc)
+        try:
+            connection.request("GET", target, headers=headers)
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException):
+            # A pooled connection may have been closed by the server; retry once on a fresh one
+            connection.close()
+            connection = self.pool.connect(parts.scheme, parts.netloc)
+            connection.request("GET", target, headers=headers)
+            response = connection.getresponse()
+
+        if response.status in REDIRECTS and redirects:
+            response.read()
+            self._release(url, connection, response)
+            location = urllib.parse.urljoin(url, response.getheader("Location"))
+            return self._request(location, headers, redirects - 1)
+        return url, response, connection
+
+    def _release(self, url, connection, response):
+        parts = urllib.parse.urlsplit(url)
+        if response.will_close:
+            connection.close()
+        else:
+            self.pool.release(parts.scheme, parts.netloc, connection)
+
+    def _probe(self, url):
+        # Asks for the first byte: a 206 tells us the size and that ranges
+        # work. Returns (final url, size for ranged downloads or None,
+        # validator, file length if the server says).
+        url, response, connection = self._request(url, {"Range": "bytes=0-0"})
+        if response.status == 200:
+            # No range support: the body is the whole file, so none of it is read
+            connection.close()
+            length = response.getheader("Content-Length") or ""
+            return url, None, None, int(length) if length.isdigit() else None
+        try:
+            response.read()
+        finally:
+            self._release(url, connection, response)
+        if response.status == 206:
+            content_range = response.getheader("Content-Range", "")
+            total = content_range.rpartition("/")[2]
+            if total.isdigit():
+                validator = response.getheader("ETag") or response.getheader("Last-Modified")
+                return url, int(total), validator, int(total)
+            return url, None, None, None
+        raise DownloadError(f"HTTP {response.status} for {url}")
+
+    def _load_state(self, state_path, url, size, validator):
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if (state.get("format") != STATE_FORMAT or state.get("url") != url or state.get("size") != size
+                or state.get("validator") != validator or state.get("chunk_size") != self.chunk_size):
+            return set()
+        return set(state.get("done", []))
+
+    def _download_chunks(self, url, part, state_path, size, validator, on_progress, log):
+        chunk_count = max(1, -(-size // self.chunk_size))
+        done_chunks = self._load_state(state_path, url, size, validator) if os.path.exists(part) else set()
+        if not os.path.exists(part) or os.path.getsize(part) != size:
+            with open(part, "wb") as f:
+                f.truncate(size)
+            done_chunks = set()
+        if done_chunks:
+            log(f"Resuming {os.path.basename(part[:-5])}: {len(done_chunks)} of {chunk_count} chunks already downloaded")
+
+        pending = queue.Queue()
+        for index in range(chunk_count):
+            if index not in done_chunks:
+                pending.put(index)
+
+        lock = threading.Lock()
+        progress = {"done": sum(self._chunk_length(i, size) for i in done_chunks), "fetched": 0}
+        errors = []
+
+        def save_state():
+            write_json_atomic(state_path, {
+                "format": STATE_FORMAT, "url": url, "size": size, "validator": validator,
+                "chunk_size": self.chunk_size, "done": sorted(done_chunks),
+            })
+
+        def received(count):
+            # Progress is reported at most ten times a second
+            now = time.monotonic()
+            with lock:
+                progress["done"] += count
+                progress["fetched"] += count
+                done = progress["done"]
+                report = done == size or now - progress.get("reported", 0) >= PROGRESS_INTERVAL
+                if report:
+                    progress["reported"] = now
+            if on_progress and report:
+                on_progress(done, size)
+
+        def worker():
+            with open(part, "r+b") as f:
+                while not errors:
+                    try:
+                        index = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        self._fetch_chunk(url, f, index, size, validator, received)
+                    except Exception as e:
+                        errors.append(e)
+                        return
+                    with lock:
+                        done_chunks.add(index)
+                        save_state()
+
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.connections, pending.qsize()))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        if errors:
+            raise DownloadError(f"Download of {url} failed: {errors[0]}")
+        return progress["fetched"]
+
+    def _chunk_length(self, index, size):
+        start = index * self.chunk_size
+        return min(start + self.chunk_size, size) - start
+
+    def _fetch_chunk(self, url, f, index, size, validator, received):
+        start = index * self.chunk_size
+        end = start + self._chunk_length(index, size) - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        if validator:
+            # Refuse to mix bytes from two versions of the file
+            headers["If-Range"] = validator
+        for attempt in range(self.retries + 1):
+            written = 0
+            try:
+                final_url, response, connection = self._request(url, headers)
+                try:
+                    if response.status != 206:
+                        raise DownloadError(f"HTTP {response.status} for bytes {start}-{end}")
+                    f.seek(start)
+                    while written < end - start + 1:
+                        data = response.read(min(READ_SIZE, end - start + 1 - written))
+                        if not data:
+                            raise DownloadError(f"Connection closed after {written} bytes of chunk {index}")
+                        f.write(data)
+                        written += len(data)
+                        received(len(data))
+                finally:
+                    if written == end - start + 1:
+                        self._release(final_url, connection, response)
+                    else:
+                        connection.close()
+                return
+            except (OSError, http.client.HTTPException, DownloadError):
+                # Take back the partial chunk's bytes; it is refetched from its start
+                received(-written)
+                if attempt == self.retries:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    def _download_stream(self, url, part, on_progress):
+        url, response, connection = self._request(url, {})
+        done = 0
+        try:
+            if response.status != 200:
+                raise DownloadError(f"HTTP {response.status} for {url}")
+            total = int(response.getheader("Content-Length") or 0)
+            with open(part, "wb") as f:
+                while True:
+                    data = response.read(READ_SIZE)
+                    if not data:
+                        break
+                    f.write(data)
+                    done += len(data)
+                    if on_progress:
+                        on_progress(done, total)
+        finally:
+            connection.close()
+        return done
+
+    def _discard(self, part, state_path):
+        for leftover in (part, state_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
@@ -0,0 +1,175 @@
+import ntpath
+import os
+
+# The machine environment the Flutter toolchain needs: ANDROID_HOME and four
+# Path entries. Path values are compared as whole, normalised entries
+# (%VARIABLES% expanded, case-folded, quotes and trailing separators
+# dropped) rather than substrings, so "C:\flutter\bin" is found however it
+# was written and "...\emulator-old" does not count as the emulator folder.
+#
+# The parsing and the diff are plain functions of the current values, so
+# they behave the same on any OS; only the functions at the bottom touch
+# the registry. The install writes only the values that differ, in one
+# pass, followed by a single WM_SETTINGCHANGE broadcast.
+
+ENVIRONMENT_KEY = r"SYSTEM\CurrentControlSet\Control\Session Manager\Environment"
+USER_ENVIRONMENT_KEY = "Environment"
+
+
+def split_path(value):
+    # 'a;;b; "c"' -> ["a", "b", "c"]: the entries as written, without quotes or blanks
+    entries = []
+    for entry in (value or "").split(";"):
+        entry = entry.strip().strip('"').strip()
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+def normalize_entry(entry):
+    # The form two Path entries are compared in
+    return ntpath.normcase(ntpath.normpath(ntpath.expandvars(entry.strip().strip('"'))))
+
+
+def parse_path(value):
+    # Entries with later duplicates removed; the first one is what Windows uses anyway
+    seen = set()
+    entries = []
+    for entry in split_path(value):
+        key = normalize_entry(entry)
+        if key not in seen:
+            seen.add(key)
+            entries.append(entry)
+    return entries
+
+
+def variable(variables, name):
+    # Environment variable names are case-insensitive ("Path" in the registry, "PATH" in os.environ)
+    for key, value in variables.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def required_path_entries(sdk_root, flutter_root):
+    return [
+        ntpath.join(flutter_root, "bin"),
+        ntpath.join(sdk_root, "emulator"),
+        ntpath.join(sdk_root, "platform-tools"),
+        ntpath.join(sdk_root, "cmdline-tools", "latest", "bin"),
+    ]
+
+
+def missing_requirements(variables, sdk_root, flutter_root):
+    # "ANDROID_HOME" when it does not name sdk_root, followed by the required
+    # Path entries that variables' Path lacks
+    missing = []
+    android_home = variable(variables, "ANDROID_HOME")
+    if not android_home or normalize_entry(android_home) != normalize_entry(sdk_root):
+        missing.append("ANDROID_HOME")
+    present = {normalize_entry(entry) for entry in split_path(variable(variables, "Path"))}
+    missing.extend(entry for entry in required_path_entries(sdk_root, flutter_root) if normalize_entry(entry) not in present)
+    return missing
+
+
+def plan_environment(variables, sdk_root, flutter_root):
+    # Returns (changes, added): {name: new value} for only the variables that
+    # need writing, and the Path entries being appended. Path is rewritten
+    # only when an entry is missing, and duplicate entries are dropped then.
+    changes = {}
+    missing = missing_requirements(variables, sdk_root, flutter_root)
+    if "ANDROID_HOME" in missing:
+        changes["ANDROID_HOME"] = sdk_root
+    added = [entry for entry in missing if entry != "ANDROID_HOME"]
+    if added:
+        changes["Path"] = merge_path(variable(variables, "Path"), added)
+    return changes, added
+
+
+def merge_path(value, added):
+    # value's entries, without duplicates, followed by those of added it still lacks
+    entries = parse_path(value)
+    present = {normalize_entry(entry) for entry in entries}
+    return ";".join(entries + [entry for entry in added if normalize_entry(entry) not in present])
+
+
+def read_registry_variables(hive, subkey):
+    # {name: (value as stored, registry type)}; %VARIABLES% are left unexpanded
+    import winreg
+    variables = {}
+    try:
+        with winreg.OpenKey(hive, subkey) as key:
+            index = 0
+            while True:
+                try:
+                    name, value, value_type = winreg.EnumValue(key, index)
+                except OSError:
+                    break
+                index += 1
+                variables[name] = (value, value_type)
+    except OSError:
+        pass
+    return variables
+
+
+def machine_variables():
+    import winreg
+    return read_registry_variables(winreg.HKEY_LOCAL_MACHINE, ENVIRONMENT_KEY)
+
+
+def machine_environment():
+    # The current environment with Path and the variables installers set in the
+    # registry (JAVA_HOME, ChocolateyInstall, ...) re-read, so that tools
+    # installed by earlier steps are found without restarting the app
+    env = dict(os.environ)
+    try:
+        import winreg
+    except ImportError:
+        return env
+    paths = []
+    for hive, subkey in ((winreg.HKEY_LOCAL_MACHINE, ENVIRONMENT_KEY), (winreg.HKEY_CURRENT_USER, USER_ENVIRONMENT_KEY)):
+        for name, (value, _) in read_registry_variables(hive, subkey).items():
+            value = os.path.expandvars(str(value))
+            if name.lower() == "path":
+                paths.append(value)
+            else:
+                env[name] = value
+    if paths:
+        env["PATH"] = ";".join(parse_path(";".join(paths + [env.get("PATH", "")])))
+    return env
+
+
+def write_machine_variables(changes, current, added=()):
+    # Writes every change under one open key, keeping each value's registry
+    # type (Path stays REG_EXPAND_SZ), then broadcasts once. Path is read
+    # back under the open key and the added entries merged into that value,
+    # so entries another installer wrote since `current` was read are kept.
+    if not changes:
+        return
+    import winreg
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, ENVIRONMENT_KEY, 0, winreg.KEY_READ | winreg.KEY_WRITE) as key:
+        for name, value in changes.items():
+            stored = variable(current, name)
+            if name.lower() == "path" and added:
+                try:
+                    stored = winreg.QueryValueEx(key, name)
+                except OSError:
+                    pass
+                value = merge_path(stored[0] if stored else None, added)
+            if stored:
+                value_type = stored[1]
+            else:
+                value_type = winreg.REG_EXPAND_SZ if name.lower() == "path" else winreg.REG_SZ
+            winreg.SetValueEx(key, name, 0, value_type, value)
+    broadcast_environment_change()
+
+
+def broadcast_environment_change():
+    # Tell running programs (Explorer, new terminals) to re-read the environment
+    import ctypes
+    HWND_BROADCAST = 0xFFFF
+    WM_SETTINGCHANGE = 0x001A
+    SMTO_ABORTIFHUNG = 0x0002
+    result = ctypes.c_ulong()
+    ctypes.windll.user32.SendMessageTimeoutW(HWND_BROADCAST, WM_SETTINGCHANGE, 0, "Environment",
+                                             SMTO_ABORTIFHUNG, 5000, ctypes.byref(result))
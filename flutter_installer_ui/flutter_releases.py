@@ -0,0 +1,141 @@
+import http.client
+import json
+import re
+import subprocess
+import threading
+
+from app_paths import data_file, write_json_atomic
+from catalog_cache import NotModified, fetch_url
+
+INDEX_FORMAT = 1
+FLUTTER_REPO = "https://github.com/flutter/flutter.git"
+RELEASES_URL = "https://storage.googleapis.com/flutter_infra_release/releases/releases_windows.json"
+CHANNELS = ["stable", "beta", "master"]
+
+# Stable release tags: 3.22.0, and the old v1.12.13+hotfix.9 style
+RELEASE_TAG = re.compile(r"^v?(\d+)\.(\d+)\.(\d+)(?:\+hotfix\.(\d+))?$")
+
+
+def parse_release_tag(tag):
+    match = RELEASE_TAG.match(tag)
+    if not match:
+        return None
+    major, minor, patch, hotfix = match.groups()
+    return (int(major), int(minor), int(patch), int(hotfix or 0))
+
+
+class FlutterReleaseIndex:
+    # Persistent index of Flutter release tags. It is filled from the official
+    # releases manifest (which also gives us archive URLs and checksums) and
+    # falls back to a narrowly filtered `git ls-remote` when that is
+    # unavailable. Refreshing only parses entries we have not seen before.
+
+    def __init__(self, path=None, manifest_url=RELEASES_URL, repo_url=FLUTTER_REPO):
+        self.path = path or data_file("flutter_releases.json")
+        self.manifest_url = manifest_url
+        self.repo_url = repo_url
+        self._lock = threading.Lock()
+        self.validators = {}
+        self.base_url = None
+        self.releases = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("format") != INDEX_FORMAT:
+            return
+        self.validators = data.get("validators", {})
+        self.base_url = data.get("base_url")
+        for tag, release in data.get("releases", {}).items():
+            release["key"] = tuple(release["key"])
+            self.releases[tag] = release
+
+    def save(self):
+        with self._lock:
+            data = {
+                "format": INDEX_FORMAT,
+                "validators": self.validators,
+                "base_url": self.base_url,
+                "releases": {tag: dict(release, key=list(release["key"])) for tag, release in self.releases.items()},
+            }
+        write_json_atomic(self.path, data)
+
+    def refresh(self):
+        # Returns the number of releases added to the index
+        try:
+            added = self._refresh_from_manifest()
+        except NotModified:
+            return 0
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            # URLError is an OSError; a dropped or malformed response raises HTTPException
+            print(f"Flutter releases manifest unavailable ({e}), falling back to git ls-remote")
+            added = self._refresh_from_git()
+        if added:
+            self.save()
+        return added
+
+    def _refresh_from_manifest(self):
+        body, validators = fetch_url(self.manifest_url, self.validators)
+        manifest = json.loads(body)
+        added = 0
+        with self._lock:
+            self.validators = validators
+            self.base_url = manifest.get("base_url", self.base_url)
+            for release in manifest.get("releases", []):
+                tag = release.get("version")
+                if release.get("channel") != "stable" or not tag or tag in self.releases:
+                    continue
+                key = parse_release_tag(tag)
+                if key is None:
+                    continue
+                self.releases[tag] = {
+                    "key": key,
+                    "hash": release.get("hash"),
+                    "archive": release.get("archive"),
+                    "sha256": release.get("sha256"),
+                    "dart_sdk_version": release.get("dart_sdk_version"),
+                }
+                added += 1
+        return added
+
+    def _refresh_from_git(self):
+        # Only ask for tags that start with a digit or "v" instead of every ref in the repository
+        result = subprocess.run(
+            ["git", "ls-remote", "--tags", "--refs", self.repo_url, "refs/tags/[0-9]*", "refs/tags/v[0-9]*"],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        added = 0
+        with self._lock:
+            for line in result.stdout.splitlines():
+                sha, _, ref = line.partition("\t")
+                tag = ref[len("refs/tags/"):]
+                if tag in self.releases:
+                    continue
+                key = parse_release_tag(tag)
+                if key is None:
+                    continue
+                self.releases[tag] = {"key": key, "hash": sha}
+                added += 1
+        return added
+
+    def versions(self):
+        # Newest first
+        with self._lock:
+            return sorted(self.releases, key=lambda tag: self.releases[tag]["key"], reverse=True)
+
+    def release(self, tag):
+        with self._lock:
+            release = self.releases.get(tag)
+            return dict(release) if release else None
+
+    def archive_url(self, tag):
+        release = self.release(tag)
+        if not release or not release.get("archive") or not self.base_url:
+            return None
+        return f"{self.base_url}/{release['archive']}"
@@ -0,0 +1,124 @@
+import os
+import shutil
+
+from download_manager import DownloadError
+from flutter_releases import FLUTTER_REPO, parse_release_tag
+from zip_extract import extract_zip
+
+# Fetches the Flutter SDK without downloading the repository's whole history.
+#
+# Release tags are fetched shallow (depth 1): `git describe` still finds the
+# tag on HEAD, so `flutter --version` is correct. Channels (stable, beta,
+# master) need the commit history for version detection, so they are fetched
+# blobless instead: every commit, but file contents only for the checkout.
+#
+# A local bare mirror (e.g. on a network share, kept current with
+# `git remote update`) can seed the download: the same shallow or blobless
+# fetch is made from the mirror first, so only what it lacks comes from
+# GitHub. The mirror remote is removed afterwards so the SDK does not depend
+# on the share.
+#
+# Work happens in "<destination>.partial" and is renamed into place when
+# complete. Each stage checks what an interrupted run already did, so a rerun
+# picks up from there and git only asks the remote for objects it lacks.
+
+MIRROR_ENV = "FLUTTER_INSTALLER_FLUTTER_MIRROR"
+SOURCE_ENV = "FLUTTER_INSTALLER_FLUTTER_SOURCE"
+
+
+class FlutterSdkError(Exception):
+    pass
+
+
+def is_git_repository(path):
+    # Accepts a bare mirror (flutter.git) or a working clone
+    if not path:
+        return False
+    return os.path.isdir(os.path.join(path, "objects")) or os.path.isdir(os.path.join(path, ".git", "objects"))
+
+
+def is_release_tag(version):
+    return parse_release_tag(version) is not None
+
+
+class FlutterSdkFetcher:
+    def __init__(self, context, git="git", repo_url=FLUTTER_REPO, mirror=None, env=None):
+        # context is an install StepContext (or anything with log/run/progress)
+        self.context = context
+        self.git = git
+        self.repo_url = repo_url
+        self.mirror = mirror if mirror is not None else os.environ.get(MIRROR_ENV)
+        self.env = env
+
+    def _git(self, repo, *args, check=True):
+        code = self.context.run([self.git, "-C", repo] + list(args), env=self.env)
+        if check and code != 0:
+            raise FlutterSdkError(f"git {args[0]} failed with exit code {code}")
+        return code
+
+    def fetch_git(self, version, destination):
+        staging = destination + ".partial"
+        mirror = self.mirror if is_git_repository(self.mirror) else None
+        if self.mirror and not mirror:
+            self.context.log(f"Ignoring Flutter mirror {self.mirror}: not a git repository")
+
+        if os.path.isdir(os.path.join(staging, ".git")):
+            self.context.log(f"Resuming the Flutter download in {staging}")
+            self._git(staging, "remote", "set-url", "origin", self.repo_url)
+        else:
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            self._git(staging, "init", "--quiet")
+            self._git(staging, "remote", "add", "origin", self.repo_url)
+
+        if is_release_tag(version):
+            ref = f"refs/tags/{version}"
+            fetch = ["fetch", "--no-tags", "--depth", "1"]
+            refspec = f"+{ref}:{ref}"
+            checkout = ["checkout", "--quiet", "--force", "--detach", ref]
+        else:
+            # Partial clone: history now, blobs on demand during checkout
+            self._git(staging, "config", "core.repositoryFormatVersion", "1")
+            self._git(staging, "config", "extensions.partialClone", "origin")
+            self._git(staging, "config", "remote.origin.promisor", "true")
+            self._git(staging, "config", "remote.origin.partialCloneFilter", "blob:none")
+            self._git(staging, "config", "remote.origin.fetch", f"+refs/heads/{version}:refs/remotes/origin/{version}")
+            fetch = ["fetch", "--filter=blob:none"]
+            refspec = f"+refs/heads/{version}:refs/remotes/origin/{version}"
+            checkout = ["checkout", "--quiet", "--force", "-B", version, "--track", f"origin/{version}"]
+
+        if mirror:
+            # Take what the mirror has first, then only the difference comes from the remote.
+            # As a promisor remote it is also asked first for the blobs the checkout needs.
+            self.context.log(f"Seeding from the Flutter mirror at {mirror}")
+            self._git(staging, "remote", "remove", "mirror", check=False)
+            self._git(staging, "remote", "add", "mirror", mirror)
+            self._git(staging, "config", "remote.mirror.promisor", "true")
+            # Mirrors are rarely configured to serve partial clones; the local upload-pack can be told to
+            self._git(staging, "config", "remote.mirror.uploadpack", "git -c uploadpack.allowFilter=true upload-pack")
+            if self._git(staging, *(fetch + ["mirror", refspec]), check=False) != 0:
+                self.context.log(f"The mirror does not have {version}; fetching it from {self.repo_url}")
+            elif not is_release_tag(version):
+                # Check out the mirror's commit first so its blobs come from the mirror. Git asks a
+                # promisor remote for all missing blobs at once, so a mirror that lacks only the newest
+                # ones would otherwise leave every blob of the final checkout to the remote.
+                self._git(staging, "checkout", "--quiet", "--force", "--detach", f"refs/remotes/origin/{version}")
+
+        self._git(staging, *(fetch + ["origin", refspec]))
+        self._git(staging, *checkout)
+        if mirror:
+            # The SDK must not depend on the share once installed
+            self._git(staging, "remote", "remove", "mirror")
+
+        os.replace(staging, destination)
+
+    def fetch_archive(self, url, sha256, destination, fetch_artifact):
+        # fetch_artifact(context, url, checksum) returns a local path to the archive
+        try:
+            archive = fetch_artifact(self.context, url, sha256)
+        except DownloadError as e:
+            raise FlutterSdkError(str(e))
+
+        self.context.log("Extracting the Flutter archive...")
+        # The archive holds a single top-level flutter/ folder
+        extract_zip(archive, destination, strip_prefix="flutter")
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+
+from app_paths import data_file, write_json_atomic
+from install_orchestrator import OK, SKIPPED
+
+# What an unfinished install already did, so the next run carries on from
+# where a failure or a reboot stopped it:
+#
+#   {"format": 1, "started": 1718000000.0, "updated": 1718000900.0, "steps": {
+#     "sdk-packages": {"status": "ok", "inputs": {"ndk": "latest", "sdk_root": "..."},
+#                      "outputs": {"ndk": "29.0.14206865"}, "finished": 1718000800.0},
+#     "flutter-precache": {"status": "running", "inputs": {...}, "started": 1718000850.0}}}
+#
+# Each change rewrites the file atomically, so a crash or power cut leaves
+# either the old or the new journal. A step is taken as done only when its
+# recorded inputs (versions, paths) match the new run's and the step's own
+# check confirms the result is still on disk; see InstallStep.verify. The
+# journal is removed once an install succeeds.
+
+JOURNAL_FILE = "install_journal.json"
+RUNNING = "running"
+
+
+def _plain(value):
+    # Inputs and outputs as they read back from JSON (tuples become lists), so they compare equal
+    return json.loads(json.dumps(value, sort_keys=True))
+
+
+class InstallJournal:
+    # Shared by the orchestrator's worker threads; every method takes the lock
+
+    def __init__(self, path=None):
+        self.path = path or data_file(JOURNAL_FILE)
+        self.started = None
+        self.steps = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("format") != 1 or not isinstance(data.get("steps"), dict):
+            return
+        self.started = data.get("started")
+        self.steps = data["steps"]
+
+    def _save(self):
+        if self.started is None:
+            self.started = time.time()
+        try:
+            write_json_atomic(self.path, {"format": 1, "started": self.started, "updated": time.time(), "steps": self.steps})
+        except OSError as e:
+            print(f"Error saving install journal: {e}")
+
+    def completed(self, step_id, inputs):
+        # The journal entry of a step that finished with the same inputs, or None
+        with self._lock:
+            entry = self.steps.get(step_id)
+            if entry and entry.get("status") in (OK, SKIPPED) and entry.get("inputs") == _plain(inputs):
+                return entry
+            return None
+
+    def done(self):
+        with self._lock:
+            return [step_id for step_id, entry in self.steps.items() if entry.get("status") in (OK, SKIPPED)]
+
+    def interrupted(self, step_id):
+        # Whether the step was still running when the previous run ended
+        with self._lock:
+            return self.steps.get(step_id, {}).get("status") == RUNNING
+
+    def begin(self, step_id, inputs):
+        with self._lock:
+            self.steps[step_id] = {"status": RUNNING, "inputs": _plain(inputs), "started": time.time()}
+            self._save()
+
+    def record(self, step_id, status, inputs, outputs=None):
+        with self._lock:
+            self.steps[step_id] = {"status": status, "inputs": _plain(inputs), "outputs": _plain(outputs or {}),
+                                   "finished": time.time()}
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self.steps = {}
+            self.started = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error removing install journal: {e}")
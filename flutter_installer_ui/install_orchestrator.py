@@ -0,0 +1,301 @@
+import os
+import re
+import subprocess
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import telemetry
+
+# Step statuses. A step whose dependency did not finish with OK or SKIPPED is
+# BLOCKED and never runs; unrelated branches of the graph carry on. Steps
+# listed in `after` only order the run: the step waits for them to finish
+# but runs whatever their outcome.
+OK = "ok"
+SKIPPED = "skipped"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+SUBCOMMAND = re.compile(r"^[a-z][\w-]*$")
+
+
+def command_name(args):
+    # "git fetch", "flutter precache", "sdkmanager": the program and its
+    # subcommand, without paths or versions, so runs can be compared
+    name = os.path.splitext(os.path.basename(args[0]))[0]
+    rest = list(args[1:])
+    if rest[:1] == ["-C"]:
+        rest = rest[2:]
+    if rest and SUBCOMMAND.match(rest[0]):
+        name += " " + rest[0]
+    return name
+
+
+class InstallStep:
+    def __init__(self, step_id, title, action, depends_on=(), weight=1, inputs=None, verify=None, after=(),
+                 pooled=True):
+        # action(context) returns OK, SKIPPED or FAILED (None counts as OK).
+        # inputs are what the step's result depends on (versions, paths);
+        # verify(outputs) tells whether the result an earlier run journaled
+        # is still in place. Steps without verify always run. Steps that only
+        # wait for work running elsewhere (the shared Chocolatey run) are not
+        # pooled: they do not take one of the orchestrator's worker slots.
+        self.step_id = step_id
+        self.title = title
+        self.action = action
+        self.depends_on = tuple(depends_on)
+        self.after = tuple(after)
+        self.weight = weight
+        self.inputs = inputs or {}
+        self.verify = verify
+        self.pooled = pooled
+
+
+class StepContext:
+    # Handed to each step's action: everything it logs goes to the step's own
+    # log file and to the orchestrator's on_log callback.
+
+    def __init__(self, orchestrator, step):
+        self.orchestrator = orchestrator
+        self.step = step
+        self.step_id = step.step_id
+        self.outputs = {}
+        self._log_file = None
+        if orchestrator.log_dir:
+            os.makedirs(orchestrator.log_dir, exist_ok=True)
+            self._log_file = open(os.path.join(orchestrator.log_dir, f"{step.step_id}.log"), "w", encoding="utf-8")
+
+    def log(self, line):
+        if not line.endswith("\n"):
+            line += "\n"
+        if self._log_file:
+            self._log_file.write(line)
+            self._log_file.flush()
+        self.orchestrator.on_log(self.step_id, line)
+
+    def progress(self, done, total):
+        self.orchestrator.emit("bytes", step=self.step_id, done=done, total=total)
+
+    def items(self, done, total, detail=None):
+        self.orchestrator.emit("items", step=self.step_id, done=done, total=total, detail=detail)
+
+    def output(self, **fields):
+        # Results worth keeping in the install journal (resolved versions, ...)
+        self.outputs.update(fields)
+
+    def run(self, args, input=None, env=None, cwd=None, on_line=None):
+        # Runs a command without a shell, streaming its output into the step
+        # log; on_line(line) lets the step follow the output as it arrives
+        self.log(f"> {subprocess.list2cmdline(args)}")
+        with telemetry.span("command", command_name(args)) as span:
+            span["status"] = code = self._run(args, input, env, cwd, on_line)
+        return code
+
+    def _run(self, args, input, env, cwd, on_line):
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=env,
+            cwd=cwd,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+        if input is not None:
+            try:
+                process.stdin.write(input)
+                process.stdin.close()
+            except OSError:
+                pass
+        for line in iter(process.stdout.readline, ''):
+            self.log(line)
+            if on_line:
+                on_line(line)
+        process.stdout.close()
+        return process.wait()
+
+    def close(self):
+        if self._log_file:
+            self._log_file.close()
+
+
+def run_action(step, context):
+    return step.action(context)
+
+
+def simulated_executor(durations, failures=(), clock_scale=1.0):
+    # Dry-run executor: each step just sleeps for its simulated duration.
+    # Used to check scheduling and to estimate the speedup of a plan.
+    def execute(step, context):
+        time.sleep(durations.get(step.step_id, 0) * clock_scale)
+        context.log(f"[dry run] {step.title}")
+        return FAILED if step.step_id in failures else OK
+    return execute
+
+
+class InstallOrchestrator:
+    # Runs install steps as a dependency graph: every step whose
+    # dependencies have succeeded is started, up to `max_workers` at a time
+    # (steps that are not pooled run besides those).
+    #
+    # Progress is reported through on_event(dict) using the same events as
+    # the script's progress protocol (plan/start/bytes/end), so the UI's
+    # ProgressTracker can consume either.
+    #
+    # With an InstallJournal, steps an unfinished earlier run completed are
+    # skipped when their inputs match and their results are still in place,
+    # and the journal is removed once the whole install has succeeded.
+
+    def __init__(self, steps, max_workers=3, log_dir=None, on_log=None, on_event=None, executor=None, journal=None):
+        self.steps = {step.step_id: step for step in steps}
+        self.order = [step.step_id for step in steps]
+        self.max_workers = max_workers
+        self.log_dir = log_dir
+        self._on_log = on_log
+        self._on_event = on_event
+        self.executor = executor or run_action
+        self.journal = journal
+        self.results = {}
+        self.outputs = {}
+        self.durations = {}
+        self._validate()
+
+    def _validate(self):
+        for step in self.steps.values():
+            for dependency in step.depends_on + step.after:
+                if dependency not in self.steps:
+                    raise ValueError(f"Step {step.step_id} depends on unknown step {dependency}")
+        # Depth-first search for cycles
+        visiting, done = set(), set()
+
+        def visit(step_id):
+            if step_id in done:
+                return
+            if step_id in visiting:
+                raise ValueError(f"Dependency cycle through step {step_id}")
+            visiting.add(step_id)
+            for dependency in self.steps[step_id].depends_on + self.steps[step_id].after:
+                visit(dependency)
+            visiting.discard(step_id)
+            done.add(step_id)
+
+        for step_id in self.order:
+            visit(step_id)
+
+    def on_log(self, step_id, line):
+        if self._on_log:
+            self._on_log(step_id, line)
+
+    def emit(self, event, **fields):
+        if self._on_event:
+            self._on_event(dict(fields, event=event))
+
+    def run(self):
+        self.emit("plan", steps=[{"id": s.step_id, "title": s.title, "weight": s.weight} for s in self.steps.values()])
+        if self.journal is not None and self.journal.steps:
+            done = [step_id for step_id in self.order if step_id in self.journal.done()]
+            self.on_log("installer", f"Resuming the install started {time.ctime(self.journal.started)}; "
+                                     f"done before: {', '.join(done) or 'nothing'}\n")
+
+        pending = list(self.order)
+        running = {}
+        waiters = max(1, sum(1 for step in self.steps.values() if not step.pooled))
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="install") as pool, \
+                ThreadPoolExecutor(max_workers=waiters, thread_name_prefix="install-wait") as waiting:
+            while pending or running:
+                for step_id in list(pending):
+                    state = self._readiness(step_id)
+                    busy = sum(1 for running_id in running.values() if self.steps[running_id].pooled)
+                    if state == BLOCKED:
+                        pending.remove(step_id)
+                        self._finish(step_id, BLOCKED)
+                    elif state == OK and not self.steps[step_id].pooled:
+                        pending.remove(step_id)
+                        running[waiting.submit(self._execute, step_id)] = step_id
+                    elif state == OK and busy < self.max_workers:
+                        pending.remove(step_id)
+                        running[pool.submit(self._execute, step_id)] = step_id
+
+                if not running:
+                    if pending:
+                        # Only reachable if readiness could never change; treat as blocked
+                        for step_id in pending:
+                            self._finish(step_id, BLOCKED)
+                        pending = []
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    self._finish(step_id, future.result())
+        if self.journal is not None and self.succeeded():
+            self.journal.clear()
+        return dict(self.results)
+
+    def _readiness(self, step_id):
+        statuses = [self.results.get(dependency) for dependency in self.steps[step_id].depends_on]
+        if any(status in (FAILED, BLOCKED) for status in statuses):
+            return BLOCKED
+        finished = all(dependency in self.results for dependency in self.steps[step_id].after)
+        if finished and all(status in (OK, SKIPPED) for status in statuses):
+            return OK
+        return None
+
+    def _execute(self, step_id):
+        step = self.steps[step_id]
+        context = StepContext(self, step)
+        self.emit("start", step=step_id)
+        started = time.monotonic()
+        telemetry.set_step(step_id)
+        # The critical path follows whatever the step waited for, ordering-only steps included
+        with telemetry.span("step", step_id, depends_on=list(step.depends_on + step.after)) as span:
+            try:
+                if self._already_done(step, context):
+                    status = SKIPPED
+                else:
+                    if self.journal is not None:
+                        if self.journal.interrupted(step_id):
+                            context.log(f"Resuming {step.title}: the previous run stopped during this step.")
+                        self.journal.begin(step_id, step.inputs)
+                    status = self.executor(step, context) or OK
+            except Exception:
+                context.log(traceback.format_exc())
+                status = FAILED
+            finally:
+                self.durations[step_id] = time.monotonic() - started
+                self.outputs[step_id] = context.outputs
+                context.close()
+            span["status"] = status
+        telemetry.set_step(None)
+        if self.journal is not None:
+            self.journal.record(step_id, status, step.inputs, context.outputs)
+        return status
+
+    def _already_done(self, step, context):
+        # Completed by an earlier run with the same inputs, and still in place
+        if self.journal is None or step.verify is None:
+            return False
+        entry = self.journal.completed(step.step_id, step.inputs)
+        if entry is None:
+            return False
+        try:
+            in_place = step.verify(entry.get("outputs", {}))
+        except OSError:
+            in_place = False
+        if not in_place:
+            context.log(f"{step.title} was done by an earlier run but its results are gone; running it again.")
+            return False
+        context.outputs.update(entry.get("outputs", {}))
+        context.log(f"{step.title} was completed by an earlier run; skipping it.")
+        return True
+
+    def _finish(self, step_id, status):
+        self.results[step_id] = status
+        if status == BLOCKED:
+            blockers = [d for d in self.steps[step_id].depends_on if self.results.get(d) in (FAILED, BLOCKED)]
+            self.on_log(step_id, f"Skipping {self.steps[step_id].title}: depends on {', '.join(blockers)}\n")
+        self.emit("end", step=step_id, status=status)
+
+    def succeeded(self):
+        return all(status in (OK, SKIPPED) for status in self.results.values())
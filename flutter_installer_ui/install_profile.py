@@ -0,0 +1,122 @@
+import json
+
+from component_registry import default_selection, registry, versioned_components
+from versions import VersionIndex
+
+# A profile names the version of each component to install, e.g.
+#
+#   {"format": 1, "flutter": "3.24.5", "git": "latest", "openjdk": "auto",
+#    "ndk": "latest", "android_studio": "latest", "precache": ["android", "windows"],
+#    "components": ["googlechrome"]}
+#
+# The version entries are the keys of the registry's components with a
+# version choice (see component_registry.py). Missing components and "auto"
+# get the versions the Auto Configure button picks. "precache" lists the
+# platforms whose Flutter engine artifacts are downloaded while the rest of
+# the install runs. "components" lists the optional components to install;
+# without it, those selected by default are. Fleet images keep one profile
+# per machine type so every machine is provisioned with the same toolchain.
+
+PROFILE_FORMAT = 1
+AUTO = "auto"
+OPENJDK_SERIES = (17,)
+# Platforms `flutter precache` can warm up on a Windows host
+PRECACHE_PLATFORMS = ("android", "windows", "web")
+DEFAULT_PRECACHE = ("android", "windows")
+
+
+class ProfileError(Exception):
+    pass
+
+
+def recommended_openjdk(openjdk_versions):
+    # The newest 17.x release; Flutter's Gradle setup is tested against JDK 17
+    newest = VersionIndex(openjdk_versions).newest(OPENJDK_SERIES)
+    return newest.text if newest else "17"
+
+
+def profile_keys():
+    return [component.key for component in versioned_components()]
+
+
+def recommended_profile(catalog=None):
+    # catalog(component) returns its version list; it is only called for
+    # components whose recommendation depends on it (OpenJDK)
+    profile = {}
+    for component in versioned_components():
+        versions = catalog(component) if catalog and component.recommend is not None else ()
+        profile[component.key] = component.recommended_version(versions)
+    return profile
+
+
+def parse_profile(data):
+    if not isinstance(data, dict):
+        raise ProfileError("A profile must be a JSON object")
+    if data.get("format", PROFILE_FORMAT) != PROFILE_FORMAT:
+        raise ProfileError(f"Unsupported profile format {data.get('format')!r}")
+    unknown = sorted(set(data) - set(profile_keys()) - {"format", "precache", "components"})
+    if unknown:
+        raise ProfileError(f"Unknown profile entries: {', '.join(unknown)}")
+    profile = {}
+    for component in profile_keys():
+        value = data.get(component, AUTO)
+        if not isinstance(value, str) or not value.strip():
+            raise ProfileError(f"{component} must be a version string")
+        profile[component] = value.strip()
+    profile["precache"] = parse_platforms(data.get("precache", list(DEFAULT_PRECACHE)))
+    if "components" in data:
+        profile["components"] = parse_components(data["components"])
+    return profile
+
+
+def parse_components(keys):
+    # Optional component keys, as a list or a comma-separated string
+    if isinstance(keys, str):
+        keys = [key.strip() for key in keys.split(",") if key.strip()]
+    if not isinstance(keys, list) or not all(isinstance(key, str) for key in keys):
+        raise ProfileError("components must be a list of component keys")
+    optional = [component.key for component in registry().values() if component.optional]
+    unknown = sorted(set(keys) - set(optional))
+    if unknown:
+        raise ProfileError(f"Unknown optional components: {', '.join(unknown)} "
+                           f"(choose from {', '.join(optional) or 'none; see components.json'})")
+    return [key for key in optional if key in keys]
+
+
+def parse_platforms(platforms):
+    # A list, or a comma-separated string as given on the command line
+    if isinstance(platforms, str):
+        platforms = [p.strip() for p in platforms.split(",") if p.strip()]
+    if not isinstance(platforms, list) or not all(isinstance(p, str) for p in platforms):
+        raise ProfileError("precache must be a list of platforms")
+    unknown = sorted(set(platforms) - set(PRECACHE_PLATFORMS))
+    if unknown:
+        raise ProfileError(f"Unknown precache platforms: {', '.join(unknown)} (choose from {', '.join(PRECACHE_PLATFORMS)})")
+    return [p for p in PRECACHE_PLATFORMS if p in platforms]
+
+
+def load_profile(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError as e:
+        raise ProfileError(f"Cannot read profile {path}: {e}")
+    except ValueError as e:
+        raise ProfileError(f"Profile {path} is not valid JSON: {e}")
+    return parse_profile(data)
+
+
+def resolve_profile(profile, catalog=None):
+    # Replaces "auto" with the recommended version. catalog(component) is
+    # only called (it reads the component's feed) for a component left on
+    # auto whose recommendation depends on the available versions.
+    resolved = {}
+    for component in versioned_components():
+        value = profile.get(component.key, AUTO)
+        if value == AUTO:
+            versions = catalog(component) if catalog and component.recommend is not None else ()
+            value = component.recommended_version(versions)
+        resolved[component.key] = value
+    resolved["precache"] = list(profile.get("precache", DEFAULT_PRECACHE))
+    resolved["components"] = list(profile.get("components", default_selection()))
+    return resolved
@@ -0,0 +1,419 @@
+import os
+import pathlib
+import re
+import shutil
+
+from app_paths import data_file
+from artifact_cache import artifact_cache
+from chocolatey_batch import ChocolateyBatch
+from component_registry import selected_components
+from download_manager import ChunkedDownloader, DownloadError
+from environment_config import machine_environment, machine_variables, plan_environment, required_path_entries, write_machine_variables
+from flutter_sdk import SOURCE_ENV, FlutterSdkError, FlutterSdkFetcher
+from install_orchestrator import FAILED, OK, SKIPPED, InstallStep
+from install_profile import DEFAULT_PRECACHE
+from system_probes import android_sdk_root
+from tool_detection import which
+from zip_extract import extract_zip
+
+# The installation as a dependency graph. It mirrors the sections of
+# install_flutter_windows.ps1 (same step ids, titles and weights, so progress
+# looks the same either way) but lets independent work overlap: the
+# command-line tools download does not wait for Chocolatey, the Flutter
+# clone only waits for Git, and the Flutter tool cache is warmed up while
+# Android Studio and the NDK are installed. The environment is written once
+# Chocolatey's packages, which change Path too, are in.
+#
+# Each component in component_registry.py names the factory below that
+# builds its steps from the InstallPlan, and the components it waits for.
+
+FLUTTER_ROOT = "C:\\flutter"
+CHOCOLATEY_INSTALL_SCRIPT = "https://community.chocolatey.org/install.ps1"
+# Fallbacks for when the Android repository manifest cannot be read
+CMDLINE_TOOLS_URL = "https://dl.google.com/android/repository/commandlinetools-win-11076708_latest.zip"
+DEFAULT_NDK_VERSION = "29.0.14206865"
+LICENSE_ANSWERS = "y\n" * 10
+# `flutter precache` progress: the tool build and Dart SDK, the shared artifacts, and per platform
+PRECACHE_ITEM = re.compile(r"^(?:Downloading|Building) (.+?)\.\.\.")
+PRECACHE_COMMON_ITEMS = 8
+PRECACHE_PLATFORM_ITEMS = {"android": 9, "windows": 4, "web": 2}
+# Steps `flutter doctor` cannot run without, when they are in the plan
+DOCTOR_NEEDS = ("flutter", "flutter-precache", "sdk-packages")
+
+
+def chocolatey_cache_dir():
+    path = data_file("chocolatey-cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _executable(name, env):
+    return shutil.which(name, path=env.get("PATH")) or name
+
+
+def chocolatey_action(context):
+    if which("choco"):
+        context.log("Chocolatey is already installed.")
+        return SKIPPED
+    context.log("Chocolatey not found. Installing...")
+    command = (
+        "[System.Net.ServicePointManager]::SecurityProtocol = "
+        "[System.Net.ServicePointManager]::SecurityProtocol -bor [System.Net.SecurityProtocolType]::Tls12; "
+        f"Invoke-Expression ((New-Object System.Net.WebClient).DownloadString('{CHOCOLATEY_INSTALL_SCRIPT}'))"
+    )
+    code = context.run(["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command])
+    return OK if code == 0 else FAILED
+
+
+def offline_chocolatey_action(script, package):
+    # Runs a bundled copy of the install script; it installs the package
+    # named by chocolateyDownloadUrl instead of downloading the latest one
+    def action(context):
+        if which("choco"):
+            context.log("Chocolatey is already installed.")
+            return SKIPPED
+        context.log("Chocolatey not found. Installing from the offline bundle...")
+        env = dict(os.environ, chocolateyDownloadUrl=pathlib.Path(package).as_uri())
+        code = context.run(["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", script], env=env)
+        return OK if code == 0 else FAILED
+    return action
+
+
+def chocolatey_package_action(batch, package_id):
+    # The package steps share one Chocolatey run (see chocolatey_batch.py);
+    # whichever starts first starts it, and each finishes with its own package
+    def action(context):
+        env = machine_environment()
+        batch.start(_executable("choco", env), env, chocolatey_cache_dir())
+        status = batch.wait(package_id, context)
+        if batch.reboot_required:
+            # The journal keeps what is done, so the install picks up from here after the restart
+            context.log("Chocolatey asked for a restart. If a later step fails, restart Windows and run the installer again.")
+            context.output(reboot_required=True)
+        return status
+    return action
+
+
+def flutter_action(version, flutter_root=FLUTTER_ROOT, archive=None, use_archive=False):
+    # archive is (url, sha256) of the release archive, used when
+    # FLUTTER_INSTALLER_FLUTTER_SOURCE=archive or use_archive is set
+    def action(context):
+        if os.path.exists(flutter_root):
+            context.log("Flutter SDK directory already exists. Skipping clone.")
+            return SKIPPED
+        env = machine_environment()
+        fetcher = FlutterSdkFetcher(context, git=_executable("git", env), env=env)
+        try:
+            if archive and (use_archive or os.environ.get(SOURCE_ENV) == "archive"):
+                context.log(f"Downloading the Flutter {version} release archive...")
+                fetcher.fetch_archive(archive[0], archive[1], flutter_root, fetch_artifact)
+            else:
+                context.log(f"Fetching the Flutter SDK ({version})...")
+                fetcher.fetch_git(version, flutter_root)
+        except FlutterSdkError as e:
+            context.log(str(e))
+            return FAILED
+        return OK
+    return action
+
+
+def fetch_artifact(context, url, checksum=None, algorithm="sha256"):
+    # Every archive goes through the artifact cache; only misses are downloaded
+    def download(url, path):
+        ChunkedDownloader().download(url, path, checksum, algorithm, on_progress=context.progress, log=context.log)
+    return artifact_cache().fetch(url, checksum, algorithm, download, log=context.log)
+
+
+def cmdline_tools_archive(repository):
+    # (url, checksum, algorithm) of the current Windows command-line tools
+    if repository is not None and repository.ensure_loaded():
+        archive = repository.archive("cmdline-tools;latest")
+        if archive:
+            return archive["url"], archive.get("checksum"), archive.get("algorithm", "sha1")
+    return CMDLINE_TOOLS_URL, None, "sha1"
+
+
+def cmdline_tools_action(sdk_root, repository=None, tools_archive=None):
+    # tools_archive: (url, checksum, algorithm) to use instead of the manifest's
+    def action(context):
+        latest_dir = os.path.join(sdk_root, "cmdline-tools", "latest")
+        if os.path.isfile(os.path.join(latest_dir, "bin", "sdkmanager.bat")):
+            context.log("Android Command-line Tools already found.")
+            return SKIPPED
+        context.log("Android Command-line Tools not found. Downloading and installing...")
+        url, checksum, algorithm = tools_archive or cmdline_tools_archive(repository)
+        try:
+            archive = fetch_artifact(context, url, checksum, algorithm)
+        except DownloadError as e:
+            context.log(str(e))
+            return FAILED
+        # The archive's top-level cmdline-tools/ folder becomes latest/
+        extract_zip(archive, latest_dir, strip_prefix="cmdline-tools")
+        context.log("Android Command-line Tools installed.")
+        return OK
+    return action
+
+
+def resolve_ndk_version(ndk_version, repository=None):
+    # Older catalogs listed the package name ("ndk;x.y.z") rather than the version
+    if ndk_version and ndk_version.startswith("ndk;"):
+        ndk_version = ndk_version[len("ndk;"):]
+    if ndk_version and ndk_version != "latest":
+        return ndk_version
+    if repository is not None and repository.ensure_loaded():
+        latest = repository.latest_ndk()
+        if latest:
+            return latest
+    return DEFAULT_NDK_VERSION
+
+
+def sdk_packages_action(sdk_root, ndk_version, repository=None):
+    def action(context):
+        env = machine_environment()
+        sdkmanager = os.path.join(sdk_root, "cmdline-tools", "latest", "bin", "sdkmanager.bat")
+        sdk_arg = f"--sdk_root={sdk_root}"
+        context.run([sdkmanager, "--licenses", sdk_arg], input=LICENSE_ANSWERS, env=env)
+        codes = [context.run([sdkmanager, "cmdline-tools;latest", sdk_arg], env=env)]
+        ndk = resolve_ndk_version(ndk_version, repository)
+        context.output(ndk=ndk)
+        context.log(f"Installing NDK {ndk}")
+        codes.append(context.run([sdkmanager, f"ndk;{ndk}", sdk_arg], env=env))
+        return OK if not any(codes) else FAILED
+    return action
+
+
+def offline_sdk_packages_action(sdk_root, ndk_version, ndk_archive):
+    # sdkmanager cannot install from local files, so the bundled NDK archive is
+    # extracted into ndk/<version>, where sdkmanager would have put it
+    def action(context):
+        env = machine_environment()
+        sdkmanager = os.path.join(sdk_root, "cmdline-tools", "latest", "bin", "sdkmanager.bat")
+        code = context.run([sdkmanager, "--licenses", f"--sdk_root={sdk_root}"], input=LICENSE_ANSWERS, env=env)
+        context.output(ndk=ndk_version)
+        ndk_dir = os.path.join(sdk_root, "ndk", ndk_version)
+        if os.path.isdir(ndk_dir):
+            context.log(f"NDK {ndk_version} already found.")
+            return OK if code == 0 else FAILED
+        context.log(f"Installing NDK {ndk_version} from the offline bundle")
+        try:
+            archive = fetch_artifact(context, *ndk_archive)
+        except DownloadError as e:
+            context.log(str(e))
+            return FAILED
+        extract_zip(archive, ndk_dir, strip_prefix="auto", progress=context.progress)
+        return OK if code == 0 else FAILED
+    return action
+
+
+def sdk_packages_in_place(sdk_root):
+    # The journal's check for the SDK packages step: the accepted licenses and
+    # the NDK version it installed are still there
+    def verify(outputs):
+        ndk = outputs.get("ndk")
+        return (bool(ndk)
+                and os.path.isfile(os.path.join(sdk_root, "ndk", ndk, "source.properties"))
+                and os.path.isdir(os.path.join(sdk_root, "licenses"))
+                and os.path.isfile(os.path.join(sdk_root, "cmdline-tools", "latest", "bin", "sdkmanager.bat")))
+    return verify
+
+
+def environment_action(sdk_root, flutter_root=FLUTTER_ROOT):
+    def action(context):
+        try:
+            current = machine_variables()
+        except ImportError:
+            context.log("The registry is only available on Windows.")
+            return FAILED
+        changes, added = plan_environment({name: value for name, (value, _) in current.items()}, sdk_root, flutter_root)
+        if "ANDROID_HOME" in changes:
+            context.log(f"ANDROID_HOME set to {sdk_root}")
+        else:
+            context.log(f"ANDROID_HOME already set to {sdk_root}")
+        for path in required_path_entries(sdk_root, flutter_root):
+            context.log(f"Adding '{path}' to PATH." if path in added else f"'{path}' already in PATH.")
+        if not changes:
+            return SKIPPED
+        write_machine_variables(changes, current, added)
+        return OK
+    return action
+
+
+def flutter_precache_action(platforms, flutter_root=FLUTTER_ROOT):
+    # The first run of the Flutter tool downloads the Dart SDK, builds the
+    # tool's snapshot and fetches engine artifacts. Doing that here, as soon
+    # as the SDK is in place, overlaps it with the Android installs and
+    # leaves `flutter doctor` with nothing to download.
+    def action(context):
+        env = machine_environment()
+        flutter = os.path.join(flutter_root, "bin", "flutter.bat")
+        # Flutter prints one "Downloading <artifact>..." line per archive; the
+        # total is an estimate, so progress is approximate until the step ends
+        total = PRECACHE_COMMON_ITEMS + sum(PRECACHE_PLATFORM_ITEMS.get(p, 1) for p in platforms)
+        done = [0]
+
+        def on_line(line):
+            match = PRECACHE_ITEM.match(line.strip())
+            if match:
+                done[0] += 1
+                context.items(done[0], max(total, done[0] + 1), match.group(1))
+
+        context.log(f"Warming up the Flutter tool cache for {', '.join(platforms)}...")
+        args = [flutter, "precache"] + [f"--{platform}" for platform in platforms]
+        code = context.run(args, env=env, on_line=on_line)
+        return OK if code == 0 else FAILED
+    return action
+
+
+def flutter_cache_in_place(flutter_root=FLUTTER_ROOT):
+    # The Dart SDK and the tool snapshot are what the warm-up leaves behind
+    def verify(outputs):
+        cache = os.path.join(flutter_root, "bin", "cache")
+        return (os.path.isfile(os.path.join(cache, "dart-sdk", "bin", "dart.exe"))
+                and os.path.isfile(os.path.join(cache, "flutter_tools.snapshot")))
+    return verify
+
+
+def flutter_doctor_action(flutter_root=FLUTTER_ROOT):
+    def action(context):
+        env = machine_environment()
+        flutter = os.path.join(flutter_root, "bin", "flutter.bat")
+        context.log("Running 'flutter doctor' to validate the installation...")
+        context.run([flutter, "doctor"], env=env)
+        context.log("Attempting to automatically accept Android SDK licenses...")
+        context.run([flutter, "doctor", "--android-licenses"], input=LICENSE_ANSWERS, env=env)
+        # Like the script, doctor findings are reported but do not fail the install
+        return OK
+    return action
+
+
+def chocolatey_install_order(components):
+    # Chocolatey installs packages in the order listed: first those other
+    # components wait for (Git for the Flutter clone, OpenJDK for sdkmanager),
+    # then the rest (Android Studio is only needed by doctor)
+    needed = {key for component in components for key in component.depends_on}
+    packaged = [component for component in components if component.package]
+    return sorted(packaged, key=lambda component: component.key not in needed)
+
+
+class InstallPlan:
+    # What the selected components' step factories share: their versions,
+    # the Android SDK folder, the catalogs, an offline bundle and the one
+    # Chocolatey run for all packages
+
+    def __init__(self, components, versions, sdk_root, flutter_releases=None, android_repository=None, bundle=None,
+                 precache_platforms=DEFAULT_PRECACHE):
+        self.components = list(components)
+        self.versions = versions
+        self.sdk_root = sdk_root
+        self.flutter_releases = flutter_releases
+        self.android_repository = android_repository
+        self.bundle = bundle
+        # Warming up needs the network, so an offline install skips it; the archive already carries the Dart SDK
+        self.precache_platforms = () if bundle is not None else tuple(precache_platforms)
+        self.batch = ChocolateyBatch([(component.package, self.version(component))
+                                      for component in chocolatey_install_order(self.components)],
+                                     source=bundle.chocolatey_source() if bundle is not None else None)
+
+    def version(self, component):
+        return self.versions.get(component.key) or component.default_version
+
+    def after(self, component):
+        # Step ids of the selected components this one waits for
+        steps = {entry.key: entry.step_id for entry in self.components}
+        return [steps[key] for key in component.depends_on if key in steps]
+
+
+def chocolatey_steps(plan, component):
+    if plan.bundle is not None:
+        script = plan.bundle.path(plan.bundle.find("chocolatey-script"))
+        action = offline_chocolatey_action(script, plan.bundle.chocolatey_package())
+    else:
+        action = chocolatey_action
+    return [InstallStep(component.step_id, component.name, action, plan.after(component), weight=component.weight)]
+
+
+def package_steps(plan, component):
+    # Chocolatey does the work on the batch's own thread; the step only waits for its package
+    return [InstallStep(component.step_id, component.name, chocolatey_package_action(plan.batch, component.package),
+                        plan.after(component), weight=component.weight, pooled=False)]
+
+
+def flutter_steps(plan, component):
+    version = plan.version(component)
+    if plan.bundle is not None:
+        # The archive needs no Git, but the SDK's own tooling does
+        url, sha256, _ = plan.bundle.archive("flutter")
+        action = flutter_action(version, archive=(url, sha256), use_archive=True)
+    else:
+        archive = None
+        releases = plan.flutter_releases
+        if releases is not None and releases.archive_url(version):
+            archive = (releases.archive_url(version), releases.release(version).get("sha256"))
+        action = flutter_action(version, archive=archive)
+    steps = [InstallStep(component.step_id, component.name, action, plan.after(component), weight=component.weight)]
+    # No platforms (or a mounted bundle, which carries no tool cache) means no warm-up step at all
+    platforms = plan.precache_platforms
+    if platforms:
+        steps.append(InstallStep("flutter-precache", "Flutter Tool Cache", flutter_precache_action(platforms),
+                                 [component.step_id], weight=10,
+                                 inputs={"flutter": version, "platforms": sorted(platforms)},
+                                 verify=flutter_cache_in_place()))
+    return steps
+
+
+def cmdline_tools_steps(plan, component):
+    if plan.bundle is not None:
+        action = cmdline_tools_action(plan.sdk_root, tools_archive=plan.bundle.archive("cmdline-tools"))
+    else:
+        action = cmdline_tools_action(plan.sdk_root, plan.android_repository)
+    return [InstallStep(component.step_id, component.name, action, plan.after(component), weight=component.weight)]
+
+
+def sdk_packages_steps(plan, component):
+    # The NDK, with the licenses and the current command-line tools
+    version = plan.version(component)
+    if plan.bundle is not None:
+        action = offline_sdk_packages_action(plan.sdk_root, version, plan.bundle.archive("ndk"))
+    else:
+        action = sdk_packages_action(plan.sdk_root, version, plan.android_repository)
+    return [InstallStep(component.step_id, "Android SDK Packages and NDK", action, plan.after(component),
+                        weight=component.weight, inputs={"sdk_root": plan.sdk_root, "ndk": version},
+                        verify=sdk_packages_in_place(plan.sdk_root))]
+
+
+def environment_steps(plan, component):
+    # Chocolatey and the packages it installs write the machine Path too, so
+    # the step runs after them (whatever their outcome) rather than racing them
+    writers = [entry.step_id for entry in plan.components if entry.package or entry.key == "chocolatey"]
+    return [InstallStep(component.step_id, component.name, environment_action(plan.sdk_root), plan.after(component),
+                        weight=component.weight, after=writers)]
+
+
+def build_install_plan(versions=None, sdk_root=None, flutter_releases=None, android_repository=None, bundle=None,
+                       precache_platforms=DEFAULT_PRECACHE, components=None):
+    # versions: {component key: version}, e.g. a resolved profile; missing
+    # ones get the component's default. components: the registry entries to
+    # install, by default the required ones and the extras selected by
+    # default. With an OfflineBundle every version comes from the bundle's
+    # profile and every artifact from the bundle itself.
+    sdk_root = sdk_root or android_sdk_root()
+    if bundle is not None:
+        # Bundles exported before optional components existed hold none
+        versions = dict(bundle.profile)
+        versions.setdefault("components", [])
+    versions = versions or {}
+    if components is None:
+        components = selected_components(versions.get("components"))
+    plan = InstallPlan(components, versions, sdk_root, flutter_releases, android_repository, bundle, precache_platforms)
+    steps = []
+    for component in plan.components:
+        if component.install is not None:
+            steps.extend(component.install(plan, component))
+    # Doctor needs the SDK and the Android packages whose licenses it accepts.
+    # It runs last to validate whatever else was installed, but a failed
+    # extra (or Android Studio) does not keep it from running.
+    needed = [step.step_id for step in steps if step.step_id in DOCTOR_NEEDS]
+    others = [step.step_id for step in steps if step.step_id not in DOCTOR_NEEDS]
+    steps.append(InstallStep("flutter-doctor", "Flutter Doctor", flutter_doctor_action(), needed, weight=4,
+                             after=others))
+    return steps
@@ -0,0 +1,74 @@
+import queue
+
+
+class LogPipeline:
+    # Hand-off between a reader thread and the UI: the reader only ever
+    # touches the queue, never a Tk widget.
+
+    def __init__(self):
+        self._lines = queue.SimpleQueue()
+
+    def push(self, line):
+        self._lines.put(line)
+
+    def drain(self, max_lines=5000):
+        lines = []
+        try:
+            while len(lines) < max_lines:
+                lines.append(self._lines.get_nowait())
+        except queue.Empty:
+            pass
+        return lines
+
+
+class TextWidgetLog:
+    # Drains a LogPipeline into a Text widget on a fixed tick with a single
+    # insert per batch, and trims the oldest lines so the widget never holds
+    # more than `max_lines`. Must be started from the Tk thread.
+
+    def __init__(self, widget, pipeline, interval_ms=50, max_lines=5000, on_batch=None, on_tick=None):
+        self.widget = widget
+        self.pipeline = pipeline
+        self.interval_ms = interval_ms
+        self.max_lines = max_lines
+        self.on_batch = on_batch
+        self.on_tick = on_tick
+        self.stats = {"ticks": 0, "batches": 0, "lines": 0, "trimmed": 0}
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self.flush()
+
+    def flush(self):
+        lines = self.pipeline.drain()
+        if not lines:
+            return 0
+        self.widget.insert("end", "".join(lines))
+        self._trim()
+        self.widget.see("end")
+        self.stats["batches"] += 1
+        self.stats["lines"] += len(lines)
+        if self.on_batch:
+            self.on_batch(lines)
+        return len(lines)
+
+    def _tick(self):
+        self.stats["ticks"] += 1
+        self.flush()
+        if self.on_tick:
+            self.on_tick()
+        self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def _trim(self):
+        line_count = int(self.widget.index("end-1c").split(".")[0])
+        excess = line_count - self.max_lines
+        if excess > 0:
+            self.widget.delete("1.0", f"{excess + 1}.0")
+            self.stats["trimmed"] += excess
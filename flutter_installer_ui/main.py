@@ -1,19 +1,46 @@
-import tkinter as tk
-from tkinter import ttk, scrolledtext, font
-import subprocess
+from startup_report import report as startup
+
+with startup.importing("tkinter"):
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext, font
 import ctypes
 import os
 import sys
 import threading
-import webbrowser
-import urllib.request
-import xml.etree.ElementTree as ET
-import json
 from datetime import datetime
 
+# Only what the first window needs is imported here. The network and XML
+# stacks (urllib, http.client, ElementTree), the installer modules and
+# webbrowser are imported where they are used, after the window is shown.
+# Each import is timed on its own in the startup report.
+with startup.importing("component_registry"):
+    import component_registry
+with startup.importing("telemetry"):
+    import telemetry
+with startup.importing("catalog_cache"):
+    from catalog_cache import CatalogCache
+with startup.importing("catalog_loader"):
+    from catalog_loader import VersionCatalogLoader
+with startup.importing("install_profile"):
+    from install_profile import DEFAULT_PRECACHE, PRECACHE_PLATFORMS
+with startup.importing("log_pipeline"):
+    from log_pipeline import LogPipeline, TextWidgetLog
+with startup.importing("progress_protocol"):
+    from progress_protocol import ProgressTracker
+with startup.importing("probe_state"):
+    from probe_state import ProbeStateStore
+with startup.importing("system_probes"):
+    from system_probes import READY_STATUSES, check_admin_privileges, run_system_check
+with startup.importing("version_catalogs"):
+    from version_catalogs import CatalogClients
+
 class FlutterInstallerUI(tk.Tk):
     def __init__(self):
         super().__init__()
+        # Keep the main window hidden while it is built; the splash is painted straight away
+        self.withdraw()
+        splash = self._show_splash()
+        startup.mark("splash")
         self.title("Flutter Development Environment Installer")
         self.geometry("900x750")
         self.configure(bg='#f0f0f0')
@@ -36,213 +63,66 @@ class FlutterInstallerUI(tk.Tk):
         
         self.log_file = os.path.join(os.path.expanduser("~"), "flutter_installer.log")
 
-        self.components = {
-            "Administrator Privileges": {"status": "Not Checked", "description": "Required for installation", "icon": "🔐"},
-            "Chocolatey": {"status": "Not Checked", "description": "Package manager for Windows", "icon": "📦"},
-            "Git": {"status": "Not Checked", "description": "Version control system", "icon": "🔀"},
-            "Android Studio": {"status": "Not Checked", "description": "Official IDE for Android development", "icon": "📱"},
-            "OpenJDK": {"status": "Not Checked", "description": "Java development kit", "icon": "☕"},
-            "Flutter SDK": {"status": "Not Checked", "description": "Flutter framework and tools", "icon": "🎯"},
-            "Android SDK Command-line Tools": {"status": "Not Checked", "description": "Android development tools", "icon": "🛠️"},
-            "NDK": {"status": "Not Checked", "description": "Native development kit", "icon": "⚙️"},
-            "Environment Variables": {"status": "Not Checked", "description": "System PATH configuration", "icon": "🌍"},
-        }
+        # One card per registered component (see component_registry.py)
+        self.components = {}
+        for entry in component_registry.components():
+            status = "Not Checked" if entry.selected or not entry.optional else "Not Selected"
+            self.components[entry.name] = {"status": status, "description": entry.description, "icon": entry.icon,
+                                           "entry": entry}
+
+        self.version_dropdowns = {}
+        # Component key -> selected version, and the versions offered for it
+        self.version_vars = {}
+        self.versions = {}
+        # Optional component key -> whether it is installed
+        self.selection_vars = {}
+        # Catalog key -> the component whose version list it is
+        self.catalog_components = {}
+        self.installing = False
+        # Catalog clients are created when a selected component's version list is first fetched
+        self.catalogs = CatalogClients()
+        # One cache for the session, shared by every catalog load
+        self.catalog_cache = CatalogCache()
+
+        self.probe_state = ProbeStateStore()
 
         self.create_widgets()
         self.check_admin_privileges()
 
-    def _get_flutter_versions(self):
-        try:
-            # Get tags from the remote repository
-            result = subprocess.run(
-                ["git", "ls-remote", "--tags", "https://github.com/flutter/flutter.git"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            # Parse the output to get version numbers
-            tags = result.stdout.strip().split("\n")
-            versions = []
-            
-            for tag in tags:
-                tag_name = tag.split("refs/tags/")[-1]
-                # Remove ^{} suffix if present
-                tag_name = tag_name.replace("^{}", "")
-                
-                # Include all version-like tags and channel names
-                if (tag_name in ["stable", "beta", "dev", "master"] or
-                    (tag_name.count('.') >= 2 and 
-                     not tag_name.endswith('.0') and
-                     not tag_name.startswith('v') and
-                     not 'rc' in tag_name.lower() and
-                     not 'preview' in tag_name.lower())):
-                    versions.append(tag_name)
-            
-            # Remove duplicates and sort versions
-            versions = list(set(versions))
-            
-            def version_key(v):
-                if v in ["stable", "beta", "dev", "master"]:
-                    return (0, v)
-                
-                # Split version into parts for proper sorting
-                parts = []
-                for part in v.split('.'):
-                    try:
-                        parts.append(int(part))
-                    except ValueError:
-                        # Handle non-numeric parts
-                        import re
-                        match = re.match(r'(\d+)', part)
-                        if match:
-                            parts.append(int(match.group(1)))
-                        else:
-                            parts.append(0)
-                return (1, tuple(parts))
-            
-            versions.sort(key=version_key, reverse=True)
-            
-            # Ensure channels are at the top
-            channels = ["stable", "beta", "dev", "master"]
-            ordered_versions = []
-            for channel in channels:
-                if channel in versions:
-                    ordered_versions.append(channel)
-                    versions.remove(channel)
-            
-            # Add the rest of the versions
-            ordered_versions.extend(versions)
-            
-            return ordered_versions
-        except Exception as e:
-            print(f"Error getting Flutter versions: {e}")
-            return ["stable", "beta", "dev"] # Fallback
-
-    def _sort_versions(self, versions, prefix_to_remove=None):
-        latest = "latest"
-        if latest in versions:
-            versions.remove(latest)
-        
-        def version_key(v):
-            if prefix_to_remove:
-                v = v.replace(prefix_to_remove, "")
-
-            parts = []
-            for part in v.split('.'):
-                try:
-                    parts.append(int(part))
-                except ValueError:
-                    import re
-                    match = re.match(r'(\d+)', part)
-                    if match:
-                        parts.append(int(match.group(1)))
-                    else:
-                        parts.append(0)
-            return tuple(parts)
-
-        versions.sort(key=version_key, reverse=True)
-        
-        return [latest] + versions
-
-    def _get_git_versions(self):
-        try:
-            url = "https://community.chocolatey.org/api/v2/FindPackagesById()?id='git'"
-            with urllib.request.urlopen(url) as response:
-                xml_content = response.read()
-            
-            root = ET.fromstring(xml_content)
-            namespaces = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'd': 'http://schemas.microsoft.com/ado/2007/08/dataservices',
-                'm': 'http://schemas.microsoft.com/ado/2007/08/dataservices/metadata'
-            }
-            versions = ["latest"]
-            for entry in root.findall('atom:entry', namespaces):
-                properties = entry.find('m:properties', namespaces)
-                if properties is not None:
-                    version_element = properties.find('d:Version', namespaces)
-                    if version_element is not None:
-                        versions.append(version_element.text)
-            return self._sort_versions(versions)
-        except Exception as e:
-            print(f"Error getting Git versions: {e}")
-            return ["latest"]
-
-    def _get_openjdk_versions(self):
-        try:
-            url = "https://community.chocolatey.org/api/v2/FindPackagesById()?id='openjdk'"
-            with urllib.request.urlopen(url) as response:
-                xml_content = response.read()
-            
-            root = ET.fromstring(xml_content)
-            namespaces = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'd': 'http://schemas.microsoft.com/ado/2007/08/dataservices',
-                'm': 'http://schemas.microsoft.com/ado/2007/08/dataservices/metadata'
-            }
-            versions = ["latest"]
-            for entry in root.findall('atom:entry', namespaces):
-                properties = entry.find('m:properties', namespaces)
-                if properties is not None:
-                    version_element = properties.find('d:Version', namespaces)
-                    if version_element is not None:
-                        versions.append(version_element.text)
-            return self._sort_versions(versions)
-        except Exception as e:
-            print(f"Error getting OpenJDK versions: {e}")
-            return ["latest"]
-
-    def _get_ndk_versions(self):
-        try:
-            android_sdk_root = os.path.join(os.getenv("LOCALAPPDATA"), "Android", "Sdk")
-            sdk_manager_path = os.path.join(android_sdk_root, "cmdline-tools", "latest", "bin", "sdkmanager.bat")
-            
-            if not os.path.exists(sdk_manager_path):
-                return ["latest"]
-
-            result = subprocess.run(
-                [sdk_manager_path, "--list"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            lines = result.stdout.strip().split("\n")
-            versions = ["latest"]
-            for line in lines:
-                if "ndk;" in line:
-                    version = line.split("|")[0].strip()
-                    versions.append(version)
-            
-            return self._sort_versions(versions, prefix_to_remove="ndk;")
-        except Exception as e:
-            print(f"Error getting NDK versions: {e}")
-            return ["latest"]
-
-    def _get_android_studio_versions(self):
-        try:
-            url = "https://community.chocolatey.org/api/v2/FindPackagesById()?id='androidstudio'"
-            with urllib.request.urlopen(url) as response:
-                xml_content = response.read()
-            
-            root = ET.fromstring(xml_content)
-            namespaces = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'd': 'http://schemas.microsoft.com/ado/2007/08/dataservices',
-                'm': 'http://schemas.microsoft.com/ado/2007/08/dataservices/metadata'
-            }
-            versions = ["latest"]
-            for entry in root.findall('atom:entry', namespaces):
-                properties = entry.find('m:properties', namespaces)
-                if properties is not None:
-                    version_element = properties.find('d:Version', namespaces)
-                    if version_element is not None:
-                        versions.append(version_element.text)
-            return self._sort_versions(versions)
-        except Exception as e:
-            print(f"Error getting Android Studio versions: {e}")
-            return ["latest"]
+        splash.destroy()
+        self.deiconify()
+        startup.mark("window")
+        # Idle callbacks run after the pending redraw, so this marks the first paint
+        self.after_idle(self._on_first_paint)
+
+        # The startup probe and catalog timings go next to the log, for `FlutterInstallerCli report`;
+        # the run is finished once the version lists and the first system check are in
+        self.startup_run = telemetry.start_run(telemetry.spans_path(self.log_file), "gui")
+        self.startup_pending = {"catalogs"}
+
+        # Fetch the version lists in the background once the window is on screen
+        self.after_idle(self._load_version_catalogs)
+        if self._show_last_known_statuses():
+            self.startup_pending.add("check")
+            self.after_idle(self.check_system, True)
+
+    def _show_splash(self):
+        splash = tk.Toplevel(self)
+        splash.overrideredirect(True)
+        splash.configure(bg='#3498db')
+        width, height = 420, 120
+        x = (splash.winfo_screenwidth() - width) // 2
+        y = (splash.winfo_screenheight() - height) // 2
+        splash.geometry(f"{width}x{height}+{x}+{y}")
+        tk.Label(splash, text="🎯 Flutter Development Environment", font=('Segoe UI', 14, 'bold'),
+                 bg='#3498db', fg='white').pack(pady=(28, 4))
+        tk.Label(splash, text="Starting installer...", font=('Segoe UI', 10), bg='#3498db', fg='white').pack()
+        splash.update()
+        return splash
+
+    def _on_first_paint(self):
+        startup.mark("first_paint")
+        startup.write(self.log_file)
 
     def create_widgets(self):
         # Header
@@ -330,6 +210,14 @@ class FlutterInstallerUI(tk.Tk):
             insertbackground='#ecf0f1'
         )
         self.output_text.pack(fill="both", expand=True, padx=10, pady=10)
+        if component_registry.load_error():
+            self.output_text.insert(tk.END, f"⚠️ {component_registry.load_error()}\n")
+        
+        # Installer output is queued by the reader thread and drained here in batches
+        self.log_pipeline = LogPipeline()
+        self.progress_tracker = ProgressTracker()
+        self.output_log = TextWidgetLog(self.output_text, self.log_pipeline, interval_ms=50, max_lines=5000,
+                                        on_batch=self._on_log_batch, on_tick=self._update_install_progress)
         
         # Status bar
         self.status_bar = ttk.Label(self, text=f"Ready | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 
@@ -384,118 +272,207 @@ class FlutterInstallerUI(tk.Tk):
         status_label = ttk.Label(status_frame, text=details["status"], style='Status.TLabel')
         status_label.pack()
         self.components[component]["label"] = status_label
-        
-        # Version dropdown
-        if component == "Flutter SDK":
-            self.flutter_version_var = tk.StringVar(value="stable")
-            self.flutter_versions = self._get_flutter_versions()
-            flutter_version_dropdown = ttk.Combobox(status_frame, textvariable=self.flutter_version_var, 
-                                                   values=self.flutter_versions, state="readonly", width=15)
-            flutter_version_dropdown.pack(pady=(5, 0))
-        
-        elif component == "Git":
-            self.git_version_var = tk.StringVar(value="latest")
-            self.git_versions = self._get_git_versions()
-            git_version_dropdown = ttk.Combobox(status_frame, textvariable=self.git_version_var, 
-                                               values=self.git_versions, state="readonly", width=15)
-            git_version_dropdown.pack(pady=(5, 0))
-
-        elif component == "OpenJDK":
-            self.openjdk_version_var = tk.StringVar(value="latest")
-            self.openjdk_versions = self._get_openjdk_versions()
-            openjdk_version_dropdown = ttk.Combobox(status_frame, textvariable=self.openjdk_version_var, 
-                                                  values=self.openjdk_versions, state="readonly", width=15)
-            openjdk_version_dropdown.pack(pady=(5, 0))
-
-        elif component == "NDK":
-            self.ndk_version_var = tk.StringVar(value="latest")
-            self.ndk_versions = self._get_ndk_versions()
-            ndk_version_dropdown = ttk.Combobox(status_frame, textvariable=self.ndk_version_var, 
-                                               values=self.ndk_versions, state="readonly", width=15)
-            ndk_version_dropdown.pack(pady=(5, 0))
-
-        elif component == "Android Studio":
-            self.android_studio_version_var = tk.StringVar(value="latest")
-            self.android_studio_versions = self._get_android_studio_versions()
-            android_studio_version_dropdown = ttk.Combobox(status_frame, textvariable=self.android_studio_version_var, 
-                                                         values=self.android_studio_versions, state="readonly", width=15)
-            android_studio_version_dropdown.pack(pady=(5, 0))
+
+        entry = details["entry"]
+        if entry.optional:
+            variable = tk.BooleanVar(value=entry.selected)
+            ttk.Checkbutton(status_frame, text="Install", variable=variable,
+                            command=lambda: self._on_component_toggled(component)).pack(pady=(5, 0))
+            self.selection_vars[entry.key] = variable
+
+        # Version dropdown (filled in by _load_version_catalogs once the window is shown)
+        if entry.default_version:
+            self.version_vars[entry.key] = tk.StringVar(value=entry.default_version)
+            self.versions[entry.key] = list(entry.initial_versions)
+            self._create_version_dropdown(status_frame, component, self.version_vars[entry.key])
+        if entry.key == "flutter":
+            self._create_precache_options(status_frame)
+
+    def _create_version_dropdown(self, parent, component, variable):
+        # Start disabled with only the default value; the real list arrives later
+        dropdown = ttk.Combobox(parent, textvariable=variable, values=[variable.get()], state="disabled", width=15)
+        dropdown.pack(pady=(5, 0))
+        
+        placeholder = ttk.Label(parent, text="⏳ Loading versions...", style='Subtitle.TLabel')
+        placeholder.pack()
+        
+        self.version_dropdowns[component] = (dropdown, placeholder)
+
+    def _create_precache_options(self, parent):
+        # Platforms whose Flutter engine artifacts are downloaded while the Android components install
+        frame = ttk.Frame(parent, style='Card.TFrame')
+        frame.pack(pady=(5, 0))
+        ttk.Label(frame, text="Warm up:", style='Subtitle.TLabel').pack(side="left")
+        self.precache_vars = {}
+        for platform in PRECACHE_PLATFORMS:
+            variable = tk.BooleanVar(value=platform in DEFAULT_PRECACHE)
+            ttk.Checkbutton(frame, text=platform.capitalize(), variable=variable).pack(side="left")
+            self.precache_vars[platform] = variable
+
+    def _load_version_catalogs(self, components=None):
+        # Only the selected components' version lists are fetched; an
+        # optional component's is fetched when it is first ticked
+        startup = components is None
+        if startup:
+            components = self._selected_components()
+        sources = {}
+        timeouts = {}
+        for entry in components:
+            if entry.versions is None or entry.catalog_key in self.catalog_components:
+                continue
+            self.catalog_components[entry.catalog_key] = entry
+            fetch = lambda validators, entry=entry: entry.versions(self.catalogs, validators)
+            sources[entry.catalog_key] = (fetch, self.versions[entry.key])
+            if entry.catalog_timeout:
+                timeouts[entry.catalog_key] = entry.catalog_timeout
+        if not sources:
+            if startup:
+                self._startup_finished("catalogs")
+            return
+
+        self.status_bar.config(text="Loading available versions...")
+        catalog_loader = VersionCatalogLoader(sources, timeout=20, timeouts=timeouts, cache=self.catalog_cache)
+        catalog_loader.start(
+            lambda key, versions: self.after(0, self._on_versions_loaded, key, versions),
+            lambda results: self.after(0, self._on_catalogs_loaded, startup)
+        )
+
+    def _on_versions_loaded(self, key, versions):
+        entry = self.catalog_components[key]
+        self.versions[entry.key] = versions
+
+        dropdown, placeholder = self.version_dropdowns[entry.name]
+        dropdown.config(values=versions, state="readonly")
+        if placeholder.winfo_exists():
+            placeholder.destroy()
+
+    def _on_catalogs_loaded(self, startup=False):
+        self.status_bar.config(text=f"Versions loaded | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if startup:
+            self._startup_finished("catalogs")
+
+    def _startup_finished(self, part):
+        self.startup_pending.discard(part)
+        if not self.startup_pending and self.startup_run is not None:
+            telemetry.finish_run(self.startup_run, "ok")
+            self.startup_run = None
 
     def _auto_configure(self):
         self.output_text.delete(1.0, tk.END)
         self.output_text.insert(tk.END, "⚡ Auto-configuring recommended versions...\n")
         self.output_text.insert(tk.END, "=" * 50 + "\n")
         
-        self.flutter_version_var.set("stable")
-        self.output_text.insert(tk.END, f"🎯 Flutter: stable (recommended for production)\n")
-        
-        self.git_version_var.set("latest")
-        self.output_text.insert(tk.END, f"🔀 Git: latest (most recent stable version)\n")
-        
-        self.ndk_version_var.set("latest")
-        self.output_text.insert(tk.END, f"⚙️ NDK: latest (compatible with current Android Studio)\n")
-        
-        self.android_studio_version_var.set("latest")
-        self.output_text.insert(tk.END, f"📱 Android Studio: latest (most recent stable release)\n")
+        for entry in self._selected_components():
+            if entry.key not in self.version_vars:
+                continue
+            # e.g. OpenJDK's newest 17.x from the loaded list
+            version = entry.recommended_version(self.versions[entry.key])
+            self.version_vars[entry.key].set(version)
+            reason = f" ({entry.recommendation})" if entry.recommendation else ""
+            self.output_text.insert(tk.END, f"{entry.icon} {entry.name}: {version}{reason}\n")
 
-        # Find the latest 17.x.x version for OpenJDK
-        latest_17 = "17"
-        for v in self.openjdk_versions:
-            if v.startswith("17."):
-                latest_17 = v
-                break
-        self.openjdk_version_var.set(latest_17)
-        self.output_text.insert(tk.END, f"☕ OpenJDK: {latest_17} (recommended for Flutter development)\n")
-        
         self.output_text.insert(tk.END, "=" * 50 + "\n")
         self.output_text.insert(tk.END, "✅ Auto-configuration complete! Click 'Run Installer' to begin installation.\n")
         
         self.status_bar.config(text="Auto-configuration complete - Ready to install")
 
-    def check_system(self):
+    def check_system(self, incremental=False, touched=()):
+        # An incremental check only re-probes components whose fingerprint
+        # changed since the last run, plus any the installer just touched
         self.check_button.config(state=tk.DISABLED)
         self.output_text.delete(1.0, tk.END)
         self.output_text.insert(tk.END, "🔍 Starting system check...\n")
         self.output_text.insert(tk.END, "=" * 50 + "\n")
         self.status_bar.config(text="Checking system components...")
         
+        components = [entry.name for entry in self._selected_components()]
         self.progress["value"] = 0
-        self.progress["maximum"] = len(self.components)
+        self.progress["maximum"] = len(components)
         
-        threading.Thread(target=self._check_system_thread, daemon=True).start()
-
-    def _check_system_thread(self):
-        self.check_admin_privileges()
-        self.check_chocolatey()
-        self.check_git()
-        self.check_android_studio()
-        self.check_openjdk()
-        self.check_flutter_sdk()
-        self.check_android_sdk_tools()
-        self.check_ndk()
-        self.check_environment_variables()
+        threading.Thread(target=self._check_system_thread, args=(components, incremental, set(touched)),
+                         daemon=True).start()
 
-        self.after(0, self.on_check_complete)
+    def _check_system_thread(self, components, incremental=False, touched=frozenset()):
+        try:
+            run_system_check(components, self._on_probe_result, store=self.probe_state,
+                             incremental=incremental, touched=touched)
+        finally:
+            self.after(0, self.on_check_complete)
+
+    def _selected_components(self):
+        # Registry entries of the required components and the ticked optional ones
+        selected = []
+        for details in self.components.values():
+            entry = details["entry"]
+            variable = self.selection_vars.get(entry.key)
+            if not entry.optional or (variable.get() if variable is not None else entry.selected):
+                selected.append(entry)
+        return selected
+
+    def _on_component_toggled(self, component):
+        entry = self.components[component]["entry"]
+        if self.selection_vars[entry.key].get():
+            self._load_version_catalogs([entry])
+            self.update_status(component, "Not Checked", "orange")
+        else:
+            self.update_status(component, "Not Selected", "gray")
+        # Unchanged components keep their last result, so this only probes the toggled one
+        if self.check_button["state"] != tk.DISABLED and not self.installing:
+            self.check_system(incremental=True, touched=[component])
+
+    def _show_last_known_statuses(self):
+        # Show the previous run's results right away; check_system(incremental=True) confirms them
+        previous = self.probe_state.load()
+        selected = [entry.name for entry in self._selected_components()]
+        for component, known in previous.items():
+            if component in selected and component != "Administrator Privileges" and "status" in known:
+                color = "green" if known["status"] in READY_STATUSES else "red"
+                self.update_status(component, known["status"], color, version=known.get("version"))
+        return bool(previous)
+
+    def _on_probe_result(self, component, status, detail):
+        ready = status in ["Installed", "Set", "Activated"]
+        if detail and not ready:
+            # Why a probe failed or timed out goes to the output view; this runs on a probe thread
+            self.after(0, self.output_text.insert, tk.END, f"  {component}: {status} ({detail})\n")
+        # For installed components the detail is the version found on disk
+        self.update_status(component, status, "green" if ready else "red", version=detail if ready else None)
+        self.after(0, self._advance_progress)
+
+    def _on_log_batch(self, lines):
+        # Scripts without progress events only give us output volume to go on
+        if not self.progress_tracker.has_plan():
+            self._advance_progress(len(lines))
+
+    def _update_install_progress(self):
+        if self.installing and self.progress_tracker.has_plan():
+            self.progress["value"] = self.progress_tracker.fraction() * self.progress["maximum"]
+            self.status_bar.config(text=f"Installing: {self.progress_tracker.describe()}")
+
+    def _advance_progress(self, amount=1):
+        self.progress["value"] = min(self.progress["value"] + amount, self.progress["maximum"])
 
     def on_check_complete(self):
         self.check_button.config(state=tk.NORMAL)
+        self._startup_finished("check")
         self.output_text.insert(tk.END, "=" * 50 + "\n")
         self.output_text.insert(tk.END, "✅ System check complete.\n")
         
-        # Count installed components
-        installed_count = sum(1 for comp in self.components.values() if comp["status"] in ["Installed", "Set", "Activated"])
-        total_count = len(self.components)
+        # Count installed components; optional ones that are not ticked do not count
+        selected = {entry.name: self.components[entry.name] for entry in self._selected_components()}
+        installed_count = sum(1 for comp in selected.values() if comp["status"] in ["Installed", "Set", "Activated"])
+        total_count = len(selected)
         
         self.output_text.insert(tk.END, f"\n📊 Summary: {installed_count}/{total_count} components ready\n")
         
         # Debug: Print all component statuses
         self.output_text.insert(tk.END, "\n🔍 Debug - Component Statuses:\n")
-        for comp_name, comp_details in self.components.items():
+        for comp_name, comp_details in selected.items():
             status = comp_details["status"]
             is_ready = status in ["Installed", "Set", "Activated"]
             self.output_text.insert(tk.END, f"  {comp_name}: {status} {'✅' if is_ready else '❌'}\n")
         
-        all_installed = all(comp["status"] in ["Installed", "Set", "Activated"] for comp in self.components.values())
+        all_installed = all(comp["status"] in ["Installed", "Set", "Activated"] for comp in selected.values())
         self.output_text.insert(tk.END, f"\n🎯 All components installed: {all_installed}\n")
         
         if all_installed:
@@ -509,11 +486,11 @@ class FlutterInstallerUI(tk.Tk):
 
     def check_admin_privileges(self):
         try:
-            is_admin = ctypes.windll.shell32.IsUserAnAdmin() != 0
-            if is_admin:
-                self.update_status("Administrator Privileges", "Activated", "green")
+            status = check_admin_privileges()
+            if status == "Activated":
+                self.update_status("Administrator Privileges", status, "green")
             else:
-                self.update_status("Administrator Privileges", "Not Activated", "red")
+                self.update_status("Administrator Privileges", status, "red")
                 self.rerun_as_admin()
         except Exception as e:
             self.update_status("Administrator Privileges", "Error", "red")
@@ -524,75 +501,12 @@ class FlutterInstallerUI(tk.Tk):
             self.destroy()
             sys.exit()
 
-    def check_chocolatey(self):
-        self.check_command("choco --version", "Chocolatey")
-
-    def check_git(self):
-        self.check_command("git --version", "Git")
-
-    def check_android_studio(self):
-        # A bit more complex as there is no direct command.
-        # We will check for a common installation path.
-        program_files = os.environ.get("ProgramFiles")
-        android_studio_path = os.path.join(program_files, "Android", "Android Studio", "bin", "studio64.exe")
-        if os.path.exists(android_studio_path):
-            self.update_status("Android Studio", "Installed", "green")
-        else:
-            self.update_status("Android Studio", "Not Installed", "red")
-
-    def check_openjdk(self):
-        self.check_command("java -version", "OpenJDK")
-
-    def check_command(self, command, component_name):
-        try:
-            subprocess.run(command, check=True, capture_output=True, text=True, shell=True)
-            self.update_status(component_name, "Installed", "green")
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            self.update_status(component_name, "Not Installed", "red")
-
-    def check_flutter_sdk(self):
-        if os.path.isdir("C:\\flutter"):
-            self.update_status("Flutter SDK", "Installed", "green")
-        else:
-            self.update_status("Flutter SDK", "Not Installed", "red")
-
-    def check_android_sdk_tools(self):
-        android_sdk_root = os.path.join(os.getenv("LOCALAPPDATA"), "Android", "Sdk")
-        sdk_manager_path = os.path.join(android_sdk_root, "cmdline-tools", "latest", "bin", "sdkmanager.bat")
-        if os.path.exists(sdk_manager_path):
-            self.update_status("Android SDK Command-line Tools", "Installed", "green")
-        else:
-            self.update_status("Android SDK Command-line Tools", "Not Installed", "red")
-
-    def check_ndk(self):
-        android_sdk_root = os.path.join(os.getenv("LOCALAPPDATA"), "Android", "Sdk")
-        ndk_path = os.path.join(android_sdk_root, "ndk")
-        if os.path.isdir(ndk_path):
-            self.update_status("NDK", "Installed", "green")
-        else:
-            self.update_status("NDK", "Not Installed", "red")
-
-    def check_environment_variables(self):
-        android_home = os.getenv("ANDROID_HOME")
-        path = os.getenv("PATH")
-        
-        android_home_ok = android_home is not None and "Android" in android_home and "Sdk" in android_home
-        
-        flutter_path_ok = path is not None and "flutter\\bin" in path
-        android_emulator_ok = path is not None and "emulator" in path
-        android_platform_tools_ok = path is not None and "platform-tools" in path
-        android_cmdline_tools_ok = path is not None and "cmdline-tools\\latest\\bin" in path
-        
-        if android_home_ok and flutter_path_ok and android_emulator_ok and android_platform_tools_ok and android_cmdline_tools_ok:
-            self.update_status("Environment Variables", "Set", "green")
-        else:
-            self.update_status("Environment Variables", "Not Set", "red")
-
-    def update_status(self, component, status, color):
+    def update_status(self, component, status, color, version=None):
         def callback():
             self.components[component]["status"] = status
+            self.components[component]["version"] = version
             label = self.components[component]["label"]
-            label.config(text=status)
+            label.config(text=f"{status} ({version})" if version else status)
             
             # Update style based on status
             if status in ["Installed", "Set", "Activated"]:
@@ -601,6 +515,8 @@ class FlutterInstallerUI(tk.Tk):
                 label.configure(style='Error.TLabel')
             elif status == "Error":
                 label.configure(style='Error.TLabel')
+            elif status == "Not Selected":
+                label.configure(style='Status.TLabel')
             else:
                 label.configure(style='Warning.TLabel')
             
@@ -615,66 +531,101 @@ class FlutterInstallerUI(tk.Tk):
         self.output_text.insert(tk.END, "🚀 Starting Flutter development environment installation...\n")
         self.output_text.insert(tk.END, "=" * 50 + "\n")
         self.output_text.insert(tk.END, f"📄 Log file: {self.log_file}\n")
-        self.output_text.insert(tk.END, f"🎯 Flutter Version: {self.flutter_version_var.get()}\n")
-        self.output_text.insert(tk.END, f"🔀 Git Version: {self.git_version_var.get()}\n")
-        self.output_text.insert(tk.END, f"☕ Java Version: {self.openjdk_version_var.get()}\n")
-        self.output_text.insert(tk.END, f"📱 Android Studio Version: {self.android_studio_version_var.get()}\n")
-        self.output_text.insert(tk.END, f"⚙️ NDK Version: {self.ndk_version_var.get()}\n")
+        components = self._selected_components()
+        # The tick boxes and dropdowns are read here, on the Tk thread
+        versions = {key: variable.get() for key, variable in self.version_vars.items()}
+        versions["components"] = [entry.key for entry in components if entry.optional]
+        precache = [platform for platform, variable in self.precache_vars.items() if variable.get()]
+        for entry in components:
+            if entry.key in versions:
+                self.output_text.insert(tk.END, f"{entry.icon} {entry.name} Version: {versions[entry.key]}\n")
         self.output_text.insert(tk.END, "=" * 50 + "\n")
         
         self.status_bar.config(text="Installing components... This may take several minutes.")
         self.progress["value"] = 0
         self.progress["maximum"] = 100
         
-        threading.Thread(target=self._run_installer_thread, daemon=True).start()
-
-    def _run_installer_thread(self):
+        # Components the installer is going to work on are always re-probed afterwards
+        touched = [entry.name for entry in components if self.components[entry.name]["status"] not in READY_STATUSES]
+        self.progress_tracker = ProgressTracker()
+        self.installing = True
+        self.output_log.start()
+        threading.Thread(target=self._run_installer_thread, args=(components, versions, precache, touched),
+                         daemon=True).start()
+
+    def _run_installer_thread(self, components, versions, precache, touched=()):
+        from artifact_cache import artifact_cache
+        from install_journal import InstallJournal
+        from install_orchestrator import OK, SKIPPED, InstallOrchestrator
+        from install_steps import build_install_plan
+        recorder = telemetry.start_run(telemetry.spans_path(self.log_file), "install", interface="gui")
+        run_fields = {"status": "failed"}
         try:
             with open(self.log_file, "w") as log:
-                if getattr(sys, 'frozen', False):
-                    # Running in a bundle
-                    base_path = sys._MEIPASS
-                else:
-                    # Running in a normal Python environment
-                    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-
-                script_path = os.path.join(base_path, "install_flutter_windows.ps1")
-                
-                process = subprocess.Popen(
-                    ["powershell", "-ExecutionPolicy", "Bypass", "-File", script_path, "-FlutterVersion", self.flutter_version_var.get(), "-GitVersion", self.git_version_var.get(), "-JavaVersion", self.openjdk_version_var.get(), "-NdkVersion", self.ndk_version_var.get(), "-AndroidStudioVersion", self.android_studio_version_var.get()],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW
+                # Opening the log for the install drops the startup line written at launch
+                log.write(startup.summary() + "\n")
+                log_lock = threading.Lock()
+
+                def on_log(step_id, line):
+                    # Steps run in parallel, so prefix each line with the step it came from
+                    line = f"[{step_id}] {line}"
+                    with log_lock:
+                        log.write(line)
+                        log.flush()
+                    # Only the queue is touched here; output_log drains it on the Tk thread
+                    self.log_pipeline.push(line)
+
+                steps = build_install_plan(
+                    versions,
+                    flutter_releases=self.catalogs.flutter_releases,
+                    android_repository=self.catalogs.android_repository,
+                    precache_platforms=precache,
+                    components=components
                 )
-
-                for line in iter(process.stdout.readline, ''):
-                    log.write(line)
-                    self.after(0, self.output_text.insert, tk.END, line)
-                    self.output_text.see(tk.END)
-                    self.after(0, self.progress.step, 1)
-
-                process.stdout.close()
-                return_code = process.wait()
-
-                if return_code == 0:
-                    self.after(0, self.output_text.insert, tk.END, "\n" + "=" * 50 + "\n")
-                    self.after(0, self.output_text.insert, tk.END, "🎉 Installation completed successfully!\n")
-                    self.after(0, self.output_text.insert, tk.END, "📋 Please restart your terminal/command prompt to use the new environment.\n")
-                    self.after(0, self.status_bar.config, text="Installation completed successfully!")
+                orchestrator = InstallOrchestrator(
+                    steps,
+                    log_dir=os.path.join(os.path.dirname(self.log_file), "flutter_installer_steps"),
+                    on_log=on_log,
+                    # Progress events drive the progress bar instead of the output view
+                    on_event=self.progress_tracker.apply,
+                    # An install that failed or was cut short by a restart carries on where it stopped
+                    journal=InstallJournal()
+                )
+                run_fields["profile"] = versions
+                artifact_cache().reset_stats()
+                results = orchestrator.run()
+                artifact_cache().flush()
+                self.installing = False
+                run_fields["status"] = "ok" if orchestrator.succeeded() else "failed"
+                on_log("installer", artifact_cache().summary() + "\n")
+
+                self.log_pipeline.push("\n" + "=" * 50 + "\n")
+                for step in steps:
+                    duration = orchestrator.durations.get(step.step_id)
+                    timing = f" in {duration:.1f}s" if duration is not None else ""
+                    self.log_pipeline.push(f"{step.title}: {results.get(step.step_id)}{timing}\n")
+                if orchestrator.succeeded():
+                    self.log_pipeline.push("🎉 Installation completed successfully!\n")
+                    self.log_pipeline.push("📋 Please restart your terminal/command prompt to use the new environment.\n")
+                    self.after(0, self.status_bar.config, {"text": "Installation completed successfully!"})
                 else:
-                    self.after(0, self.output_text.insert, tk.END, "\n" + "=" * 50 + "\n")
-                    self.after(0, self.output_text.insert, tk.END, f"❌ Installation failed with exit code {return_code}.\n")
-                    self.after(0, self.output_text.insert, tk.END, "📄 Please check the log file for details.\n")
-                    self.after(0, self.status_bar.config, text=f"Installation failed (exit code: {return_code})")
+                    failed = [step.title for step in steps if results.get(step.step_id) not in (OK, SKIPPED)]
+                    self.log_pipeline.push(f"❌ Installation failed: {', '.join(failed)}.\n")
+                    self.log_pipeline.push("📄 Please check the log file for details.\n")
+                    self.after(0, self.status_bar.config, {"text": f"Installation failed ({len(failed)} steps did not complete)"})
 
         except Exception as e:
-            self.after(0, self.output_text.insert, tk.END, f"\nError running installer: {e}\n")
+            self.log_pipeline.push(f"\nError running installer: {e}\n")
         finally:
-            self.after(0, self.run_button.config, state=tk.NORMAL)
-            self.after(0, self.check_system)
+            telemetry.finish_run(recorder, **run_fields)
+            self.installing = False
+            # stop() drains what is left and ends the tick loop; the next run starts a new one
+            self.after(0, self.output_log.stop)
+            self.after(0, self.run_button.config, {"state": tk.NORMAL})
+            self.after(0, lambda: self.check_system(incremental=True, touched=touched))
 
     def open_log(self):
+        import webbrowser
         webbrowser.open(self.log_file)
 
 
@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from app_paths import write_json_atomic
+from artifact_cache import ArtifactCache, artifact_cache
+from chocolatey_feed import resolve_dependencies
+from component_registry import selected_components
+from download_manager import ChunkedDownloader, DownloadError, file_digest
+from flutter_releases import CHANNELS
+from install_steps import CHOCOLATEY_INSTALL_SCRIPT, cmdline_tools_archive, resolve_ndk_version
+
+# Offline bundles for air-gapped or bandwidth-limited sites.
+#
+# Exporting resolves a version selection to concrete artifacts and downloads
+# each of them once: Chocolatey's install script and package, the nupkgs of
+# Git, OpenJDK, Android Studio and any selected optional packages with
+# their dependencies, the Flutter
+# release archive (which already carries the Dart SDK in bin/cache), the
+# command-line tools and the NDK. Installing from a bundle then reads only
+# from it.
+#
+# A bundle is an artifact store in the same layout as the artifact cache
+# (<algorithm>/<digest>/<file> plus index.json), so it can also be listed in
+# FLUTTER_INSTALLER_ARTIFACT_SHARES, and manifest.json records what each file
+# is, where it came from and its checksum.
+
+BUNDLE_FORMAT = 1
+MANIFEST = "manifest.json"
+
+
+class BundleError(Exception):
+    pass
+
+
+def read_nuspec(path):
+    # {"id", "version", "dependencies"} of a local .nupkg, e.g. an internalized package
+    with zipfile.ZipFile(path) as zf:
+        names = [name for name in zf.namelist() if name.endswith(".nuspec") and "/" not in name]
+        if not names:
+            raise BundleError(f"{path} has no .nuspec")
+        root = ET.fromstring(zf.read(names[0]))
+    package = {"id": None, "version": None, "dependencies": []}
+    for element in root.iter():
+        name = element.tag.rpartition("}")[2]
+        if name == "id" and package["id"] is None:
+            package["id"] = (element.text or "").strip()
+        elif name == "version" and package["version"] is None:
+            package["version"] = (element.text or "").strip()
+        elif name == "dependency":
+            package["dependencies"].append((element.get("id"), element.get("version", "")))
+    return package
+
+
+def nupkg_artifact(package):
+    return {"id": f"nupkg:{package['id'].lower()}", "kind": "nupkg", "package": package["id"],
+            "version": package["version"], "url": package.get("url"),
+            "name": f"{package['id'].lower()}.{package['version']}.nupkg"}
+
+
+def resolve_artifacts(versions, flutter_releases, android_repository, feed, nupkgs=()):
+    # Returns (resolved profile, artifact list). versions is a resolved
+    # install profile; nupkgs are local package files that replace the feed's.
+    profile = dict(versions)
+    artifacts = [{"id": "chocolatey-install-script", "kind": "chocolatey-script",
+                  "url": CHOCOLATEY_INSTALL_SCRIPT, "name": "install.ps1"}]
+
+    local = {}
+    for path in nupkgs:
+        package = read_nuspec(path)
+        local[package["id"].lower()] = dict(package, path=path)
+
+    # Profile entry -> Chocolatey package id
+    packages = {component.key: component.package for component in selected_components(profile.get("components"))
+                if component.package}
+    requested = [("chocolatey", None)]
+    requested.extend((package_id, profile.get(component, "latest")) for component, package_id in packages.items())
+    for package in resolve_dependencies(feed, requested, local):
+        artifact = nupkg_artifact(package)
+        if package.get("path"):
+            artifact["path"] = package["path"]
+        artifacts.append(artifact)
+        for component, component_package in packages.items():
+            if component_package == package["id"].lower():
+                profile[component] = package["version"]
+
+    flutter = profile["flutter"]
+    if flutter in CHANNELS:
+        if flutter != "stable":
+            raise BundleError(f"Only stable releases are published as archives; choose a release instead of {flutter}")
+        released = [tag for tag in flutter_releases.versions() if flutter_releases.archive_url(tag)]
+        if not released:
+            raise BundleError("The Flutter release index has no archives")
+        flutter = released[0]
+    url = flutter_releases.archive_url(flutter)
+    if not url:
+        raise BundleError(f"No release archive for Flutter {flutter}")
+    profile["flutter"] = flutter
+    artifacts.append({"id": "flutter", "kind": "flutter", "version": flutter, "url": url,
+                      "checksum": flutter_releases.release(flutter).get("sha256"), "algorithm": "sha256"})
+
+    url, checksum, algorithm = cmdline_tools_archive(android_repository)
+    artifacts.append({"id": "cmdline-tools", "kind": "cmdline-tools", "url": url, "checksum": checksum, "algorithm": algorithm})
+
+    ndk = resolve_ndk_version(profile["ndk"], android_repository)
+    archive = android_repository.archive(f"ndk;{ndk}") if android_repository is not None else None
+    if not archive:
+        raise BundleError(f"NDK {ndk} is not in the Android repository manifest")
+    profile["ndk"] = ndk
+    artifacts.append({"id": "ndk", "kind": "ndk", "version": ndk, "url": archive["url"],
+                      "checksum": archive.get("checksum"), "algorithm": archive.get("algorithm", "sha1")})
+
+    for artifact in artifacts:
+        artifact.setdefault("name", artifact["url"].rsplit("/", 1)[-1])
+        artifact.setdefault("checksum", None)
+        artifact.setdefault("algorithm", "sha256")
+    return profile, artifacts
+
+
+def export_bundle(root, profile, artifacts, download=None, workers=3, log=print):
+    # Fills `root` with the artifacts and writes the manifest last, so a
+    # directory with a manifest is always complete. Re-running an export
+    # into the same directory only fetches what is missing.
+    download = download or (lambda url, path, checksum, algorithm:
+                            ChunkedDownloader().download(url, path, checksum, algorithm, log=log))
+    # A bundle is never trimmed, whatever its size
+    store = ArtifactCache(root=root, max_bytes=float("inf"), shares=[])
+    staging = os.path.join(root, "downloads")
+    os.makedirs(staging, exist_ok=True)
+    started = time.monotonic()
+
+    def add(artifact):
+        checksum, algorithm, url = artifact["checksum"], artifact["algorithm"], artifact["url"]
+        path = store.lookup(checksum, algorithm, url) if (checksum or url) else None
+        if path is None:
+            target = os.path.join(staging, artifact["name"])
+            cached = artifact_cache().lookup(checksum, algorithm, url, log) if (checksum or url) else None
+            source = artifact.get("path") or cached
+            if source:
+                log(f"Copying {artifact['name']} from {source}")
+                shutil.copyfile(source, target)
+                if checksum and file_digest(target, algorithm) != checksum.lower():
+                    raise DownloadError(f"{algorithm} mismatch for {source}")
+            else:
+                log(f"Downloading {artifact['name']}")
+                download(url, target, checksum, algorithm)
+            path = store.store(target, checksum, algorithm, url)
+        relative = os.path.relpath(path, root).replace(os.sep, "/")
+        # Files without a published checksum were stored under their SHA-256
+        algorithm, digest = relative.split("/")[:2]
+        entry = {key: value for key, value in artifact.items() if key != "path"}
+        entry.update(file=relative, size=os.path.getsize(path), algorithm=algorithm, checksum=digest)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bundle") as pool:
+        entries = list(pool.map(add, artifacts))
+    shutil.rmtree(staging, ignore_errors=True)
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "profile": profile,
+        "artifacts": entries,
+    }
+    write_json_atomic(os.path.join(root, MANIFEST), manifest)
+    total = sum(entry["size"] for entry in entries)
+    log(f"Bundle written to {root}: {len(entries)} artifacts, {total / 1048576.0:.1f} MB "
+        f"in {time.monotonic() - started:.1f}s")
+    return manifest
+
+
+class OfflineBundle:
+    # A bundle written by export_bundle, opened for installing
+
+    def __init__(self, root):
+        self.root = root
+        try:
+            with open(os.path.join(root, MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BundleError(f"{root} is not an offline bundle: {e}")
+        if not isinstance(manifest, dict) or manifest.get("format") != BUNDLE_FORMAT:
+            raise BundleError(f"{root} has an unsupported bundle format")
+        self.profile = manifest["profile"]
+        self.artifacts = manifest["artifacts"]
+        self.verified = False
+
+    def path(self, artifact):
+        return os.path.join(self.root, *artifact["file"].split("/"))
+
+    def find(self, kind):
+        for artifact in self.artifacts:
+            if artifact["kind"] == kind:
+                return artifact
+        raise BundleError(f"The bundle has no {kind} artifact")
+
+    def archive(self, kind):
+        # (url, checksum, algorithm), as the install steps expect for downloads
+        artifact = self.find(kind)
+        return artifact["url"], artifact["checksum"], artifact["algorithm"]
+
+    def chocolatey_source(self):
+        # Every nupkg sits in its own folder; Chocolatey takes a ;-separated source list
+        folders = [os.path.dirname(self.path(a)) for a in self.artifacts if a["kind"] == "nupkg"]
+        return ";".join(sorted(set(folders)))
+
+    def chocolatey_package(self):
+        for artifact in self.artifacts:
+            if artifact["kind"] == "nupkg" and artifact["package"].lower() == "chocolatey":
+                return self.path(artifact)
+        raise BundleError("The bundle has no chocolatey package")
+
+    def verify(self, log=print):
+        # One sequential pass over every file; it also leaves the archives in
+        # the OS file cache for the extraction that follows
+        started = time.monotonic()
+        total = 0
+        for artifact in self.artifacts:
+            path = self.path(artifact)
+            if not os.path.isfile(path) or os.path.getsize(path) != artifact["size"]:
+                raise BundleError(f"{artifact['file']} is missing or has the wrong size")
+            if file_digest(path, artifact["algorithm"]) != artifact["checksum"]:
+                raise BundleError(f"{artifact['file']} is corrupt ({artifact['algorithm']} mismatch)")
+            total += artifact["size"]
+        self.verified = True
+        log(f"Verified {len(self.artifacts)} bundle artifacts ({total / 1048576.0:.1f} MB) "
+            f"in {time.monotonic() - started:.1f}s")
+
+    def mount(self):
+        # Serve the install steps' artifact lookups from the bundle, with downloads disabled
+        cache = artifact_cache()
+        # Files verify() has just checked are not hashed a second time
+        cache.add_share(self.root, verified=self.verified)
+        cache.offline = True
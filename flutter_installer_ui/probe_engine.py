@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+
+import telemetry
+
+TIMED_OUT = "Timed Out"
+# Longest wait for an event while no running probe has a deadline yet
+IDLE_WAIT = 0.5
+
+
+class ProbeEngine:
+    # Runs independent system probes concurrently on a bounded number of
+    # threads. Each probe is a callable returning a status string (or a
+    # (status, detail) tuple); `on_result(name, status, detail)` is called
+    # from a background thread as soon as each probe finishes or times out.
+
+    def __init__(self, max_workers=4, default_timeout=15):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.probes = {}
+        self.results = {}
+        self.details = {}
+        self.durations = {}
+
+    def register(self, name, probe, timeout=None):
+        self.probes[name] = (probe, timeout or self.default_timeout)
+
+    def run(self, on_result=None, names=None):
+        names = [name for name in (names or self.probes) if name in self.probes]
+        events = queue.Queue()
+        slots = threading.Semaphore(self.max_workers)
+        # Names whose worker slot was given back, by the probe or by its timeout
+        released = set()
+        lock = threading.Lock()
+
+        def release(name):
+            with lock:
+                if name not in released:
+                    released.add(name)
+                    slots.release()
+
+        for name in names:
+            # Daemon threads so a probe stuck past its timeout never keeps the app alive
+            threading.Thread(target=self._run_probe, args=(name, slots, events, release), daemon=True).start()
+
+        pending = set(names)
+        deadlines = {}
+        while pending:
+            running = [deadlines[name] for name in pending if name in deadlines]
+            wait = max(min(running) - time.monotonic(), 0) if running else IDLE_WAIT
+            try:
+                event, name, payload = events.get(timeout=wait)
+            except queue.Empty:
+                event, name, payload = None, None, None
+
+            if event == "started":
+                deadlines[name] = payload + self.probes[name][1]
+            elif event == "finished" and name in pending:
+                pending.discard(name)
+                self._record(name, payload, on_result)
+
+            # A probe only starts its clock once it has a worker slot. A hung
+            # probe's thread keeps running, so its slot is handed to the next
+            # queued probe when it times out.
+            now = time.monotonic()
+            for name in [n for n in pending if n in deadlines and deadlines[n] <= now]:
+                pending.discard(name)
+                release(name)
+                self._record(name, (TIMED_OUT, f"no answer after {self.probes[name][1]}s"), on_result)
+
+        return dict(self.results)
+
+    def _run_probe(self, name, slots, events, release):
+        probe = self.probes[name][0]
+        slots.acquire()
+        try:
+            started = time.monotonic()
+            events.put(("started", name, started))
+            with telemetry.span("probe", name) as span:
+                try:
+                    result = probe()
+                except Exception as e:
+                    result = ("Error", str(e))
+                span["status"] = result[0] if isinstance(result, tuple) else result
+            self.durations[name] = time.monotonic() - started
+            events.put(("finished", name, result))
+        finally:
+            release(name)
+
+    def _record(self, name, result, on_result):
+        if isinstance(result, tuple):
+            status, detail = result
+        else:
+            status, detail = result, None
+        self.results[name] = status
+        self.details[name] = detail
+        if on_result:
+            on_result(name, status, detail)
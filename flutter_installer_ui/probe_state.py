@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from app_paths import data_file, write_json_atomic
+
+STATE_FORMAT = 1
+# Results older than this are probed again even if the fingerprint matches,
+# which catches changes the fingerprint does not cover
+MAX_AGE = 24 * 60 * 60
+
+
+def fingerprint(paths=(), files=(), env=()):
+    # Cheap summary of everything a probe looks at: stat() of paths, the
+    # content of small version files and the values of environment variables.
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"p:{path}:{stat.st_mtime_ns}:{stat.st_size}\n".encode())
+        except OSError:
+            digest.update(f"p:{path}:missing\n".encode())
+    for path in files:
+        try:
+            with open(path, "rb") as f:
+                digest.update(f"f:{path}:".encode() + hashlib.sha1(f.read()).digest() + b"\n")
+        except OSError:
+            digest.update(f"f:{path}:missing\n".encode())
+    for name in env:
+        digest.update(f"e:{name}={os.environ.get(name)}\n".encode("utf-8", "replace"))
+    return digest.hexdigest()
+
+
+class ProbeStateStore:
+    # Last known probe results with the fingerprint they were taken at, so
+    # a relaunch can show them at once and a re-check can skip components
+    # whose fingerprint has not moved.
+
+    def __init__(self, path=None, max_age=MAX_AGE):
+        self.path = path or data_file("probe_state.json")
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("format") != STATE_FORMAT:
+            return {}
+        components = data.get("components")
+        if not isinstance(components, dict):
+            return {}
+        return {component: result for component, result in components.items() if isinstance(result, dict)}
+
+    def is_current(self, result, fingerprint):
+        # Whether a stored result can stand in for probing again
+        checked_at = result.get("checked_at")
+        return (result.get("fingerprint") == fingerprint and "status" in result
+                and isinstance(checked_at, (int, float)) and 0 <= time.time() - checked_at <= self.max_age)
+
+    def update(self, results):
+        # results: {component: {"fingerprint", "status", "version"}}
+        with self._lock:
+            components = self.load()
+            for component, result in results.items():
+                components[component] = dict(result, checked_at=time.time())
+            try:
+                write_json_atomic(self.path, {"format": STATE_FORMAT, "components": components})
+            except OSError as e:
+                print(f"Error saving probe state: {e}")
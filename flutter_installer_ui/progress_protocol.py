@@ -0,0 +1,195 @@
+import json
+import threading
+import time
+
+# Machine-readable progress lines emitted by install_flutter_windows.ps1:
+#
+#   ##installer-progress {"event": "plan", "steps": [{"id": "git", "title": "Git", "weight": 5}, ...]}
+#   ##installer-progress {"event": "start", "step": "git"}
+#   ##installer-progress {"event": "bytes", "step": "cmdline-tools", "done": 1048576, "total": 157286400}
+#   ##installer-progress {"event": "items", "step": "flutter-precache", "done": 3, "total": 20, "detail": "sky_engine"}
+#   ##installer-progress {"event": "end", "step": "git", "status": "ok"}
+#
+# "items" is for steps that count work rather than bytes; its total may be
+# an estimate, so it never completes a step on its own.
+#
+# Everything else on stdout is ordinary log output.
+
+PROGRESS_TAG = "##installer-progress "
+
+
+def parse_line(line):
+    # Returns the event dict for a progress line, None for ordinary output
+    line = line.strip()
+    if not line.startswith(PROGRESS_TAG):
+        return None
+    try:
+        event = json.loads(line[len(PROGRESS_TAG):])
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) and "event" in event else None
+
+
+def format_line(event, **fields):
+    return PROGRESS_TAG + json.dumps(dict(fields, event=event), sort_keys=True)
+
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024.0
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
+
+
+class ProgressTracker:
+    # Turns progress events into overall and per-phase completion, download
+    # throughput and an ETA. Several steps may run at once (the orchestrator
+    # runs up to three), so the running steps and each step's download rate
+    # are tracked separately. feed() may be called from the reader thread
+    # while snapshot() is read from the UI thread.
+
+    def __init__(self, clock=time.monotonic, smoothing=0.3):
+        self.clock = clock
+        self.smoothing = smoothing
+        self.steps = {}
+        self.order = []
+        # Running step ids, in the order they started
+        self.running = []
+        self.started_at = None
+        self._last_bytes = {}
+        self._lock = threading.Lock()
+
+    def feed(self, line):
+        event = parse_line(line)
+        if event is None:
+            return False
+        self.apply(event)
+        return True
+
+    def apply(self, event):
+        now = self.clock()
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = now
+            kind = event.get("event")
+            if kind == "plan":
+                for step in event.get("steps", []):
+                    self._step(step["id"], step.get("title"), step.get("weight"))
+            elif kind == "start":
+                step = self._step(event["step"], event.get("title"))
+                step.update(state="running", started_at=now, fraction=0.0)
+                if event["step"] not in self.running:
+                    self.running.append(event["step"])
+            elif kind == "bytes":
+                self._apply_bytes(event, now)
+            elif kind == "items":
+                step = self._step(event["step"])
+                if event.get("total"):
+                    step["fraction"] = min(event.get("done", 0) / float(event["total"]), 0.95)
+                step["detail"] = event.get("detail")
+            elif kind == "end":
+                step = self._step(event["step"])
+                step.update(state=event.get("status", "ok"), finished_at=now, fraction=1.0)
+                step.pop("throughput", None)
+                if event["step"] in self.running:
+                    self.running.remove(event["step"])
+
+    def _step(self, step_id, title=None, weight=None):
+        step = self.steps.get(step_id)
+        if step is None:
+            step = {"id": step_id, "title": title or step_id, "weight": 1.0, "state": "pending", "fraction": 0.0}
+            self.steps[step_id] = step
+            self.order.append(step_id)
+        if title:
+            step["title"] = title
+        if weight is not None:
+            step["weight"] = float(weight)
+        return step
+
+    def _apply_bytes(self, event, now):
+        step = self._step(event["step"])
+        done = event.get("done", 0)
+        # The script reports -1 when the server sends no Content-Length
+        total = max(event.get("total") or 0, 0)
+        step["bytes_done"] = done
+        step["bytes_total"] = total
+        if total:
+            step["fraction"] = min(done / float(total), 1.0)
+
+        # Each step's rate is smoothed on its own, so parallel downloads do not mix
+        last = self._last_bytes.get(event["step"])
+        self._last_bytes[event["step"]] = (now, done)
+        if last and now > last[0] and done >= last[1]:
+            rate = (done - last[1]) / (now - last[0])
+            if step.get("throughput") is None:
+                step["throughput"] = rate
+            else:
+                step["throughput"] = self.smoothing * rate + (1 - self.smoothing) * step["throughput"]
+
+    def has_plan(self):
+        return bool(self.steps)
+
+    def fraction(self):
+        with self._lock:
+            return self._fraction()
+
+    def _fraction(self):
+        total_weight = sum(step["weight"] for step in self.steps.values())
+        if not total_weight:
+            return 0.0
+        done = sum(step["weight"] * step["fraction"] for step in self.steps.values())
+        return done / total_weight
+
+    def snapshot(self):
+        with self._lock:
+            fraction = self._fraction()
+            running = [dict(self.steps[step_id]) for step_id in self.running]
+            # Remaining weight at the rate weight has been completed so far
+            eta = None
+            if self.started_at is not None and fraction > 0:
+                elapsed = self.clock() - self.started_at
+                eta = elapsed * (1 - fraction) / fraction
+            # Downloads running side by side: their combined rate, and the
+            # time until the last of them finishes at its own rate
+            downloads = [step for step in running if step.get("bytes_total") and step.get("throughput")]
+            throughput = sum(step["throughput"] for step in downloads) if downloads else None
+            step_eta = None
+            if downloads:
+                step_eta = max((step["bytes_total"] - step.get("bytes_done", 0)) / step["throughput"] for step in downloads)
+            return {
+                "fraction": fraction,
+                "steps": running,
+                "step": running[-1] if running else None,
+                "completed": sum(1 for step in self.steps.values() if step["state"] not in ("pending", "running")),
+                "total": len(self.steps),
+                "throughput": throughput,
+                "eta": eta,
+                "step_eta": step_eta,
+            }
+
+    def describe(self):
+        snapshot = self.snapshot()
+        parts = []
+        if snapshot["steps"]:
+            titles = []
+            for step in snapshot["steps"]:
+                titles.append(step["title"] + (f": {step['detail']}" if step.get("detail") else ""))
+            parts.append(f"{', '.join(titles)} ({snapshot['completed'] + len(titles)}/{snapshot['total']})")
+        parts.append(f"{snapshot['fraction'] * 100:.0f}%")
+        if snapshot["throughput"]:
+            download = f"{format_bytes(snapshot['throughput'])}/s"
+            if snapshot["step_eta"] is not None:
+                download += f", {format_duration(snapshot['step_eta'])} left"
+            parts.append(download)
+        if snapshot["eta"] is not None:
+            parts.append(f"ETA {format_duration(snapshot['eta'])}")
+        return " | ".join(parts)
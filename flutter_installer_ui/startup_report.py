@@ -0,0 +1,84 @@
+import ctypes
+import sys
+import time
+
+# Startup timings, appended as one line per launch to the installer log
+# (~/flutter_installer.log) so slow starts can be compared across versions.
+# Starting an install rewrites the log, so the installer copies the current
+# launch's line to its top. This module is imported first and keeps its own
+# imports minimal.
+
+STARTED = time.perf_counter()
+
+
+def process_age():
+    # Seconds since the process was created, so the time spent before Python
+    # ran (bootloader, unpacking) is included. Windows only.
+    try:
+        kernel32 = ctypes.windll.kernel32
+    except AttributeError:
+        return None
+    created, exited, kernel, user, now = (ctypes.c_ulonglong() for _ in range(5))
+    if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(created), ctypes.byref(exited),
+                                    ctypes.byref(kernel), ctypes.byref(user)):
+        return None
+    kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+    # FILETIME counts 100 ns intervals
+    return (now.value - created.value) / 1e7
+
+
+class _ImportTimer:
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.report.imports.append((self.name, time.perf_counter() - self.started))
+        return False
+
+
+class StartupReport:
+    def __init__(self):
+        self.before_python = None
+        age = process_age()
+        if age is not None:
+            self.before_python = max(age - (time.perf_counter() - STARTED), 0.0)
+        # (module, seconds spent importing it) and (name, seconds since start)
+        self.imports = []
+        self.marks = []
+        self.written = False
+
+    def importing(self, name):
+        # with report.importing("tkinter"): import tkinter
+        return _ImportTimer(self, name)
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - STARTED))
+
+    def summary(self):
+        parts = []
+        if self.before_python is not None:
+            parts.append(f"before Python {self.before_python * 1000:.0f} ms")
+        if self.imports:
+            parts.append("imports (" + ", ".join(f"{name} {seconds * 1000:.0f} ms"
+                                                 for name, seconds in self.imports) + ")")
+        parts.extend(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.marks)
+        build = "frozen" if getattr(sys, "frozen", False) else "source"
+        return f"Startup ({build}): " + ", ".join(parts)
+
+    def write(self, path):
+        # Appends the summary to the log file at path
+        if self.written:
+            return
+        self.written = True
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {self.summary()}\n")
+        except OSError as e:
+            print(f"Error writing startup report: {e}")
+
+
+report = StartupReport()
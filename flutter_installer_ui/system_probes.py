@@ -0,0 +1,191 @@
+import ctypes
+import os
+
+from component_registry import component_named
+from environment_config import machine_environment, missing_requirements, variable
+from probe_engine import ProbeEngine
+from probe_state import fingerprint
+from tool_detection import chocolatey_package_version, chocolatey_root, detect_android_studio, detect_chocolatey, detect_flutter, detect_git, detect_java, detect_ndk, detect_sdk_package, which
+
+# Each probe returns the status string shown next to its component, or a
+# (status, installed version) tuple, so the checks can run on any thread
+# (and on Linux, against fake environments). component_registry.py names
+# the probe, timeout and fingerprint of each component.
+
+
+def android_sdk_root():
+    return os.path.join(os.getenv("LOCALAPPDATA", ""), "Android", "Sdk")
+
+
+READY_STATUSES = ["Installed", "Set", "Activated"]
+
+
+def check_admin_privileges():
+    is_admin = ctypes.windll.shell32.IsUserAnAdmin() != 0
+    return "Activated" if is_admin else "Not Activated"
+
+
+def installed(detection):
+    # Probe result for a tool-detection lookup: the version is shown next to the status
+    if detection is None:
+        return "Not Installed"
+    return ("Installed", detection.version)
+
+
+def android_studio_dir():
+    program_files = os.environ.get("ProgramFiles", "C:\\Program Files")
+    return os.path.join(program_files, "Android", "Android Studio")
+
+
+def check_chocolatey():
+    return installed(detect_chocolatey())
+
+
+def check_git():
+    return installed(detect_git())
+
+
+def check_android_studio():
+    # There is no command for Android Studio; look for its default installation path
+    return installed(detect_android_studio(android_studio_dir()))
+
+
+def check_openjdk():
+    return installed(detect_java())
+
+
+def check_flutter_sdk():
+    return installed(detect_flutter("C:\\flutter"))
+
+
+def check_android_sdk_tools():
+    latest_dir = os.path.join(android_sdk_root(), "cmdline-tools", "latest")
+    if not os.path.exists(os.path.join(latest_dir, "bin", "sdkmanager.bat")):
+        return "Not Installed"
+    return installed(detect_sdk_package(latest_dir))
+
+
+def check_ndk():
+    return installed(detect_ndk(android_sdk_root()))
+
+
+def check_environment_variables():
+    # Reads the registry as well as this process's environment, so a change
+    # made by the installer shows up without restarting the app
+    env = machine_environment()
+    sdk_root = variable(env, "ANDROID_HOME") or android_sdk_root()
+    if missing_requirements(env, sdk_root, "C:\\flutter"):
+        return "Not Set"
+    return "Set"
+
+
+def check_chocolatey_package(package_id):
+    # Components added in components.json are Chocolatey packages
+    version = chocolatey_package_version(package_id)
+    return ("Installed", version) if version else "Not Installed"
+
+
+def chocolatey_fingerprint():
+    root = chocolatey_root()
+    return fingerprint(
+        paths=[os.path.join(root, "bin", "choco.exe")],
+        files=[os.path.join(root, "lib", "chocolatey", "chocolatey.nuspec")],
+        env=["PATH", "ChocolateyInstall"],
+    )
+
+
+def git_fingerprint():
+    root = chocolatey_root()
+    git = which("git")
+    return fingerprint(
+        paths=[git] if git else [],
+        files=[os.path.join(root, "lib", package_id, f"{package_id}.nuspec") for package_id in ("git.install", "git")],
+        env=["PATH"],
+    )
+
+
+def android_studio_fingerprint():
+    install_dir = android_studio_dir()
+    return fingerprint(
+        paths=[os.path.join(install_dir, "bin", "studio64.exe")],
+        files=[os.path.join(install_dir, "product-info.json")],
+        env=["ProgramFiles"],
+    )
+
+
+def openjdk_fingerprint():
+    java = which("java")
+    java_home = os.environ.get("JAVA_HOME")
+    return fingerprint(
+        paths=[java] if java else [],
+        files=[os.path.join(java_home, "release")] if java_home else [],
+        env=["PATH", "JAVA_HOME"],
+    )
+
+
+def flutter_fingerprint():
+    return fingerprint(paths=["C:\\flutter"], files=[os.path.join("C:\\flutter", "version")])
+
+
+def android_sdk_tools_fingerprint():
+    latest_dir = os.path.join(android_sdk_root(), "cmdline-tools", "latest")
+    return fingerprint(
+        paths=[os.path.join(latest_dir, "bin", "sdkmanager.bat")],
+        files=[os.path.join(latest_dir, "source.properties")],
+        env=["LOCALAPPDATA"],
+    )
+
+
+def ndk_fingerprint():
+    # Installing another NDK side by side changes the directory's mtime
+    return fingerprint(paths=[os.path.join(android_sdk_root(), "ndk")], env=["LOCALAPPDATA"])
+
+
+def chocolatey_package_fingerprint(package_id):
+    return fingerprint(files=[os.path.join(chocolatey_root(), "lib", package_id, f"{package_id}.nuspec")],
+                       env=["ChocolateyInstall"])
+
+
+def run_system_check(components, on_result, store=None, incremental=False, touched=frozenset()):
+    # Probes `components` (names) concurrently. An incremental check only
+    # re-probes components whose fingerprint changed since the last run
+    # (recorded in `store`, a ProbeStateStore), whose result is older than
+    # the store's max_age, or that are in `touched`; the others report their
+    # last known result. Components without a fingerprint are always probed.
+    # Returns {component: (status, version)}.
+    previous = store.load() if store and incremental else {}
+    entries = {component: component_named(component) for component in components}
+    fingerprints = {}
+    for component, entry in entries.items():
+        if entry.fingerprint is not None:
+            fingerprints[component] = entry.fingerprint()
+
+    engine = ProbeEngine(max_workers=4)
+    results = {}
+    to_probe = []
+    for component in components:
+        engine.register(component, entries[component].probe, entries[component].probe_timeout)
+
+        known = previous.get(component)
+        if (component not in touched and known and component in fingerprints
+                and store.is_current(known, fingerprints[component])):
+            # Nothing the probe looks at has changed recently; keep the last result
+            results[component] = (known["status"], known.get("version"))
+            on_result(component, known["status"], known.get("version"))
+        else:
+            to_probe.append(component)
+
+    if to_probe:
+        # An empty list would make the engine run every registered probe
+        engine.run(on_result, names=to_probe)
+
+    # Timeouts and errors are not remembered so they are retried next time
+    state = {}
+    for component, status in engine.results.items():
+        results[component] = (status, engine.details.get(component))
+        if component in fingerprints and status in READY_STATUSES + ["Not Installed", "Not Set"]:
+            version = engine.details.get(component) if status in READY_STATUSES else None
+            state[component] = {"fingerprint": fingerprints[component], "status": status, "version": version}
+    if state and store:
+        store.update(state)
+    return results
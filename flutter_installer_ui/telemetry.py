@@ -0,0 +1,310 @@
+import collections
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import uuid
+
+# Structured timings of installer runs, appended as JSON lines to
+# <log name>.spans.jsonl next to the installation log:
+#
+#   {"type": "run", "run": "3f2a9c01d4e7", "command": "install", "machine": "BUILD-07", "start": 1718000000.0, ...}
+#   {"type": "span", "run": "3f2a9c01d4e7", "kind": "download", "name": "commandlinetools-win-11076708_latest.zip",
+#    "step": "cmdline-tools", "start": 1718000003.2, "end": 1718000015.7, "duration": 12.5, "status": "ok",
+#    "bytes": 153000000}
+#   {"type": "end", "run": "3f2a9c01d4e7", "end": 1718001500.0, "duration": 1500.0, "status": "ok", "profile": {...}}
+#
+# Span kinds: step (each install step, with its dependencies), command
+# (every process a step runs), probe, catalog, download, cache (artifact
+# cache hits), extract and chocolatey (one per package of the batched
+# install). Instrumented modules call span() and record(), which do nothing
+# while no run is active, so they work the same without telemetry.
+# summarize() reads the files of many runs and machines for
+# `FlutterInstallerCli report`.
+
+SPANS_SUFFIX = ".spans.jsonl"
+
+_active = []
+_local = threading.local()
+
+
+def spans_path(log_file):
+    return os.path.splitext(log_file)[0] + SPANS_SUFFIX
+
+
+def set_step(step_id):
+    # Spans recorded on this thread are attributed to the install step
+    _local.step = step_id
+
+
+class Telemetry:
+    # One run's recorder; every line is appended as soon as it is known, so
+    # a run that crashes still leaves its spans behind
+
+    def __init__(self, path, command, **meta):
+        self.path = path
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self._clock = time.monotonic()
+        self._lock = threading.Lock()
+        entry = {
+            "type": "run",
+            "command": command,
+            "machine": platform.node(),
+            "platform": sys.platform,
+            "arch": platform.machine(),
+            "start": round(self.started, 3),
+        }
+        if hasattr(sys, "getwindowsversion"):
+            entry["windows_build"] = sys.getwindowsversion().build
+        entry.update(meta)
+        self._write(entry)
+
+    def _write(self, entry):
+        entry["run"] = self.run_id
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Error writing telemetry: {e}")
+
+    def record(self, kind, name, start, duration, status=None, **fields):
+        # start is a time.time() timestamp
+        entry = {"type": "span", "kind": kind, "name": name, "start": round(start, 3),
+                 "end": round(start + duration, 3), "duration": round(duration, 3), "status": status}
+        step = getattr(_local, "step", None)
+        if step:
+            entry["step"] = step
+        entry.update((key, value) for key, value in fields.items() if value is not None)
+        self._write(entry)
+
+    @contextlib.contextmanager
+    def span(self, kind, name, **fields):
+        # The block can fill in the yielded dict: "status", "bytes" or any other field
+        span = dict(fields)
+        start = time.time()
+        clock = time.monotonic()
+        try:
+            yield span
+        except BaseException as e:
+            span["status"] = "error"
+            span.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            status = span.pop("status", "ok")
+            self.record(kind, name, start, time.monotonic() - clock, status, **span)
+
+    def finish(self, status, **fields):
+        entry = {"type": "end", "end": round(time.time(), 3),
+                 "duration": round(time.monotonic() - self._clock, 3), "status": status}
+        entry.update(fields)
+        self._write(entry)
+
+
+def start_run(path, command, **meta):
+    # Spans go to the most recently started run until it is finished
+    recorder = Telemetry(path, command, **meta)
+    _active.append(recorder)
+    return recorder
+
+
+def finish_run(recorder, status, **fields):
+    recorder.finish(status, **fields)
+    if recorder in _active:
+        _active.remove(recorder)
+
+
+def active():
+    return _active[-1] if _active else None
+
+
+@contextlib.contextmanager
+def _unrecorded(fields):
+    yield dict(fields)
+
+
+def span(kind, name, **fields):
+    recorder = active()
+    return recorder.span(kind, name, **fields) if recorder else _unrecorded(fields)
+
+
+def record(kind, name, start, duration, status=None, **fields):
+    recorder = active()
+    if recorder:
+        recorder.record(kind, name, start, duration, status, **fields)
+
+
+def load_runs(paths):
+    # {run id: {"run": {...}, "end": {...} or None, "spans": [...]}} from
+    # span files, or folders of them (e.g. one collected from each machine)
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*" + SPANS_SUFFIX), recursive=True)))
+        else:
+            files.append(path)
+    runs = collections.OrderedDict()
+    for path in files:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            continue
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A run cut off mid-write leaves a partial last line
+                continue
+            if not isinstance(entry, dict) or not isinstance(entry.get("run"), str):
+                continue
+            run = runs.setdefault(entry["run"], {"run": {}, "end": None, "spans": []})
+            if entry.get("type") == "run":
+                run["run"] = entry
+            elif entry.get("type") == "end":
+                run["end"] = entry
+            elif entry.get("type") == "span":
+                run["spans"].append(entry)
+    return runs
+
+
+def failed(status):
+    # Probes report "Not Installed" and the like, which are results, not failures
+    if isinstance(status, bool):
+        return False
+    if isinstance(status, int):
+        return status != 0
+    return str(status).lower() in ("failed", "error", "blocked", "timed out")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def timed(span):
+    # A span line that was written whole; one from another version of the
+    # installer, or edited by hand, can lack fields or hold other types
+    return (isinstance(span.get("kind"), str) and isinstance(span.get("name"), str)
+            and all(isinstance(span.get(field), (int, float)) and not isinstance(span.get(field), bool)
+                    for field in ("start", "end", "duration")))
+
+
+def critical_path(spans):
+    # The chain of install steps that decided when the run ended: from the
+    # step that finished last, back through the dependency that finished last
+    steps = {span["name"]: span for span in spans if timed(span) and span["kind"] == "step"}
+    if not steps:
+        return []
+    path = []
+    current = max(steps.values(), key=lambda span: span["end"])
+    while current is not None:
+        dependencies = [steps[name] for name in current.get("depends_on") or [] if name in steps]
+        gating = max(dependencies, key=lambda span: span["end"]) if dependencies else None
+        # Time the step spent ready but waiting for a worker
+        waited = current["start"] - gating["end"] if gating else 0.0
+        path.append({"step": current["name"], "duration": current["duration"], "waited": round(max(waited, 0.0), 3)})
+        current = gating
+    path.reverse()
+    return path
+
+
+def run_group(run, group_by):
+    # A run-metadata field (machine, command, ...) or a profile entry (flutter, openjdk, ...)
+    meta = dict(run["run"], **(run["end"] or {}))
+    value = meta.get(group_by)
+    if value is None and isinstance(meta.get("profile"), dict):
+        value = meta["profile"].get(group_by)
+    return str(value) if value is not None else "unknown"
+
+
+def summarize(runs, group_by="machine", top=10):
+    installs = [run for run in runs.values() if run["run"].get("command") == "install" and run["end"]
+                and isinstance(run["end"].get("duration"), (int, float))]
+
+    phases = {}
+    for run in runs.values():
+        for span in run["spans"]:
+            if not timed(span):
+                continue
+            phase = phases.setdefault((span.get("kind"), span.get("name")), {"durations": [], "bytes": 0, "failed": 0})
+            phase["durations"].append(span.get("duration"))
+            if isinstance(span.get("bytes"), int):
+                phase["bytes"] += span["bytes"]
+            if failed(span.get("status")):
+                phase["failed"] += 1
+    slowest = []
+    for (kind, name), phase in phases.items():
+        durations = phase["durations"]
+        entry = {
+            "kind": kind,
+            "name": name,
+            "count": len(durations),
+            "median": round(percentile(durations, 0.5), 3),
+            "p90": round(percentile(durations, 0.9), 3),
+            "max": round(max(durations), 3),
+            "total": round(sum(durations), 3),
+            "failed": phase["failed"],
+        }
+        if phase["bytes"]:
+            entry["bytes"] = phase["bytes"]
+            entry["mb_per_s"] = round(phase["bytes"] / 1048576.0 / max(sum(durations), 1e-6), 2)
+        slowest.append(entry)
+    slowest.sort(key=lambda entry: entry["median"], reverse=True)
+
+    paths = collections.Counter()
+    on_path = {}
+    for run in installs:
+        path = critical_path(run["spans"])
+        paths[tuple(entry["step"] for entry in path)] += 1
+        for entry in path:
+            on_path.setdefault(entry["step"], []).append(entry)
+    critical = {}
+    if paths:
+        common, count = paths.most_common(1)[0]
+        critical = {
+            "steps": [{"step": step,
+                       "median": round(percentile([entry["duration"] for entry in on_path[step]], 0.5), 3),
+                       "median_waited": round(percentile([entry["waited"] for entry in on_path[step]], 0.5), 3)}
+                      for step in common],
+            "runs": count,
+            "variants": len(paths),
+        }
+
+    groups = {}
+    for run in installs:
+        groups.setdefault(run_group(run, group_by), []).append(run)
+    by_group = {}
+    for name, members in sorted(groups.items()):
+        durations = [run["end"]["duration"] for run in members]
+        step_durations = {}
+        for run in members:
+            for span in run["spans"]:
+                if timed(span) and span.get("kind") == "step":
+                    step_durations.setdefault(span.get("name"), []).append(span.get("duration"))
+        slowest_step = max(step_durations, key=lambda step: percentile(step_durations[step], 0.5)) if step_durations else None
+        by_group[name] = {
+            "installs": len(members),
+            "succeeded": sum(1 for run in members if run["end"].get("status") == "ok"),
+            "median_duration": round(percentile(durations, 0.5), 1),
+            "max_duration": round(max(durations), 1),
+            "slowest_step": slowest_step,
+        }
+
+    return {
+        "runs": len(runs),
+        "installs": len(installs),
+        "slowest_phases": slowest[:top],
+        "critical_path": critical,
+        "group_by": group_by,
+        "groups": by_group,
+    }
@@ -0,0 +1,225 @@
+import collections
+import glob
+import json
+import os
+import re
+import subprocess
+import threading
+
+from versions import sort_versions
+
+# Finds tools without starting them: executables are resolved with a cached
+# PATH/PATHEXT scan and versions come from metadata files on disk. Running
+# the tool itself (without a shell) is only the last resort.
+
+Detection = collections.namedtuple("Detection", ["path", "version", "source"])
+
+VERSION_IN_TEXT = re.compile(r"(\d+(?:\.\d+)+)")
+NUSPEC_VERSION = re.compile(r"<version>\s*([^<\s]+)\s*</version>")
+
+
+class ExecutableResolver:
+    # Lists each PATH directory at most once and answers every lookup from
+    # that listing, instead of stat-ing every PATH x PATHEXT combination.
+
+    def __init__(self, path=None, pathext=None):
+        if path is None:
+            path = os.environ.get("PATH", "")
+        if pathext is None:
+            pathext = os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD" if os.name == "nt" else "")
+        self.directories = [d.strip('"') for d in path.split(os.pathsep) if d.strip()]
+        self.extensions = [e.lower() for e in pathext.split(";") if e]
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def _listing(self, directory):
+        with self._lock:
+            listing = self._listings.get(directory)
+            if listing is None:
+                try:
+                    listing = {os.path.normcase(name): name for name in os.listdir(directory)}
+                except OSError:
+                    listing = {}
+                self._listings[directory] = listing
+            return listing
+
+    def which(self, name):
+        candidates = [name]
+        if not os.path.splitext(name)[1]:
+            candidates = [name + ext for ext in self.extensions] + [name]
+        for directory in self.directories:
+            listing = self._listing(directory)
+            for candidate in candidates:
+                found = listing.get(os.path.normcase(candidate))
+                if found:
+                    path = os.path.join(directory, found)
+                    if os.path.isfile(path):
+                        return path
+        return None
+
+
+_resolver = None
+_resolver_key = None
+_resolver_lock = threading.Lock()
+
+
+def resolver():
+    # Shared resolver, rebuilt only when PATH or PATHEXT change
+    global _resolver, _resolver_key
+    key = (os.environ.get("PATH", ""), os.environ.get("PATHEXT", ""))
+    with _resolver_lock:
+        if _resolver is None or _resolver_key != key:
+            _resolver = ExecutableResolver()
+            _resolver_key = key
+        return _resolver
+
+
+def which(name):
+    return resolver().which(name)
+
+
+def read_properties(path):
+    # key=value files such as the JDK `release` file or Android `source.properties`
+    properties = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                key, sep, value = line.partition("=")
+                if sep:
+                    properties[key.strip()] = value.strip().strip('"')
+    except OSError:
+        return None
+    return properties
+
+
+def read_nuspec_version(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            match = NUSPEC_VERSION.search(f.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def chocolatey_root():
+    return os.environ.get("ChocolateyInstall") or os.path.join(os.environ.get("ProgramData", "C:\\ProgramData"), "chocolatey")
+
+
+def chocolatey_package_version(package_id, root=None):
+    # Chocolatey keeps lib/<id>/<id>.nuspec for every installed package
+    return read_nuspec_version(os.path.join(root or chocolatey_root(), "lib", package_id, f"{package_id}.nuspec"))
+
+
+def command_version(executable, args=("--version",), timeout=15):
+    # Fallback when there is no metadata: run the tool directly, never through a shell
+    try:
+        result = subprocess.run([executable] + list(args), capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    # `java -version` writes to stderr
+    match = VERSION_IN_TEXT.search(result.stdout + result.stderr)
+    return match.group(1) if match else None
+
+
+def detect_chocolatey(root=None):
+    root = root or chocolatey_root()
+    executable = which("choco") or _existing(os.path.join(root, "bin", "choco.exe"))
+    if not executable:
+        return None
+    version = chocolatey_package_version("chocolatey", root)
+    if version:
+        return Detection(executable, version, "nuspec")
+    return Detection(executable, command_version(executable), "command")
+
+
+def _git_for_windows_registry_version():
+    try:
+        import winreg
+    except ImportError:
+        return None
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\GitForWindows") as key:
+            return winreg.QueryValueEx(key, "CurrentVersion")[0]
+    except OSError:
+        return None
+
+
+def detect_git(choco_root=None):
+    executable = which("git")
+    if not executable:
+        return None
+    version = _git_for_windows_registry_version()
+    if version:
+        return Detection(executable, version, "registry")
+    for package_id in ("git.install", "git"):
+        version = chocolatey_package_version(package_id, choco_root)
+        if version:
+            return Detection(executable, version, "nuspec")
+    return Detection(executable, command_version(executable), "command")
+
+
+def java_home_of(executable):
+    # <home>/bin/java(.exe) -> <home>
+    return os.path.dirname(os.path.dirname(os.path.realpath(executable)))
+
+
+def detect_java(java_home=None):
+    java_home = java_home if java_home is not None else os.environ.get("JAVA_HOME")
+    executable = None
+    if java_home:
+        executable = _existing(os.path.join(java_home, "bin", "java.exe")) or _existing(os.path.join(java_home, "bin", "java"))
+    executable = executable or which("java")
+    if not executable:
+        return None
+    release = read_properties(os.path.join(java_home_of(executable), "release"))
+    if release and release.get("JAVA_VERSION"):
+        return Detection(executable, release["JAVA_VERSION"], "release")
+    return Detection(executable, command_version(executable, ("-version",), timeout=30), "command")
+
+
+def detect_android_studio(install_dir):
+    executable = _existing(os.path.join(install_dir, "bin", "studio64.exe"))
+    if not executable:
+        return None
+    try:
+        with open(os.path.join(install_dir, "product-info.json"), "r", encoding="utf-8") as f:
+            return Detection(executable, json.load(f).get("version"), "product-info")
+    except (OSError, ValueError):
+        return Detection(executable, None, None)
+
+
+def detect_flutter(flutter_root):
+    if not os.path.isdir(flutter_root):
+        return None
+    # The `version` file is written by the Flutter tool on its first run
+    try:
+        with open(os.path.join(flutter_root, "version"), "r", encoding="utf-8") as f:
+            return Detection(flutter_root, f.read().strip() or None, "version")
+    except OSError:
+        return Detection(flutter_root, None, None)
+
+
+def detect_sdk_package(package_dir):
+    # Android SDK packages record their revision in source.properties
+    if not os.path.isdir(package_dir):
+        return None
+    properties = read_properties(os.path.join(package_dir, "source.properties")) or {}
+    return Detection(package_dir, properties.get("Pkg.Revision"), "source.properties")
+
+
+def detect_ndk(sdk_root):
+    ndk_dir = os.path.join(sdk_root, "ndk")
+    if not os.path.isdir(ndk_dir):
+        return None
+    revisions = []
+    for properties_path in glob.glob(os.path.join(ndk_dir, "*", "source.properties")):
+        revision = (read_properties(properties_path) or {}).get("Pkg.Revision")
+        if revision:
+            revisions.append(revision)
+    if not revisions:
+        return Detection(ndk_dir, None, None)
+    return Detection(ndk_dir, sort_versions(revisions)[0], "source.properties")
+
+
+def _existing(path):
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,85 @@
+import subprocess
+import threading
+
+from flutter_releases import CHANNELS
+from versions import sort_versions
+
+# The version lists behind the components' dropdowns (see
+# component_registry.py). Each fetcher takes the shared CatalogClients and
+# the validators of the cached list, and returns the versions, or a
+# (versions, validators) tuple for sources that support revalidation.
+
+
+class CatalogClients:
+    # Each client is created the first time a selected component's fetcher
+    # asks for it; the GUI and the install plan share them
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chocolatey_feed = None
+        self._flutter_releases = None
+        self._android_repository = None
+
+    @property
+    def chocolatey_feed(self):
+        with self._lock:
+            if self._chocolatey_feed is None:
+                from chocolatey_feed import ChocolateyFeedClient
+                self._chocolatey_feed = ChocolateyFeedClient()
+            return self._chocolatey_feed
+
+    @property
+    def flutter_releases(self):
+        with self._lock:
+            if self._flutter_releases is None:
+                from flutter_releases import FlutterReleaseIndex
+                self._flutter_releases = FlutterReleaseIndex()
+            return self._flutter_releases
+
+    @property
+    def android_repository(self):
+        with self._lock:
+            if self._android_repository is None:
+                from android_repository import AndroidRepository
+                self._android_repository = AndroidRepository()
+            return self._android_repository
+
+
+def with_latest(versions):
+    return ["latest"] + sort_versions([v for v in versions if v != "latest"])
+
+
+def flutter_versions(clients, validators=None):
+    releases = clients.flutter_releases
+    try:
+        added = releases.refresh()
+        print(f"Flutter release index: {added} new releases")
+    except (OSError, subprocess.CalledProcessError) as e:
+        # A previously saved index is still better than the bare channel list
+        if not releases.releases:
+            raise
+        print(f"Error refreshing Flutter releases: {e}")
+    return CHANNELS + releases.versions()
+
+
+def chocolatey_versions(package_id, clients, validators=None):
+    versions, validators = clients.chocolatey_feed.versions(package_id, validators)
+    return with_latest(versions), validators
+
+
+def ndk_versions(clients, validators=None):
+    repository = clients.android_repository
+    try:
+        repository.refresh()
+    except (OSError, ValueError, SyntaxError) as e:
+        # ElementTree's ParseError is a SyntaxError
+        if not repository.packages:
+            raise
+        print(f"Error refreshing the Android repository manifest: {e}")
+    return ["latest"] + repository.ndk_versions()
+
+
+def fetch_versions(component, clients):
+    # A component's version list without the validators, for one-off lookups
+    result = component.versions(clients)
+    return result[0] if isinstance(result, tuple) else result
@@ -0,0 +1,178 @@
+import bisect
+import functools
+import re
+
+VERSION_PATTERN = re.compile(
+    r"^\s*v?(?P<release>\d+(?:\.\d+)*)"
+    r"(?:-(?P<prerelease>[0-9A-Za-z.-]+))?"
+    r"(?:\+(?P<build>[0-9A-Za-z.-]+))?\s*$"
+)
+
+
+def _identifier_key(identifiers):
+    # Numeric identifiers compare numerically and sort before alphanumeric ones (semver 11.4)
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in identifiers)
+
+
+@functools.total_ordering
+class Version:
+    # A parsed version such as 17.0.8, 1.2.3-beta.2 or 2.45.1+build.7.
+    #
+    # Ordering follows semver precedence for any number of release parts
+    # (trailing zeros are ignored, so 17 == 17.0.0): a pre-release sorts before
+    # its release, and pre-release identifiers compare numerically when they
+    # are numbers. Build metadata does not affect precedence in semver; here
+    # it only breaks ties so that ordering stays consistent with equality.
+
+    __slots__ = ("text", "release", "prerelease", "build", "_key")
+
+    def __init__(self, text, release, prerelease=(), build=()):
+        self.text = text
+        self.release = tuple(release)
+        self.prerelease = tuple(prerelease)
+        self.build = tuple(build)
+
+        release_key = self.release
+        while len(release_key) > 1 and release_key[-1] == 0:
+            release_key = release_key[:-1]
+        if self.prerelease:
+            prerelease_key = (0, _identifier_key(self.prerelease))
+        else:
+            prerelease_key = (1, ())
+        self._key = (release_key, prerelease_key, _identifier_key(self.build))
+
+    @staticmethod
+    def parse(text):
+        return _parse(text)
+
+    @classmethod
+    def series_upper_bound(cls, prefix):
+        # The smallest possible version above every version that starts with `prefix`,
+        # e.g. (17,) -> just below 18.0.0's lowest pre-release
+        bound = cls.__new__(cls)
+        bound.text = ""
+        bound.release = tuple(prefix[:-1]) + (prefix[-1] + 1,)
+        bound.prerelease = ()
+        bound.build = ()
+        bound._key = (bound.release, (0, ()), ())
+        return bound
+
+    @property
+    def major(self):
+        return self.release[0]
+
+    @property
+    def minor(self):
+        return self.release[1] if len(self.release) > 1 else 0
+
+    def in_series(self, prefix):
+        padded = self.release + (0,) * max(0, len(prefix) - len(self.release))
+        return padded[:len(prefix)] == tuple(prefix)
+
+    def __eq__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key == other._key
+
+    def __lt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key < other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Version({self.text!r})"
+
+
+@functools.lru_cache(maxsize=None)
+def _parse(text):
+    match = VERSION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Not a version: {text!r}")
+    prerelease = match.group("prerelease")
+    build = match.group("build")
+    return Version(
+        text,
+        (int(part) for part in match.group("release").split(".")),
+        prerelease.split(".") if prerelease else (),
+        build.split(".") if build else (),
+    )
+
+
+def _sort_key(version):
+    return version._key
+
+
+def parse_or_none(text):
+    try:
+        return _parse(text)
+    except ValueError:
+        return None
+
+
+def satisfies(installed, requested):
+    # Whether an installed version meets a requested one: "17" is met by any
+    # 17.x such as 17.0.8, "17.0.8" by 17.0.8 (or a package fix like 17.0.8.1)
+    have = parse_or_none(installed)
+    want = parse_or_none(requested)
+    if have is None or want is None:
+        return installed == requested
+    if want.prerelease or have.prerelease:
+        return have == want
+    return have.in_series(want.release)
+
+
+def sort_versions(texts, prefix=None, newest_first=True):
+    # Sorts version strings, optionally ignoring a prefix such as "ndk;".
+    # Strings that are not versions keep their relative order at the end.
+    parsed = []
+    others = []
+    for text in texts:
+        version = parse_or_none(text[len(prefix):] if prefix and text.startswith(prefix) else text)
+        if version is None:
+            others.append(text)
+        else:
+            parsed.append((version, text))
+    # Sorting on the precomputed keys compares plain tuples instead of calling Version.__lt__
+    parsed.sort(key=lambda item: _sort_key(item[0]), reverse=newest_first)
+    return [text for _version, text in parsed] + others
+
+
+class VersionIndex:
+    # Versions kept in ascending order so that lookups such as
+    # "newest 17.x" are a bisect instead of a scan.
+
+    def __init__(self, texts=()):
+        self.versions = sorted((v for v in map(parse_or_none, texts) if v is not None), key=_sort_key)
+
+    def add(self, text):
+        bisect.insort(self.versions, Version.parse(text))
+
+    def newest(self, prefix=None, include_prerelease=False):
+        if prefix:
+            index = bisect.bisect_left(self.versions, Version.series_upper_bound(prefix))
+        else:
+            index = len(self.versions)
+        while index > 0:
+            index -= 1
+            version = self.versions[index]
+            if prefix and not version.in_series(prefix):
+                return None
+            if include_prerelease or not version.prerelease:
+                return version
+        return None
+
+    def __contains__(self, text):
+        version = parse_or_none(text)
+        if version is None:
+            return False
+        index = bisect.bisect_left(self.versions, version)
+        return index < len(self.versions) and self.versions[index] == version
+
+    def __len__(self):
+        return len(self.versions)
@@ -0,0 +1,123 @@
+import collections
+import os
+import shutil
+import stat
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+
+# Extracts an archive straight into its final location. Members are
+# streamed in bounded blocks into "<destination>.partial" (a sibling, so on
+# the same volume) by several workers, each with its own handle on the zip;
+# zlib releases the GIL, so decompression really runs in parallel. The
+# finished tree then replaces the destination with a rename.
+#
+# strip_prefix drops a top-level folder from every member, e.g. the
+# "cmdline-tools/" folder of the command-line tools archive; "auto" drops
+# whatever single folder the archive is wrapped in (NDK archives use
+# "android-ndk-r27c/").
+
+COPY_BLOCK = 1024 * 1024
+
+
+class UnsafeArchiveError(Exception):
+    pass
+
+
+def common_top_level(names):
+    tops = {name.split("/", 1)[0] for name in names if name.strip("/")}
+    if len(tops) == 1 and all("/" in name for name in names):
+        return tops.pop()
+    return None
+
+
+def _target_path(root, name):
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or ".." in parts or ":" in parts[0] or name.startswith(("/", "\\")):
+        raise UnsafeArchiveError(f"Refusing to extract {name!r} outside the destination")
+    return os.path.join(root, *parts)
+
+
+def extract_zip(archive, destination, strip_prefix=None, workers=4, progress=None):
+    with telemetry.span("extract", os.path.basename(archive)) as span:
+        count, total = _extract_zip(archive, destination, strip_prefix, workers, progress)
+        span.update(bytes=total, files=count)
+    return count, total
+
+
+def _extract_zip(archive, destination, strip_prefix, workers, progress):
+    staging = destination + ".partial"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    with zipfile.ZipFile(archive) as zf:
+        members = zf.infolist()
+    if strip_prefix == "auto":
+        strip_prefix = common_top_level([m.filename for m in members])
+
+    files = []
+    directories = {staging}
+    for member in members:
+        name = member.filename
+        if strip_prefix:
+            if not name.startswith(strip_prefix + "/"):
+                continue
+            name = name[len(strip_prefix) + 1:]
+        if not name:
+            continue
+        target = _target_path(staging, name)
+        if member.is_dir():
+            directories.add(target)
+        else:
+            directories.add(os.path.dirname(target))
+            files.append((member, target))
+
+    # Directories first, from one thread, so workers never race to create them
+    for directory in sorted(directories):
+        os.makedirs(directory, exist_ok=True)
+
+    total = sum(member.file_size for member, _ in files)
+    written = [0]
+    lock = threading.Lock()
+
+    # Largest members first, so a big file never starts last and leaves the other workers idle
+    files.sort(key=lambda item: item[0].file_size, reverse=True)
+    queue = collections.deque(files)
+
+    def extract():
+        with zipfile.ZipFile(archive) as zf:
+            while True:
+                try:
+                    member, target = queue.popleft()
+                except IndexError:
+                    return
+                with zf.open(member) as source, open(target, "wb") as out:
+                    shutil.copyfileobj(source, out, COPY_BLOCK)
+                mode = member.external_attr >> 16
+                if mode and os.name != "nt":
+                    os.chmod(target, stat.S_IMODE(mode))
+                with lock:
+                    written[0] += member.file_size
+                    done = written[0]
+                if progress:
+                    progress(done, total)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="unzip") as pool:
+        for future in [pool.submit(extract) for _ in range(min(workers, len(files)))]:
+            future.result()
+
+    replace_directory(staging, destination)
+    return len(files), total
+
+
+def replace_directory(source, destination):
+    # Swaps a finished tree into place; the old one is only removed afterwards
+    previous = None
+    if os.path.exists(destination):
+        previous = destination + ".old"
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(destination, previous)
+    os.replace(source, destination)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
@@ -7,10 +7,20 @@
 # It performs the following actions:
 # 1. Ensures the script is run with Administrator privileges.
 # 2. Installs Chocolatey, the package manager for Windows.
-# 3. Installs Git, Android Studio, and the latest OpenJDK using Chocolatey.
+# 3. Installs Git, OpenJDK, Android Studio and any extra packages selected
+#    in components.json (e.g. Chrome, Visual Studio Build Tools) in one
+#    Chocolatey run.
 # 4. Clones the stable channel of the Flutter SDK from GitHub.
-# 5. Sets up all required environment variables (PATH, ANDROID_HOME).
-# 6. Runs `flutter doctor` to accept Android licenses and validate the setup.
+# 5. Warms up the Flutter tool cache (`flutter precache`) in the background
+#    while the Android SDK components are installed.
+# 6. Sets up all required environment variables (PATH, ANDROID_HOME).
+# 7. Runs `flutter doctor` to accept Android licenses and validate the setup.
+#
+# Finished steps are kept in a journal (.flutter_installer\install_journal.script.json
+# in your profile), so running the script again after a failure or a restart
+# skips the work that is still in place and continues interrupted downloads.
+# Pass -Fresh to start over, and -With googlechrome,vctools to choose which
+# of the components.json packages to install.
 #
 # Usage:
 # 1. Right-click on this script.
@@ -23,7 +33,10 @@ param(
     [string]$GitVersion = "latest",
     [string]$JavaVersion = "latest",
     [string]$NdkVersion = "latest",
-    [string]$AndroidStudioVersion = "latest"
+    [string]$AndroidStudioVersion = "latest",
+    [string[]]$PrecachePlatforms = @("android", "windows"),
+    [string[]]$With,
+    [switch]$Fresh
 )
 
 # -------------------------------
@@ -35,6 +48,145 @@ function Write-Section($message) {
     Write-Host "================================================================="
 }
 
+# Progress lines are parsed by the installer UI (see progress_protocol.py)
+function Write-InstallerProgress($kind, [hashtable]$fields = @{}) {
+    $fields["event"] = $kind
+    Write-Host ("##installer-progress " + (ConvertTo-Json $fields -Compress -Depth 4))
+}
+
+function Start-Step($id) {
+    Write-InstallerProgress "start" @{ step = $id }
+    $entry = $journal.steps[$id]
+    if ($entry -and $entry.status -eq "running") {
+        Write-Host "Resuming $id`: the previous run stopped during this step."
+    }
+    $journal.steps[$id] = @{ status = "running"; inputs = $stepInputs[$id]; started = (Get-Date).ToString("o") }
+    Save-InstallJournal
+}
+
+function Complete-Step($id, $status = "ok", [hashtable]$outputs = @{}) {
+    Write-InstallerProgress "end" @{ step = $id; status = $status }
+    $journal.steps[$id] = @{ status = $status; inputs = $stepInputs[$id]; outputs = $outputs; finished = (Get-Date).ToString("o") }
+    Save-InstallJournal
+}
+
+# The install journal: what an unfinished earlier run already did. Written
+# to a temporary file and swapped in, so it is never left half-written.
+function Read-InstallJournal {
+    $journal = @{ format = 1; started = (Get-Date).ToString("o"); steps = @{} }
+    if ($Fresh -or -not (Test-Path $journalPath)) { return $journal }
+    try {
+        $saved = Get-Content $journalPath -Raw | ConvertFrom-Json
+        if ($saved.format -eq 1) {
+            $journal.started = $saved.started
+            foreach ($property in $saved.steps.PSObject.Properties) { $journal.steps[$property.Name] = $property.Value }
+        }
+    } catch {
+        Write-Host "Ignoring an unreadable install journal: $_"
+    }
+    return $journal
+}
+
+function Save-InstallJournal {
+    $temporary = "$journalPath.$PID.tmp"
+    Set-Content -Path $temporary -Encoding UTF8 -Value (ConvertTo-Json $journal -Depth 6)
+    if (Test-Path $journalPath) {
+        [System.IO.File]::Replace($temporary, $journalPath, $null)
+    } else {
+        [System.IO.File]::Move($temporary, $journalPath)
+    }
+}
+
+# Whether an earlier run finished the step with the same inputs; the caller
+# still checks that its results are in place
+function Test-StepDone($id) {
+    $entry = $journal.steps[$id]
+    if (-not $entry -or ($entry.status -ne "ok" -and $entry.status -ne "skipped")) { return $false }
+    return (ConvertTo-Json $entry.inputs -Compress) -eq (ConvertTo-Json $stepInputs[$id] -Compress)
+}
+
+function Get-ExitStatus {
+    if ($LASTEXITCODE -eq 0) { return "ok" } else { return "failed" }
+}
+
+# Streams a download to disk, reporting bytes done/total every half second.
+# It goes to "<outFile>.partial" first; an interrupted download continues
+# from the bytes already there, and the file is renamed once complete.
+function Invoke-Download($url, $outFile, $stepId) {
+    $partial = "$outFile.partial"
+    $done = 0
+    if (Test-Path $partial) { $done = (Get-Item $partial).Length }
+    $request = [System.Net.HttpWebRequest]::Create($url)
+    if ($done -gt 0) { $request.AddRange([long]$done) }
+    $response = $request.GetResponse()
+    if ($done -gt 0 -and $response.StatusCode -eq [System.Net.HttpStatusCode]::PartialContent) {
+        Write-Host ("Resuming the download after {0:N1} MB" -f ($done / 1MB))
+        $target = [System.IO.File]::Open($partial, [System.IO.FileMode]::Append)
+    } else {
+        $done = 0
+        $target = [System.IO.File]::Create($partial)
+    }
+    $total = $done + $response.ContentLength
+    $source = $response.GetResponseStream()
+    $buffer = New-Object byte[] 1048576
+    $lastReport = [DateTime]::MinValue
+    try {
+        while (($read = $source.Read($buffer, 0, $buffer.Length)) -gt 0) {
+            $target.Write($buffer, 0, $read)
+            $done += $read
+            if (([DateTime]::UtcNow - $lastReport).TotalMilliseconds -ge 500) {
+                Write-InstallerProgress "bytes" @{ step = $stepId; done = $done; total = $total }
+                $lastReport = [DateTime]::UtcNow
+            }
+        }
+        Write-InstallerProgress "bytes" @{ step = $stepId; done = $done; total = $total }
+    } finally {
+        $target.Close()
+        $source.Close()
+        $response.Close()
+    }
+    Move-Item -Path $partial -Destination $outFile -Force
+}
+
+# Chocolatey keeps lib\<id>\<id>.nuspec for every installed package
+function Get-ChocolateyPackageVersion($id) {
+    $root = if ($env:ChocolateyInstall) { $env:ChocolateyInstall } else { "$env:ProgramData\chocolatey" }
+    $nuspec = Join-Path $root "lib\$id\$id.nuspec"
+    if (-not (Test-Path $nuspec)) { return $null }
+    return ([xml](Get-Content $nuspec -Raw)).package.metadata.version
+}
+
+# Whether an installed version meets a requested one: "17" is met by 17.0.8,
+# "17.0.8" by 17.0.8 or a package fix such as 17.0.8.1
+function Test-VersionSatisfies($installed, $requested) {
+    if ($installed -eq $requested) { return $true }
+    if ($installed -notmatch '^\d+(\.\d+)*$' -or $requested -notmatch '^\d+(\.\d+)*$') { return $false }
+    $have = @($installed.Split('.') | ForEach-Object { [int64]$_ })
+    $want = @($requested.Split('.') | ForEach-Object { [int64]$_ })
+    for ($i = 0; $i -lt $want.Count; $i++) {
+        $part = if ($i -lt $have.Count) { $have[$i] } else { 0 }
+        if ($part -ne $want[$i]) { return $false }
+    }
+    return $true
+}
+
+# The form two Path entries are compared in
+function ConvertTo-PathKey($entry) {
+    return [Environment]::ExpandEnvironmentVariables($entry.Trim().Trim('"')).TrimEnd('\').ToLowerInvariant()
+}
+
+# One WM_SETTINGCHANGE so running programs re-read the environment
+function Send-EnvironmentChange {
+    if (-not ("Win32.EnvironmentBroadcast" -as [Type])) {
+        Add-Type -Namespace Win32 -Name EnvironmentBroadcast -MemberDefinition @"
+[DllImport("user32.dll", CharSet = CharSet.Unicode)]
+public static extern IntPtr SendMessageTimeout(IntPtr hWnd, uint msg, UIntPtr wParam, string lParam, uint flags, uint timeout, out UIntPtr result);
+"@
+    }
+    $result = [UIntPtr]::Zero
+    [Win32.EnvironmentBroadcast]::SendMessageTimeout([IntPtr]0xFFFF, 0x1A, [UIntPtr]::Zero, "Environment", 2, 5000, [ref]$result) | Out-Null
+}
+
 function Is-Admin {
     $currentUser = New-Object Security.Principal.WindowsPrincipal([Security.Principal.WindowsIdentity]::GetCurrent())
     return $currentUser.IsInRole([Security.Principal.WindowsBuiltInRole]::Administrator)
@@ -50,10 +202,71 @@ if (-not (Is-Admin)) {
     exit
 }
 
+$dataDir = if ($env:FLUTTER_INSTALLER_HOME) { $env:FLUTTER_INSTALLER_HOME } else { Join-Path $env:USERPROFILE ".flutter_installer" }
+New-Item -ItemType Directory -Path $dataDir -Force | Out-Null
+# Kept apart from the installer app's journal: the two check their steps' results differently
+$journalPath = Join-Path $dataDir "install_journal.script.json"
+$flutterRoot = "C:\flutter"
+$androidSdkRoot = "$env:LOCALAPPDATA\Android\Sdk"
+$ndkPackageVersion = if ($NdkVersion -eq "latest") { "29.0.14206865" } else { $NdkVersion }
+# Extra Chocolatey packages declared in components.json (see
+# component_registry.py): those marked "selected", or the keys given in -With
+$componentsPath = if ($env:FLUTTER_INSTALLER_COMPONENTS) { $env:FLUTTER_INSTALLER_COMPONENTS } else { Join-Path $dataDir "components.json" }
+$extraComponents = @()
+if (Test-Path $componentsPath) {
+    try {
+        $declared = @((Get-Content $componentsPath -Raw | ConvertFrom-Json).components | Where-Object { $_.key -and $_.package })
+        if ($PSBoundParameters.ContainsKey("With")) {
+            $keys = @($With | ForEach-Object { $_ -split "," } | ForEach-Object { $_.Trim() } | Where-Object { $_ })
+            $extraComponents = @($declared | Where-Object { $keys -contains $_.key })
+        } else {
+            $extraComponents = @($declared | Where-Object { $_.selected })
+        }
+    } catch {
+        Write-Host "Error reading $componentsPath`: $_"
+    }
+}
+# What each step's result depends on; a journaled step with other inputs runs again
+$stepInputs = @{
+    "git" = [ordered]@{ version = $GitVersion }
+    "openjdk" = [ordered]@{ version = $JavaVersion }
+    "androidstudio" = [ordered]@{ version = $AndroidStudioVersion }
+    "flutter" = [ordered]@{ version = $FlutterVersion; root = $flutterRoot }
+    "sdk-packages" = [ordered]@{ ndk = $NdkVersion; sdk_root = $androidSdkRoot }
+    "flutter-precache" = [ordered]@{ flutter = $FlutterVersion; platforms = (($PrecachePlatforms | Sort-Object) -join ",") }
+}
+foreach ($component in $extraComponents) {
+    $stepInputs[$component.key] = [ordered]@{ version = $(if ($component.version) { $component.version } else { "latest" }) }
+}
+$journal = Read-InstallJournal
+if ($journal.steps.Count -gt 0) {
+    $previouslyDone = @($journal.steps.Keys | Where-Object { $journal.steps[$_].status -eq "ok" -or $journal.steps[$_].status -eq "skipped" })
+    Write-Host "Resuming the install started $($journal.started); done before: $(if ($previouslyDone) { $previouslyDone -join ', ' } else { 'nothing' })"
+}
+
+# Weights are rough shares of a typical run's wall time
+$planSteps = @(
+    @{ id = "chocolatey"; title = "Chocolatey"; weight = 5 },
+    @{ id = "git"; title = "Git"; weight = 5 },
+    @{ id = "androidstudio"; title = "Android Studio"; weight = 25 },
+    @{ id = "openjdk"; title = "OpenJDK"; weight = 10 },
+    @{ id = "flutter"; title = "Flutter SDK"; weight = 20 },
+    @{ id = "cmdline-tools"; title = "Android Command-line Tools"; weight = 5 },
+    @{ id = "sdk-packages"; title = "Android SDK Packages and NDK"; weight = 15 },
+    @{ id = "environment"; title = "Environment Variables"; weight = 1 },
+    @{ id = "flutter-precache"; title = "Flutter Tool Cache"; weight = 10 }
+)
+foreach ($component in $extraComponents) {
+    $planSteps += @{ id = $component.key; title = $component.name; weight = $(if ($component.weight) { $component.weight } else { 5 }) }
+}
+$planSteps += @{ id = "flutter-doctor"; title = "Flutter Doctor"; weight = 4 }
+Write-InstallerProgress "plan" @{ steps = $planSteps }
+
 # -------------------------------
 # Chocolatey Installation
 # -------------------------------
 Write-Section "Checking and Installing Chocolatey"
+Start-Step "chocolatey"
 if (!(Get-Command choco -ErrorAction SilentlyContinue)) {
     Write-Host "Chocolatey not found. Installing..."
     Set-ExecutionPolicy Bypass -Scope Process -Force
@@ -62,43 +275,128 @@ if (!(Get-Command choco -ErrorAction SilentlyContinue)) {
         Invoke-Expression ((New-Object System.Net.WebClient).DownloadString('https://community.chocolatey.org/install.ps1'))
     } catch {
         Write-Host "Error installing Chocolatey. Please check your internet connection and try again."
+        Complete-Step "chocolatey" "failed"
         Read-Host -Prompt "Press Enter to exit"
         exit
     }
 } else {
     Write-Host "Chocolatey is already installed."
 }
+Complete-Step "chocolatey"
 
 # -------------------------------
 # Install Core Dependencies
 # -------------------------------
-Write-Section "Installing Git, Android Studio, and OpenJDK"
-if ($GitVersion -eq "latest") {
-    choco install git -y
-} else {
-    choco install git --version $GitVersion -y
+Write-Section "Installing Git, OpenJDK, Android Studio and the selected extras"
+# One Chocolatey run for all packages, listed in a packages.config in the
+# order the later sections need them. Packages already installed at the
+# requested version are left out, and each step completes as soon as
+# Chocolatey reports its package.
+$packages = [ordered]@{ git = $GitVersion; openjdk = $JavaVersion; androidstudio = $AndroidStudioVersion }
+# Package id -> step id; the extras' steps are named by their component key
+$packageSteps = @{ git = "git"; openjdk = "openjdk"; androidstudio = "androidstudio" }
+foreach ($component in $extraComponents) {
+    $packages[$component.package.ToLower()] = $stepInputs[$component.key].version
+    $packageSteps[$component.package.ToLower()] = $component.key
 }
-if ($AndroidStudioVersion -eq "latest") {
-    choco install androidstudio -y
-} else {
-    choco install androidstudio --version $AndroidStudioVersion -y
+$pending = @()
+$configLines = @('<?xml version="1.0" encoding="utf-8"?>', '<packages>')
+foreach ($id in $packages.Keys) {
+    Start-Step $packageSteps[$id]
+    $version = $packages[$id]
+    $installed = Get-ChocolateyPackageVersion $id
+    if ($installed -and ($version -eq "latest" -or (Test-VersionSatisfies $installed $version))) {
+        Write-Host "$id $installed is already installed."
+        Complete-Step $packageSteps[$id] "skipped"
+    } elseif ($version -eq "latest") {
+        $configLines += "  <package id=`"$id`" />"
+        $pending += $id
+    } else {
+        $configLines += "  <package id=`"$id`" version=`"$version`" />"
+        $pending += $id
+    }
 }
-if ($JavaVersion -eq "latest") {
-    choco install openjdk -y
-} else {
-    choco install openjdk --version $JavaVersion -y
+if ($pending.Count -gt 0) {
+    $packagesConfig = Join-Path $env:TEMP "flutter-installer-packages.config"
+    Set-Content -Path $packagesConfig -Encoding UTF8 -Value ($configLines + '</packages>')
+    $finished = @()
+    $timings = @()
+    $batchStarted = Get-Date
+    $mark = $batchStarted
+    choco install $packagesConfig -y --no-progress 2>&1 | ForEach-Object {
+        $line = "$_"
+        Write-Host $line
+        $id = $null
+        if ($line -match '^\s*The install of (\S+) was (NOT )?successful') {
+            $id = $Matches[1].ToLower()
+            $status = if ($Matches[2]) { "failed" } else { "ok" }
+        } elseif ($line -match '^\s*(\S+) v\S+ already installed') {
+            $id = $Matches[1].ToLower()
+            $status = "ok"
+        }
+        if ($id -and ($pending -contains $id) -and ($finished -notcontains $id)) {
+            $timings += ("{0} {1:N1}s" -f $id, ((Get-Date) - $mark).TotalSeconds)
+            $mark = Get-Date
+            $finished += $id
+            Complete-Step $packageSteps[$id] $status
+        }
+    }
+    # 3010: installed, but Windows needs a restart; the journal lets the next run carry on
+    if ($LASTEXITCODE -eq 3010) {
+        $batchStatus = "ok"
+        Write-Host "Chocolatey asked for a restart. If a later step fails, restart Windows and run this script again."
+    } else {
+        $batchStatus = Get-ExitStatus
+    }
+    foreach ($id in $pending) {
+        if ($finished -notcontains $id) { Complete-Step $packageSteps[$id] $batchStatus }
+    }
+    Write-Host ("Chocolatey installed {0} packages in one run ({1:N1}s): {2}" -f $pending.Count, ((Get-Date) - $batchStarted).TotalSeconds, ($timings -join ", "))
 }
 
 # -------------------------------
 # Flutter SDK Installation
 # -------------------------------
 Write-Section "Installing Flutter SDK"
-$flutterRoot = "C:\flutter"
+Start-Step "flutter"
 if (-not (Test-Path $flutterRoot)) {
-    Write-Host "Cloning the Flutter SDK from the $FlutterVersion channel..."
-    git clone https://github.com/flutter/flutter.git -b $FlutterVersion $flutterRoot
+    # Cloned into C:\flutter.partial and renamed when complete, so an
+    # interrupted clone is continued instead of being taken for an SDK
+    $flutterStaging = "$flutterRoot.partial"
+    if (Test-Path "$flutterStaging\.git") {
+        Write-Host "Resuming the Flutter download in $flutterStaging..."
+        git -C $flutterStaging fetch --tags origin "+refs/heads/*:refs/remotes/origin/*"
+        if ($LASTEXITCODE -eq 0) { git -C $flutterStaging checkout --force $FlutterVersion }
+    } else {
+        if (Test-Path $flutterStaging) { Remove-Item $flutterStaging -Recurse -Force }
+        Write-Host "Cloning the Flutter SDK from the $FlutterVersion channel..."
+        git clone https://github.com/flutter/flutter.git -b $FlutterVersion $flutterStaging
+    }
+    $flutterStatus = Get-ExitStatus
+    if ($flutterStatus -eq "ok") { Move-Item -Path $flutterStaging -Destination $flutterRoot }
+    Complete-Step "flutter" $flutterStatus
 } else {
     Write-Host "Flutter SDK directory already exists. Skipping clone."
+    Complete-Step "flutter" "skipped"
+}
+
+# The first run of the Flutter tool downloads the Dart SDK, builds the tool
+# and fetches engine artifacts; start it now so it overlaps the Android SDK
+# installs, and collect it before flutter doctor
+$precacheJob = $null
+$precacheDone = (Test-StepDone "flutter-precache") -and
+    (Test-Path "$flutterRoot\bin\cache\dart-sdk\bin\dart.exe") -and (Test-Path "$flutterRoot\bin\cache\flutter_tools.snapshot")
+if ($precacheDone) {
+    Write-Host "The Flutter tool cache was warmed up by an earlier run."
+} elseif ((Test-Path "$flutterRoot\bin\flutter.bat") -and $PrecachePlatforms.Count -gt 0) {
+    Start-Step "flutter-precache"
+    Write-Host "Warming up the Flutter tool cache for $($PrecachePlatforms -join ', ') in the background..."
+    $precacheJob = Start-Job -ScriptBlock {
+        param($flutter, $platforms)
+        $flags = $platforms | ForEach-Object { "--$_" }
+        & $flutter precache $flags 2>&1 | ForEach-Object { "$_" }
+        "##precache-exit $LASTEXITCODE"
+    } -ArgumentList "$flutterRoot\bin\flutter.bat", $PrecachePlatforms
 }
 
 # -------------------------------
@@ -106,54 +404,67 @@ if (-not (Test-Path $flutterRoot)) {
 # -------------------------------
 Write-Section "Installing Android SDK Command-line Tools and NDK"
 
-$androidSdkRoot = "$env:LOCALAPPDATA\Android\Sdk"
 $cmdlineToolsDir = Join-Path $androidSdkRoot "cmdline-tools"
 $latestCmdlineToolsDir = Join-Path $cmdlineToolsDir "latest"
 $sdkManagerPath = Join-Path $latestCmdlineToolsDir "bin\sdkmanager.bat"
 
+Start-Step "cmdline-tools"
 if (-not (Test-Path $sdkManagerPath)) {
     Write-Host "Android Command-line Tools not found. Downloading and installing..."
     
     # URL for the command-line tools. This might need to be updated periodically.
     $cmdlineToolsUrl = "https://dl.google.com/android/repository/commandlinetools-win-11076708_latest.zip"
-    $cmdlineToolsZip = "$env:TEMP\commandlinetools.zip"
+    # Kept in the data folder until installed, so a restart does not lose a finished or partial download
+    New-Item -ItemType Directory -Path "$dataDir\downloads" -Force | Out-Null
+    $cmdlineToolsZip = "$dataDir\downloads\commandlinetools.zip"
     
     # Download
-    Invoke-WebRequest -Uri $cmdlineToolsUrl -OutFile $cmdlineToolsZip
+    if (-not (Test-Path $cmdlineToolsZip)) {
+        Invoke-Download $cmdlineToolsUrl $cmdlineToolsZip "cmdline-tools"
+    }
     
-    # Unzip to a temporary location
-    $tempUnzipPath = "$env:TEMP\cmdline-tools-unzipped"
+    # Unzip next to the destination, then move the tools folder into place in one rename
+    $tempUnzipPath = "$cmdlineToolsDir\latest.partial"
     if (Test-Path $tempUnzipPath) {
         Remove-Item $tempUnzipPath -Recurse -Force
     }
     Expand-Archive -Path $cmdlineToolsZip -DestinationPath $tempUnzipPath -Force
-    
-    # Create destination directory and move the tools
-    New-Item -ItemType Directory -Path $latestCmdlineToolsDir -Force
-    Move-Item -Path "$tempUnzipPath\cmdline-tools\*" -Destination $latestCmdlineToolsDir -Force
+    if (Test-Path $latestCmdlineToolsDir) {
+        Remove-Item $latestCmdlineToolsDir -Recurse -Force
+    }
+    Move-Item -Path "$tempUnzipPath\cmdline-tools" -Destination $latestCmdlineToolsDir
     
     # Cleanup
     Remove-Item $tempUnzipPath -Recurse -Force
     Remove-Item $cmdlineToolsZip
     
     Write-Host "Android Command-line Tools installed."
+    Complete-Step "cmdline-tools"
 } else {
     Write-Host "Android Command-line Tools already found."
+    Complete-Step "cmdline-tools" "skipped"
 }
 
 # Add command-line tools to PATH for the current session
 $env:Path = "$($latestCmdlineToolsDir)\bin;" + $env:Path
 
 # Use sdkmanager to install NDK and command-line tools (latest)
-Write-Host "Installing latest command-line tools and NDK via sdkmanager..."
-# The following line will ensure the latest command-line tools are installed.
-1..10 | ForEach-Object { "y" } | & $sdkManagerPath --licenses --sdk_root=$androidSdkRoot
-& $sdkManagerPath "cmdline-tools;latest" --sdk_root=$androidSdkRoot
-# This NDK version is hardcoded. You can find the latest version by running: sdkmanager --list | findstr "ndk"
-if ($NdkVersion -eq "latest") {
-    & $sdkManagerPath "ndk;29.0.14206865" --sdk_root=$androidSdkRoot
+# sdkmanager queries the repository even when everything is installed, so a
+# step an earlier run finished is skipped while its NDK and licenses are there
+$sdkPackagesDone = (Test-StepDone "sdk-packages") -and
+    (Test-Path "$androidSdkRoot\ndk\$ndkPackageVersion\source.properties") -and (Test-Path "$androidSdkRoot\licenses")
+Start-Step "sdk-packages"
+if ($sdkPackagesDone) {
+    Write-Host "The Android SDK packages and NDK $ndkPackageVersion were installed by an earlier run."
+    Complete-Step "sdk-packages" "skipped" @{ ndk = $ndkPackageVersion }
 } else {
-    & $sdkManagerPath "ndk;$NdkVersion" --sdk_root=$androidSdkRoot
+    Write-Host "Installing latest command-line tools and NDK via sdkmanager..."
+    # The following line will ensure the latest command-line tools are installed.
+    1..10 | ForEach-Object { "y" } | & $sdkManagerPath --licenses --sdk_root=$androidSdkRoot
+    & $sdkManagerPath "cmdline-tools;latest" --sdk_root=$androidSdkRoot
+    # This NDK version is hardcoded. You can find the latest version by running: sdkmanager --list | findstr "ndk"
+    & $sdkManagerPath "ndk;$ndkPackageVersion" --sdk_root=$androidSdkRoot
+    Complete-Step "sdk-packages" (Get-ExitStatus) @{ ndk = $ndkPackageVersion }
 }
 
 
@@ -161,49 +472,111 @@ if ($NdkVersion -eq "latest") {
 # Environment Variable Configuration
 # -------------------------------
 Write-Section "Configuring Environment Variables"
+Start-Step "environment"
 
-# Set ANDROID_HOME
+# Path is compared entry by entry (expanded, case-folded, without trailing
+# separators), duplicates are dropped, and only values that differ are
+# written, all under one registry key, followed by a single broadcast
 $androidHome = "$env:LOCALAPPDATA\Android\Sdk"
-[Environment]::SetEnvironmentVariable('ANDROID_HOME', $androidHome, 'Machine')
-Write-Host "ANDROID_HOME set to $androidHome"
-
-# Add paths to System PATH
-$currentPath = [Environment]::GetEnvironmentVariable('Path', 'Machine')
 $pathsToAdd = @(
     "$flutterRoot\bin",
     "$androidHome\emulator",
     "$androidHome\platform-tools",
     "$androidHome\cmdline-tools\latest\bin"
 )
+$environmentKey = [Microsoft.Win32.Registry]::LocalMachine.OpenSubKey('SYSTEM\CurrentControlSet\Control\Session Manager\Environment', $true)
+$changed = $false
+
+if ((ConvertTo-PathKey "$($environmentKey.GetValue('ANDROID_HOME'))") -ne (ConvertTo-PathKey $androidHome)) {
+    $environmentKey.SetValue('ANDROID_HOME', $androidHome, [Microsoft.Win32.RegistryValueKind]::String)
+    $changed = $true
+    Write-Host "ANDROID_HOME set to $androidHome"
+} else {
+    Write-Host "ANDROID_HOME already set to $androidHome"
+}
 
+# Read without expanding, so entries like %SystemRoot% are written back as they were
+$currentPath = $environmentKey.GetValue('Path', '', [Microsoft.Win32.RegistryValueOptions]::DoNotExpandEnvironmentNames)
+$entries = @()
+$present = @{}
+foreach ($entry in ($currentPath -split ';')) {
+    $entry = $entry.Trim().Trim('"')
+    if ($entry -and -not $present.ContainsKey((ConvertTo-PathKey $entry))) {
+        $present[(ConvertTo-PathKey $entry)] = $true
+        $entries += $entry
+    }
+}
+$added = @()
 foreach ($path in $pathsToAdd) {
-    if ($currentPath -notlike "*$path*") {
-        $currentPath += ";$path"
-        Write-Host "Adding '$path' to PATH."
-    } else {
+    if ($present.ContainsKey((ConvertTo-PathKey $path))) {
         Write-Host "'$path' already in PATH."
+    } else {
+        Write-Host "Adding '$path' to PATH."
+        $added += $path
     }
 }
+if ($added.Count -gt 0) {
+    $environmentKey.SetValue('Path', (($entries + $added) -join ';'), [Microsoft.Win32.RegistryValueKind]::ExpandString)
+    $changed = $true
+}
+$environmentKey.Close()
 
-[Environment]::SetEnvironmentVariable('Path', $currentPath, 'Machine')
-$env:Path = $currentPath # Update for current session
+if ($changed) {
+    Send-EnvironmentChange
+    Complete-Step "environment"
+} else {
+    Complete-Step "environment" "skipped"
+}
+$env:Path = [Environment]::ExpandEnvironmentVariables((($entries + $added) -join ';')) # Update for current session
+
+# -------------------------------
+# Flutter Tool Cache Warm-up
+# -------------------------------
+Write-Section "Finishing the Flutter Tool Cache Warm-up"
+if ($precacheJob) {
+    $precacheStatus = "failed"
+    Receive-Job $precacheJob -Wait -AutoRemoveJob | ForEach-Object {
+        if ($_ -eq "##precache-exit 0") { $precacheStatus = "ok" }
+        elseif ($_ -notlike "##precache-exit *") { Write-Host $_ }
+    }
+    Complete-Step "flutter-precache" $precacheStatus
+} else {
+    Start-Step "flutter-precache"
+    if ($precacheDone) {
+        Complete-Step "flutter-precache" "ok"
+    } else {
+        Write-Host "Skipping the warm-up."
+        Complete-Step "flutter-precache" "skipped"
+    }
+}
 
 # -------------------------------
 # Finalizing Flutter Setup
 # -------------------------------
 Write-Section "Running Flutter Doctor and Accepting Licenses"
+Start-Step "flutter-doctor"
 
-# Run flutter doctor to download Dart SDK and other dependencies
-Write-Host "Running 'flutter doctor' to finalize installation. This may take a few minutes..."
+# The warm-up already downloaded the Dart SDK and engine artifacts, so this only validates
+Write-Host "Running 'flutter doctor' to validate the installation..."
 & "$flutterRoot\bin\flutter.bat" doctor
 
 # Accept Android licenses
 Write-Host "Attempting to automatically accept Android SDK licenses..."
 1..10 | ForEach-Object { "y" } | & "$flutterRoot\bin\flutter.bat" doctor --android-licenses
+Complete-Step "flutter-doctor"
 
 # -------------------------------
 # Completion
 # -------------------------------
+$unfinished = @($journal.steps.Keys | Where-Object { $journal.steps[$_].status -ne "ok" -and $journal.steps[$_].status -ne "skipped" })
+if ($unfinished.Count -gt 0) {
+    Write-Section "Installation Incomplete"
+    Write-Host "These steps did not complete: $($unfinished -join ', ')"
+    Write-Host "Run this script again to continue from where it stopped; finished steps are skipped."
+    Read-Host -Prompt "Press Enter to close this window"
+    exit 1
+}
+Remove-Item $journalPath -ErrorAction SilentlyContinue
 Write-Section "Installation Complete!"
 Write-Host "The script has finished."
 Write-Host "Please restart your computer for all changes to take effect."
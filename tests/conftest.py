@@ -0,0 +1,59 @@
+import http.server
+import os
+import sys
+import threading
+import urllib.parse
+
+import pytest
+
+# The installer modules import each other by name, as they do when run from flutter_installer_ui/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flutter_installer_ui"))
+
+
+@pytest.fixture(autouse=True)
+def data_home(tmp_path, monkeypatch):
+    # Caches, journals and state files go to a fresh data directory per test
+    home = tmp_path / "home"
+    monkeypatch.setenv("FLUTTER_INSTALLER_HOME", str(home))
+    monkeypatch.delenv("FLUTTER_INSTALLER_COMPONENTS", raising=False)
+    return home
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        route = self.server.routes.get(urllib.parse.urlsplit(self.path).path)
+        status, headers, body = route(self) if route else (404, {}, b"")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(http.server.ThreadingHTTPServer):
+    # routes: {path: handler -> (status, headers, body)}; requests: (path, headers) as received
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.routes = {}
+        self.requests = []
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,74 @@
+import http.client
+import os
+
+import android_repository
+from android_repository import AndroidRepository, parse_repository
+
+MANIFEST = os.path.join(os.path.dirname(__file__), "data", "repository2-3.xml")
+
+
+def recorded_repository(tmp_path, url="https://dl.google.com/android/repository/repository2-3.xml"):
+    repository = AndroidRepository(path=str(tmp_path / "index.json"), url=url)
+    with open(MANIFEST, "rb") as f:
+        repository.packages = parse_repository(f)
+    return repository
+
+
+def test_parse_recorded_manifest():
+    with open(MANIFEST, "rb") as f:
+        packages = parse_repository(f)
+    assert packages["ndk;27.2.12479018"]["revision"] == "27.2.12479018"
+    assert packages["ndk;28.0.12433566"]["revision"] == "28.0.12433566-rc1"
+    assert packages["ndk;28.0.12433566"]["channel"] == "beta"
+    assert packages["ndk;25.1.8937393"]["obsolete"]
+    assert packages["cmdline-tools;latest"]["display_name"] == "Android SDK Command-line Tools (latest)"
+
+
+def test_latest_ndk_by_channel(tmp_path):
+    repository = recorded_repository(tmp_path)
+    assert repository.ndk_versions() == ["27.2.12479018", "26.3.11579264"]
+    assert repository.ndk_versions(include_previews=True)[0] == "28.0.12433566"
+    assert repository.latest_ndk() == "27.2.12479018"
+
+
+def test_archive_by_host_os(tmp_path):
+    repository = recorded_repository(tmp_path)
+    windows = repository.archive("cmdline-tools;latest")
+    assert windows["url"] == "https://dl.google.com/android/repository/commandlinetools-win-12266719_latest.zip"
+    assert windows["checksum"] == "4fbb7e5a8a1d4fbfd0e1e9b5d7f2e8c41d1f3a2b"
+    assert windows["algorithm"] == "sha1"
+    assert windows["revision"] == "16.0"
+    assert repository.archive("cmdline-tools;latest", host_os="linux")["url"].endswith("linux-12266719_latest.zip")
+    assert repository.archive("ndk;26.3.11579264", host_os="macosx") is None
+    assert repository.archive("ndk;99.0.0") is None
+
+
+def test_refresh_streams_the_response_and_revalidates(tmp_path, stub_server, monkeypatch):
+    with open(MANIFEST, "rb") as f:
+        body = f.read()
+
+    def manifest(handler):
+        if handler.headers.get("If-None-Match") == '"r1"':
+            return 304, {}, b""
+        return 200, {"ETag": '"r1"', "Content-Type": "application/xml"}, body
+
+    stub_server.routes["/repository2-3.xml"] = manifest
+    streamed = []
+    parse = android_repository.parse_repository
+
+    def parse_stream(stream):
+        streamed.append(stream)
+        return parse(stream)
+
+    monkeypatch.setattr(android_repository, "parse_repository", parse_stream)
+    repository = AndroidRepository(path=str(tmp_path / "index.json"), url=stub_server.url("/repository2-3.xml"))
+    assert repository.refresh()
+    # The parser reads the HTTP response itself, not a copy of the whole body
+    assert isinstance(streamed[0], http.client.HTTPResponse)
+    assert repository.latest_ndk() == "27.2.12479018"
+    assert repository.archive("ndk;27.2.12479018")["url"] == stub_server.url("/android-ndk-r27c-windows.zip")
+
+    assert not repository.refresh(force=True)
+    assert stub_server.requests[-1][1].get("If-None-Match") == '"r1"'
+    reloaded = AndroidRepository(path=str(tmp_path / "index.json"), url=stub_server.url("/repository2-3.xml"))
+    assert reloaded.is_fresh() and reloaded.latest_ndk() == "27.2.12479018"
@@ -0,0 +1,57 @@
+import json
+import threading
+
+import pytest
+
+from app_paths import write_json_atomic
+from catalog_cache import CatalogCache
+
+
+def test_write_json_atomic_replaces_the_file(tmp_path):
+    path = tmp_path / "state.json"
+    write_json_atomic(str(path), {"a": 1})
+    write_json_atomic(str(path), {"a": 2})
+    assert json.loads(path.read_text()) == {"a": 2}
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_write_json_atomic_leaves_no_temp_file_on_failure(tmp_path):
+    path = tmp_path / "state.json"
+    write_json_atomic(str(path), {"a": 1})
+    with pytest.raises(TypeError):
+        write_json_atomic(str(path), {"a": object()})
+    assert json.loads(path.read_text()) == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_concurrent_writers_never_share_a_temp_file(tmp_path):
+    path = str(tmp_path / "state.json")
+    errors = []
+
+    def write(n):
+        try:
+            for i in range(50):
+                write_json_atomic(path, {"writer": n, "i": i, "pad": "x" * 4096})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert json.loads(open(path).read())["i"] == 49
+
+
+def test_one_cache_keeps_every_source_stored_from_concurrent_loads(tmp_path):
+    path = str(tmp_path / "catalog_cache.json")
+    cache = CatalogCache(path=path)
+    threads = [threading.Thread(target=cache.store, args=(key, ["1.0"])) for key in ("flutter", "git", "ndk")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reloaded = CatalogCache(path=path)
+    assert all(reloaded.lookup(key)["versions"] == ["1.0"] for key in ("flutter", "git", "ndk"))
+    assert set(json.loads(open(path).read())["sources"]) == {"flutter", "git", "ndk"}
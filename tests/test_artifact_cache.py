@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+import artifact_cache
+from artifact_cache import ArtifactCache
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class Downloads:
+    def __init__(self, files):
+        self.files = files
+        self.urls = []
+
+    def __call__(self, url, path):
+        self.urls.append(url)
+        with open(path, "wb") as f:
+            f.write(self.files[url])
+
+
+def quiet(line):
+    pass
+
+
+class Clock:
+    # Stands in for the time module: every call is one second later
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+def test_miss_then_hit_and_metrics(tmp_path):
+    data = b"x" * 1000
+    download = Downloads({"https://dl.test/a.zip": data})
+    cache = ArtifactCache(root=str(tmp_path / "store"), shares=[])
+    first = cache.fetch("https://dl.test/a.zip", sha256(data), download=download, log=quiet)
+    second = cache.fetch("https://dl.test/a.zip", sha256(data), download=download, log=quiet)
+    assert first == second and open(first, "rb").read() == data
+    assert download.urls == ["https://dl.test/a.zip"]
+    assert (cache.hits, cache.misses, cache.bytes_saved, cache.bytes_downloaded) == (1, 1, 1000, 1000)
+    assert cache.summary().startswith("Artifact cache: 1 of 2 artifacts reused (50% hit rate)")
+
+
+def test_artifacts_without_checksum_are_found_by_url(tmp_path):
+    download = Downloads({"https://dl.test/install.ps1": b"script"})
+    cache = ArtifactCache(root=str(tmp_path / "store"), shares=[])
+    path = cache.fetch("https://dl.test/install.ps1", download=download, log=quiet)
+    assert path.split(os.sep)[-3:-1] == ["sha256", sha256(b"script")]
+    assert ArtifactCache(root=str(tmp_path / "store"), shares=[]).lookup(url="https://dl.test/install.ps1") == path
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache, "time", Clock())
+    files = {f"https://dl.test/{name}.zip": name.encode() * 100 for name in "abc"}
+    download = Downloads(files)
+    cache = ArtifactCache(root=str(tmp_path / "store"), max_bytes=250, shares=[])
+    a = cache.fetch("https://dl.test/a.zip", download=download, log=quiet)
+    b = cache.fetch("https://dl.test/b.zip", download=download, log=quiet)
+    # a is used again, so b is now the least recently used
+    assert cache.fetch("https://dl.test/a.zip", download=download, log=quiet) == a
+    cache.fetch("https://dl.test/c.zip", download=download, log=quiet)
+    assert os.path.exists(a) and not os.path.exists(b)
+    assert cache.lookup(url="https://dl.test/b.zip") is None
+    assert sum(entry["size"] for entry in cache.index["entries"].values()) <= 250
+
+
+def test_hits_do_not_rewrite_the_index_until_flushed(tmp_path):
+    data = b"y" * 10
+    cache = ArtifactCache(root=str(tmp_path / "store"), shares=[])
+    cache.fetch("https://dl.test/y.zip", sha256(data), download=Downloads({"https://dl.test/y.zip": data}), log=quiet)
+    index = tmp_path / "store" / "index.json"
+    before = index.read_bytes()
+    for _ in range(5):
+        assert cache.lookup(sha256(data))
+    assert index.read_bytes() == before
+    cache.flush()
+    entry = json.loads(index.read_text())["entries"][f"sha256:{sha256(data)}"]
+    assert entry["last_used"] > json.loads(before)["entries"][f"sha256:{sha256(data)}"]["last_used"]
+
+
+@pytest.fixture
+def share(tmp_path):
+    data = b"shared archive" * 100
+    root = str(tmp_path / "share")
+    ArtifactCache(root=root, shares=[]).fetch("https://dl.test/s.zip", sha256(data),
+                                                download=Downloads({"https://dl.test/s.zip": data}), log=quiet)
+    return root, data
+
+
+def test_share_copies_are_used_in_place(tmp_path, share):
+    root, data = share
+    download = Downloads({"https://dl.test/s.zip": data})
+    cache = ArtifactCache(root=str(tmp_path / "store"), shares=[root])
+    path = cache.fetch("https://dl.test/s.zip", sha256(data), download=download, log=quiet)
+    assert path.startswith(root)
+    assert download.urls == [] and cache.hits == 1
+
+
+def test_a_corrupt_share_copy_is_not_trusted(tmp_path, share):
+    root, data = share
+    cache = ArtifactCache(root=str(tmp_path / "store"), shares=[root])
+    shared = cache.lookup(sha256(data), log=quiet)
+    with open(shared, "r+b") as f:
+        f.write(b"X")
+    cache = ArtifactCache(root=str(tmp_path / "store"), shares=[root])
+    logged = []
+    download = Downloads({"https://dl.test/s.zip": data})
+    path = cache.fetch("https://dl.test/s.zip", sha256(data), download=download, log=logged.append)
+    assert not path.startswith(root)
+    assert download.urls == ["https://dl.test/s.zip"]
+    assert any("does not match" in line for line in logged)
+
+
+def test_a_verified_share_is_not_hashed_again(tmp_path, share, monkeypatch):
+    root, data = share
+    cache = ArtifactCache(root=str(tmp_path / "store"), shares=[])
+    cache.add_share(root, verified=True)
+    monkeypatch.setattr(artifact_cache, "file_digest", lambda path, algorithm: pytest.fail("hashed again"))
+    assert cache.lookup(sha256(data), log=quiet).startswith(root)
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from catalog_cache import CatalogCache, NotModified, fetch_url
+from catalog_loader import VersionCatalogLoader
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Tue, 15 Oct 2024 08:00:00 GMT"
+BODY = json.dumps(["2.45.1", "2.45.0"]).encode()
+
+
+def versions_route(handler):
+    # 304 when the client sends back either validator, like a real server
+    if handler.headers.get("If-None-Match") == ETAG or handler.headers.get("If-Modified-Since") == LAST_MODIFIED:
+        return 304, {"ETag": ETAG}, b""
+    return 200, {"ETag": ETAG, "Last-Modified": LAST_MODIFIED, "Content-Type": "application/json"}, BODY
+
+
+def test_fetch_url_returns_the_body_and_its_validators(stub_server):
+    stub_server.routes["/git.json"] = versions_route
+    body, validators = fetch_url(stub_server.url("/git.json"))
+    assert body == BODY
+    assert validators == {"etag": ETAG, "last_modified": LAST_MODIFIED}
+    headers = stub_server.requests[0][1]
+    assert "If-None-Match" not in headers and "If-Modified-Since" not in headers
+
+
+def test_fetch_url_sends_both_validators_and_raises_not_modified(stub_server):
+    stub_server.routes["/git.json"] = versions_route
+    _, validators = fetch_url(stub_server.url("/git.json"))
+    with pytest.raises(NotModified):
+        fetch_url(stub_server.url("/git.json"), validators)
+    headers = stub_server.requests[-1][1]
+    assert headers["If-None-Match"] == ETAG
+    assert headers["If-Modified-Since"] == LAST_MODIFIED
+
+
+def test_last_modified_alone_revalidates(stub_server):
+    stub_server.routes["/git.json"] = versions_route
+    with pytest.raises(NotModified):
+        fetch_url(stub_server.url("/git.json"), {"last_modified": LAST_MODIFIED})
+    assert "If-None-Match" not in stub_server.requests[-1][1]
+
+
+def test_stale_entry_is_revalidated_and_its_cached_list_reused(tmp_path, stub_server):
+    stub_server.routes["/git.json"] = versions_route
+
+    def git_versions(validators):
+        body, validators = fetch_url(stub_server.url("/git.json"), validators)
+        return json.loads(body), validators
+
+    path = str(tmp_path / "catalog_cache.json")
+    # A TTL of zero makes every stored entry stale, so each load asks the server
+    cache = CatalogCache(path=path, ttl=0)
+    first = {}
+    VersionCatalogLoader({"git": (git_versions, [])}, cache=cache).run(first.__setitem__)
+    assert first == {"git": ["2.45.1", "2.45.0"]}
+    assert cache.lookup("git")["etag"] == ETAG
+
+    cache = CatalogCache(path=path, ttl=0)
+    fetched_at = cache.lookup("git")["fetched_at"]
+    second = {}
+    VersionCatalogLoader({"git": (git_versions, [])}, cache=cache).run(second.__setitem__)
+    # The stale list is delivered from the cache and the 304 only renews it
+    assert second == {"git": ["2.45.1", "2.45.0"]}
+    assert stub_server.requests[-1][1]["If-None-Match"] == ETAG
+    assert cache.stats["revalidated"] == 1 and cache.stats["stored"] == 0
+    assert CatalogCache(path=path).lookup("git")["fetched_at"] > fetched_at
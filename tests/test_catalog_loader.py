@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from catalog_cache import CatalogCache, NotModified
+from catalog_loader import VersionCatalogLoader
+
+
+class BrokenCache:
+    # A cache whose lookups fail, as a corrupt or unreadable one would
+    def lookup(self, key):
+        raise RuntimeError("cache unreadable")
+
+
+def test_on_complete_is_called_when_the_load_fails():
+    completed = []
+    loader = VersionCatalogLoader({"git": (lambda validators: ["2.45.0"], ["2.44.0"])}, cache=BrokenCache())
+    with pytest.raises(RuntimeError):
+        loader.run(lambda key, versions: None, completed.append)
+    assert completed == [{}]
+
+
+def collect(loader):
+    delivered = []
+    results = loader.run(lambda key, versions: delivered.append((key, versions)))
+    return results, delivered
+
+
+def test_sources_load_in_parallel_and_a_slow_one_falls_back():
+    def slow(validators):
+        time.sleep(0.2)
+        return ["2.45.0"]
+
+    def hung(validators):
+        time.sleep(5)
+        return ["never"]
+
+    sources = {"git": (slow, ["2.44.0"]), "ndk": (slow, ["26.3"]), "flutter": (hung, ["3.22.0"])}
+    started = time.monotonic()
+    results, _ = collect(VersionCatalogLoader(sources, timeout=5, timeouts={"flutter": 0.5}))
+    assert time.monotonic() - started < 1.5
+    assert results == {"git": ["2.45.0"], "ndk": ["2.45.0"], "flutter": ["3.22.0"]}
+
+
+def test_a_failing_source_delivers_its_fallback():
+    def broken(validators):
+        raise OSError("offline")
+
+    results, delivered = collect(VersionCatalogLoader({"openjdk": (broken, ["17.0.12"])}))
+    assert results == {"openjdk": ["17.0.12"]}
+    assert delivered == [("openjdk", ["17.0.12"])]
+
+
+def test_a_fresh_cache_entry_is_not_fetched_again(tmp_path):
+    cache = CatalogCache(path=str(tmp_path / "cache.json"))
+    cache.store("git", ["2.45.1"])
+    fetched = []
+    results, _ = collect(VersionCatalogLoader({"git": (lambda v: fetched.append(v) or ["x"], [])}, cache=cache))
+    assert results == {"git": ["2.45.1"]}
+    assert fetched == []
+
+
+def test_a_stale_entry_is_served_then_revalidated(tmp_path):
+    cache = CatalogCache(path=str(tmp_path / "cache.json"), ttl=0)
+    cache.store("flutter", ["3.22.0"], {"etag": '"abc"'})
+    seen = []
+
+    def fetch(validators):
+        seen.append(validators)
+        raise NotModified("flutter")
+
+    results, delivered = collect(VersionCatalogLoader({"flutter": (fetch, [])}, cache=cache))
+    assert seen == [{"etag": '"abc"'}]
+    assert delivered == [("flutter", ["3.22.0"])]
+    assert cache.stats["revalidated"] == 1
+
+
+def test_a_stale_entry_is_replaced_by_newer_versions(tmp_path):
+    cache = CatalogCache(path=str(tmp_path / "cache.json"), ttl=0)
+    cache.store("ndk", ["26.3"])
+    results, delivered = collect(VersionCatalogLoader({"ndk": (lambda v: (["27.2", "26.3"], {}), [])}, cache=cache))
+    assert delivered == [("ndk", ["26.3"]), ("ndk", ["27.2", "26.3"])]
+    assert CatalogCache(path=cache.path).lookup("ndk")["versions"] == ["27.2", "26.3"]
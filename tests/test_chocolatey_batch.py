@@ -0,0 +1,50 @@
+import os
+
+import artifact_cache
+import chocolatey_batch
+from chocolatey_batch import ChocolateyBatch
+from install_orchestrator import FAILED, SKIPPED
+
+
+def test_an_installed_version_in_the_requested_series_is_skipped(tmp_path, monkeypatch):
+    installed = {"openjdk": "17.0.8", "git": "2.44.0", "androidstudio": "2024.1.1.12"}
+    monkeypatch.setattr(chocolatey_batch, "chocolatey_package_version", installed.get)
+    batch = ChocolateyBatch([("openjdk", "17"), ("git", "2.45.1"), ("androidstudio", "latest")], prefetch=False)
+    # No choco to run: whatever is not skipped fails
+    batch._run(str(tmp_path / "missing" / "choco.exe"), None, str(tmp_path / "cache"))
+    assert batch.results == {"openjdk": SKIPPED, "git": FAILED, "androidstudio": SKIPPED}
+
+
+class FakeDownloader:
+    downloads = []
+
+    def download(self, url, path, checksum=None, algorithm="sha256", log=print, **kwargs):
+        self.downloads.append(url)
+        with open(path, "wb") as f:
+            f.write(url.encode() * 100)
+
+
+class FakeFeed:
+    def package(self, package_id, version=None):
+        return {"id": package_id, "version": version or "1.0", "url": f"https://feed.test/package/{package_id}/{version}",
+                "dependencies": []}
+
+
+def test_prefetch_goes_through_the_artifact_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache, "_cache", None)
+    monkeypatch.setattr(chocolatey_batch, "ChunkedDownloader", FakeDownloader)
+    FakeDownloader.downloads = []
+    packages = [("git", "2.45.1"), ("openjdk", "17.0.12")]
+
+    pinned, folder = ChocolateyBatch(packages, feed=FakeFeed())._prefetch(packages)
+    assert pinned == packages
+    assert sorted(os.listdir(folder)) == ["git.2.45.1.nupkg", "openjdk.17.0.12.nupkg"]
+    assert len(FakeDownloader.downloads) == 2
+
+    # With the package folder emptied, the nupkgs come back from the cache
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    ChocolateyBatch(packages, feed=FakeFeed())._prefetch(packages)
+    assert sorted(os.listdir(folder)) == ["git.2.45.1.nupkg", "openjdk.17.0.12.nupkg"]
+    assert len(FakeDownloader.downloads) == 2
+    assert artifact_cache.artifact_cache().hits == 2
@@ -0,0 +1,184 @@
+import gzip
+import io
+import urllib.parse
+
+import pytest
+
+from catalog_cache import NotModified
+from chocolatey_feed import (ChocolateyFeedClient, exact_version, parse_dependencies, parse_feed, parse_packages,
+                             resolve_dependencies, with_query)
+
+PAGE = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"
+      xmlns:d="http://schemas.microsoft.com/ado/2007/08/dataservices"
+      xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata">
+  <title type="text">Packages</title>
+  <entry>
+    <title type="text">git</title>
+    <content type="application/zip" src="https://example.test/api/v2/package/git/2.45.1" />
+    <m:properties>
+      <d:Version>2.45.1</d:Version>
+      <d:Dependencies>git.install:[2.45.1]</d:Dependencies>
+    </m:properties>
+  </entry>
+  <entry>
+    <title type="text">git</title>
+    <content type="application/zip" src="https://example.test/api/v2/package/git/2.44.0" />
+    <m:properties>
+      <d:Version> 2.44.0 </d:Version>
+      <d:Dependencies></d:Dependencies>
+    </m:properties>
+  </entry>
+  <link rel="next" href="https://example.test/api/v2/FindPackagesById()?id='git'&amp;$skip=2" />
+</feed>
+"""
+
+LAST_PAGE = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"
+      xmlns:d="http://schemas.microsoft.com/ado/2007/08/dataservices"
+      xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata">
+  <entry><m:properties><d:Version>2.43.0</d:Version></m:properties></entry>
+</feed>
+"""
+
+
+def test_parse_feed_versions_and_next_link():
+    versions, next_url = parse_feed(io.BytesIO(PAGE))
+    assert versions == ["2.45.1", "2.44.0"]
+    assert next_url == "https://example.test/api/v2/FindPackagesById()?id='git'&$skip=2"
+
+
+def test_parse_feed_last_page():
+    assert parse_feed(io.BytesIO(LAST_PAGE)) == (["2.43.0"], None)
+
+
+def test_parse_packages():
+    packages, next_url = parse_packages(io.BytesIO(PAGE))
+    assert next_url.endswith("$skip=2")
+    assert packages[0] == {"id": "git", "version": "2.45.1",
+                           "url": "https://example.test/api/v2/package/git/2.45.1",
+                           "dependencies": [("git.install", "[2.45.1]")]}
+    assert packages[1]["dependencies"] == []
+
+
+def test_parse_dependencies():
+    assert parse_dependencies("chocolatey-core.extension:1.3.3|git.install:[2.45.1]:net45") == [
+        ("chocolatey-core.extension", "1.3.3"), ("git.install", "[2.45.1]")]
+    assert parse_dependencies(None) == []
+
+
+def test_exact_version():
+    assert exact_version("[2.45.1]") == "2.45.1"
+    assert exact_version("[1.0,2.0)") is None
+    assert exact_version("1.3.3") is None
+
+
+class FakeFeed:
+    def __init__(self, packages):
+        self.packages = packages
+        self.requests = []
+
+    def package(self, package_id, version=None):
+        self.requests.append((package_id, version))
+        return self.packages[package_id]
+
+
+def test_resolve_dependencies_once_each_breadth_first():
+    feed = FakeFeed({
+        "git": {"id": "git", "dependencies": [("git.install", "[2.45.1]")]},
+        "git.install": {"id": "git.install", "dependencies": [("chocolatey-core.extension", "1.3.3")]},
+        "openjdk": {"id": "openjdk", "dependencies": [("chocolatey-core.extension", "1.3.3")]},
+        "chocolatey-core.extension": {"id": "chocolatey-core.extension", "dependencies": []},
+    })
+    local = {"openjdk": {"id": "openjdk", "path": "openjdk.nupkg", "dependencies": []}}
+    resolved = resolve_dependencies(feed, [("git", "latest"), ("openjdk", "17.0.12")], local)
+    assert [package["id"] for package in resolved] == ["git", "openjdk", "git.install", "chocolatey-core.extension"]
+    assert ("git", None) in feed.requests
+    assert ("git.install", "2.45.1") in feed.requests
+    assert ("openjdk", "17.0.12") not in feed.requests
+
+
+def test_with_query_adds_or_replaces():
+    assert with_query("https://feed.test/api/v2/next", "$select", "Version") == "https://feed.test/api/v2/next?$select=Version"
+    assert with_query("https://feed.test/x?$select=Id,Version&id='git'", "$select", "Version") == \
+        "https://feed.test/x?id='git'&$select=Version"
+
+
+def feed_page(versions, next_url=None):
+    entries = "".join(f"<entry><m:properties><d:Version>{v}</d:Version></m:properties></entry>" for v in versions)
+    link = f'<link rel="next" href="{next_url}" />' if next_url else ""
+    return (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom" '
+            f'xmlns:d="http://schemas.microsoft.com/ado/2007/08/dataservices" '
+            f'xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata">{entries}{link}</feed>').encode()
+
+
+@pytest.fixture
+def feed_server(stub_server):
+    # Three pages; the first next link drops $select, the second has no query string at all
+    def first(handler):
+        if handler.headers.get("If-None-Match") == '"p1"':
+            return 304, {}, b""
+        next_url = stub_server.url("/api/v2/FindPackagesById()") + "?id='git'&amp;$skip=2"
+        return page(handler, ["2.45.1", "2.45.0"], next_url, {"ETag": '"p1"'})
+
+    def second(handler):
+        return page(handler, ["2.44.0", "2.43.0"], stub_server.url("/api/v2/next/3"))
+
+    def third(handler):
+        return page(handler, ["2.42.0"])
+
+    def page(handler, versions, next_url=None, headers=None):
+        body = feed_page(versions, next_url)
+        headers = dict(headers or {})
+        if "gzip" in handler.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return 200, headers, body
+
+    def find(handler):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(handler.path).query)
+        return second(handler) if "$skip" in query else first(handler)
+
+    stub_server.routes["/api/v2/FindPackagesById()"] = find
+    stub_server.routes["/api/v2/next/3"] = third
+    return stub_server
+
+
+def test_versions_follow_every_page_over_gzip(feed_server):
+    client = ChocolateyFeedClient(feed_url=feed_server.url("/api/v2/"))
+    versions, validators = client.versions("git")
+    client.close()
+    assert versions == ["2.45.1", "2.45.0", "2.44.0", "2.43.0", "2.42.0"]
+    assert validators == {"etag": '"p1"'}
+    paths = [path for path, _headers in feed_server.requests]
+    assert len(paths) == 3
+    assert all(urllib.parse.parse_qs(urllib.parse.urlsplit(path).query)["$select"] == ["Version"] for path in paths)
+    assert all(headers.get("Accept-Encoding") == "gzip" for _path, headers in feed_server.requests)
+
+
+def test_unchanged_first_page_is_not_modified(feed_server):
+    client = ChocolateyFeedClient(feed_url=feed_server.url("/api/v2/"))
+    with pytest.raises(NotModified):
+        client.versions("git", {"etag": '"p1"'})
+    client.close()
+
+
+class FailingConnection:
+    def __init__(self):
+        self.closed = False
+
+    def request(self, *args, **kwargs):
+        raise ConnectionResetError("reset by peer")
+
+    def close(self):
+        self.closed = True
+
+
+def test_a_failed_retry_closes_its_connection():
+    client = ChocolateyFeedClient(feed_url="http://feed.test/api/v2/")
+    pooled, fresh = FailingConnection(), FailingConnection()
+    client.pool.acquire = lambda scheme, netloc: pooled
+    client.pool.connect = lambda scheme, netloc: fresh
+    with pytest.raises(ConnectionResetError):
+        client.versions("git")
+    assert pooled.closed and fresh.closed
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+import cli
+import component_registry
+from component_registry import selected_components
+
+COMPONENTS = [component.name for component in selected_components(None) if component.key != "admin"]
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    # Run timings go to the temporary directory, and nothing reads a real feed
+    monkeypatch.setattr(cli, "DEFAULT_LOG_FILE", str(tmp_path / "flutter_installer.log"))
+    monkeypatch.setattr(cli, "component_catalog", lambda component: ["21.0.5", "17.0.13", "17.0.12", "11.0.25"])
+    monkeypatch.setattr(cli, "load_catalogs", lambda versions: (None, None))
+    monkeypatch.setattr(cli, "is_admin", lambda: False)
+
+
+def run(capsys, *argv):
+    code = cli.main(list(argv))
+    out, err = capsys.readouterr()
+    # stdout holds exactly one JSON document; progress goes to stderr
+    return code, json.loads(out), err
+
+
+def fake_check(statuses):
+    def run_system_check(components, on_result, store=None, incremental=False, touched=frozenset()):
+        results = {}
+        for component in components:
+            status, detail = statuses.get(component, ("Installed", "1.0"))
+            on_result(component, status, detail)
+            results[component] = (status, detail)
+        return results
+    return run_system_check
+
+
+def test_check_ready(capsys, monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, "run_system_check", fake_check({}))
+    output = tmp_path / "check.json"
+    code, result, err = run(capsys, "check", "--output", str(output))
+    assert code == cli.EXIT_OK
+    assert result["command"] == "check" and result["ready"] is True and result["administrator"] is False
+    assert sorted(result["components"]) == sorted(COMPONENTS)
+    assert result["components"]["Git"] == {"status": "Installed", "ready": True, "version": "1.0", "detail": None}
+    assert isinstance(result["elapsed"], float)
+    assert json.loads(output.read_text()) == result
+    assert "Git: Installed (1.0)" in err
+    # The run is recorded for `report`
+    spans = (tmp_path / "flutter_installer.spans.jsonl").read_text().splitlines()
+    assert any('"command": "check"' in line for line in spans)
+
+
+def test_check_with_missing_components_fails(capsys, monkeypatch):
+    monkeypatch.setattr(cli, "run_system_check",
+                        fake_check({"Git": ("Not Installed", None), "NDK": ("Timed Out", "no answer after 15s")}))
+    code, result, _ = run(capsys, "check", "--quiet")
+    assert code == cli.EXIT_FAILED
+    assert result["ready"] is False
+    assert result["components"]["Git"] == {"status": "Not Installed", "ready": False, "version": None, "detail": None}
+    assert result["components"]["NDK"]["detail"] == "no answer after 15s"
+
+
+def test_check_with_unknown_component_is_a_usage_error(capsys):
+    code, result, _ = run(capsys, "check", "--with", "nosuchthing")
+    assert code == cli.EXIT_USAGE
+    assert result["command"] == "check" and "nosuchthing" in result["error"]
+
+
+def test_install_dry_run_prints_the_plan(capsys, tmp_path):
+    code, result, _ = run(capsys, "install", "--dry-run", "--flutter", "3.24.5", "--precache", "android,web")
+    assert code == cli.EXIT_OK
+    assert set(result) == {"command", "dry_run", "profile", "steps"}
+    assert result["dry_run"] is True
+    # openjdk was left on auto and is picked from the catalog
+    assert result["profile"]["flutter"] == "3.24.5"
+    assert result["profile"]["openjdk"].startswith("17")
+    assert result["profile"]["precache"] == ["android", "web"]
+    steps = {step["id"]: step for step in result["steps"]}
+    assert set(result["steps"][0]) == {"id", "title", "depends_on", "after"}
+    assert steps["flutter"]["depends_on"] == ["git"]
+    assert result["steps"][-1]["id"] == "flutter-doctor"
+    # A dry run installs nothing and records no run
+    assert not (tmp_path / "flutter_installer.spans.jsonl").exists()
+
+
+def test_install_needs_administrator(capsys):
+    code, result, _ = run(capsys, "install", "--flutter", "3.24.5")
+    assert code == cli.EXIT_NOT_ADMIN
+    assert result == {"command": "install", "succeeded": False, "error": "Administrator privileges are required"}
+
+
+@pytest.mark.parametrize("argv", [
+    ["install", "--dry-run", "--precache", "playstation"],
+    ["install", "--dry-run", "--profile", "missing.json"],
+])
+def test_install_with_a_bad_profile_is_a_usage_error(capsys, argv):
+    code, result, _ = run(capsys, *argv)
+    assert code == cli.EXIT_USAGE
+    assert result["command"] == "install" and result["error"]
+
+
+def test_unexpected_errors_are_reported_as_json(capsys, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("probe engine crashed")
+
+    monkeypatch.setattr(cli, "run_system_check", broken)
+    code, result, _ = run(capsys, "check")
+    assert code == cli.EXIT_ERROR
+    assert result == {"command": "check", "error": "RuntimeError: probe engine crashed"}
+
+
+def test_no_command_prints_usage(capsys):
+    assert cli.main([]) == cli.EXIT_USAGE
+    assert "usage" in capsys.readouterr().err
+
+
+def test_bad_components_file_is_reported_on_stderr(capsys, monkeypatch, tmp_path):
+    path = tmp_path / "components.json"
+    path.write_text('{"components": [{"key": "git", "name": "Git", "package": "git"}]}')
+    monkeypatch.setenv("FLUTTER_INSTALLER_COMPONENTS", str(path))
+    monkeypatch.setattr(component_registry, "_registry", None)
+    monkeypatch.setattr(component_registry, "_load_error", None)
+    monkeypatch.setattr(cli, "run_system_check", fake_check({}))
+    code, result, err = run(capsys, "check", "--quiet")
+    assert code == cli.EXIT_OK
+    assert sorted(result["components"]) == sorted(COMPONENTS)
+    assert "Extra components not loaded" in err and "'git' cannot be used" in err
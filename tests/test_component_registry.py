@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import component_registry
+from component_registry import ComponentError, Lazy, load_extra_components
+
+
+def write(tmp_path, components):
+    path = tmp_path / "components.json"
+    path.write_text(json.dumps({"format": 1, "components": components}))
+    return str(path)
+
+
+def chrome(**fields):
+    return dict({"key": "googlechrome", "name": "Google Chrome", "package": "GoogleChrome"}, **fields)
+
+
+def test_extra_components(tmp_path):
+    path = write(tmp_path, [chrome(selected=True, depends_on=["vctools", "git"]),
+                            {"key": "vctools", "name": "C++ Build Tools", "package": "vctools", "weight": 20}])
+    extras = load_extra_components(path)
+    assert [extra.key for extra in extras] == ["googlechrome", "vctools"]
+    assert extras[0].package == "googlechrome" and extras[0].selected and extras[0].optional
+    assert extras[0].depends_on == ("chocolatey", "vctools", "git")
+    assert extras[1].weight == 20 and not extras[1].selected
+    assert load_extra_components(str(tmp_path / "missing.json")) == []
+
+
+@pytest.mark.parametrize("components, message", [
+    ([chrome(), chrome()], "'googlechrome' cannot be used"),
+    ([chrome(key="git")], "'git' cannot be used"),
+    ([chrome(key="flutter-doctor")], "cannot be used"),
+    ([chrome(key="Chrome")], "cannot be used"),
+    ([{"key": "googlechrome", "name": "Google Chrome"}], "needs a key, a name and a package"),
+    ([chrome(depends_on=["edge"])], "depends on unknown component 'edge'"),
+    ([chrome(depends_on="git")], "must be a list"),
+    ([chrome(depends_on=["googlechrome"])], "depends on itself"),
+])
+def test_invalid_extra_components(tmp_path, components, message):
+    with pytest.raises(ComponentError, match=message):
+        load_extra_components(write(tmp_path, components))
+
+
+def test_unreadable_components_file(tmp_path):
+    path = tmp_path / "components.json"
+    path.write_text('{"format": 1, "components": [')
+    with pytest.raises(ComponentError, match="Cannot read"):
+        load_extra_components(str(path))
+    path.write_text('{"format": 2, "components": []}')
+    with pytest.raises(ComponentError, match="must be an object"):
+        load_extra_components(str(path))
+
+
+@pytest.mark.parametrize("reference", ["versions", "versions:", ":parse", "versions:parse:x", "no such:thing", None])
+def test_lazy_rejects_bad_references(reference):
+    with pytest.raises(ComponentError, match="module:function"):
+        Lazy(reference)
+
+
+def test_lazy_imports_on_first_call():
+    parse = Lazy("versions:parse_or_none", "3.24.5")
+    assert parse._function is None
+    assert str(parse()) == "3.24.5"
+    with pytest.raises(ComponentError, match="Cannot load no_such_module:check"):
+        Lazy("no_such_module:check")()
+    with pytest.raises(ComponentError, match="Cannot load versions:no_such_function"):
+        Lazy("versions:no_such_function")()
+
+
+def test_registry_keeps_the_built_ins_when_the_file_is_bad(tmp_path, monkeypatch):
+    monkeypatch.setattr(component_registry, "_registry", None)
+    monkeypatch.setattr(component_registry, "_load_error", None)
+    monkeypatch.setenv("FLUTTER_INSTALLER_COMPONENTS", write(tmp_path, [chrome(depends_on=["edge"])]))
+    keys = [component.key for component in component_registry.components()]
+    assert keys == [component.key for component in component_registry.BUILTIN_COMPONENTS]
+    assert "unknown component 'edge'" in component_registry.load_error()
+
+
+def test_registry_adds_the_extras(tmp_path, monkeypatch):
+    monkeypatch.setattr(component_registry, "_registry", None)
+    monkeypatch.setattr(component_registry, "_load_error", None)
+    monkeypatch.setenv("FLUTTER_INSTALLER_COMPONENTS", write(tmp_path, [chrome(selected=True)]))
+    assert component_registry.component("googlechrome").name == "Google Chrome"
+    assert component_registry.default_selection() == ["googlechrome"]
+    assert component_registry.load_error() is None
@@ -0,0 +1,138 @@
+import hashlib
+import http.server
+import json
+import os
+import threading
+
+import pytest
+
+from download_manager import STATE_FORMAT, ChunkedDownloader, DownloadError
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+CHUNK = 1024
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        requested = self.headers.get("Range")
+        server.ranges.append(requested)
+        if requested and server.ranged:
+            start, end = (int(part) for part in requested.split("=")[1].split("-"))
+            body = DATA[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+            self.send_header("ETag", '"v1"')
+        else:
+            body = DATA
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The downloader hangs up on a full body it does not want
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = Server(("127.0.0.1", 0), Handler)
+    httpd.ranged = True
+    httpd.ranges = []
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/tools.zip"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def downloader():
+    return ChunkedDownloader(connections=3, chunk_size=CHUNK, retries=0)
+
+
+def test_chunked_download(server, tmp_path):
+    path = str(tmp_path / "tools.zip")
+    progress = []
+    downloader().download(server.url, path, hashlib.sha256(DATA).hexdigest(), on_progress=lambda done, total: progress.append((done, total)), log=lambda line: None)
+    assert open(path, "rb").read() == DATA
+    assert progress[-1] == (len(DATA), len(DATA))
+    assert not os.path.exists(path + ".part") and not os.path.exists(path + ".part.json")
+
+
+def test_resume_fetches_only_the_missing_chunks(server, tmp_path):
+    path = str(tmp_path / "tools.zip")
+    part = path + ".part"
+    # An earlier run finished chunks 0, 1 and 5 before it was stopped
+    with open(part, "wb") as f:
+        f.write(DATA[:2 * CHUNK] + b"\0" * (3 * CHUNK) + DATA[5 * CHUNK:6 * CHUNK] + b"\0" * (len(DATA) - 6 * CHUNK))
+    with open(part + ".json", "w") as f:
+        json.dump({"format": STATE_FORMAT, "url": server.url, "size": len(DATA), "validator": '"v1"',
+                   "chunk_size": CHUNK, "done": [0, 1, 5]}, f)
+    logged = []
+    downloader().download(server.url, path, log=logged.append)
+    assert open(path, "rb").read() == DATA
+    fetched = sorted(int(r.split("=")[1].split("-")[0]) // CHUNK for r in server.ranges[1:])
+    assert fetched == [2, 3, 4, 6, 7, 8, 9]
+    assert any("3 of 10 chunks already downloaded" in line for line in logged)
+
+
+def test_state_for_another_version_is_ignored(server, tmp_path):
+    path = str(tmp_path / "tools.zip")
+    with open(path + ".part", "wb") as f:
+        f.write(b"\1" * len(DATA))
+    with open(path + ".part.json", "w") as f:
+        json.dump({"format": STATE_FORMAT, "url": server.url, "size": len(DATA), "validator": '"v0"',
+                   "chunk_size": CHUNK, "done": list(range(10))}, f)
+    downloader().download(server.url, path, log=lambda line: None)
+    assert open(path, "rb").read() == DATA
+
+
+def test_complete_file_without_checksum_is_kept(server, tmp_path):
+    path = str(tmp_path / "tools.zip")
+    with open(path, "wb") as f:
+        f.write(DATA)
+    downloader().download(server.url, path, log=lambda line: None)
+    assert server.ranges == ["bytes=0-0"]
+
+
+def test_file_of_the_wrong_size_is_fetched_again(server, tmp_path):
+    path = str(tmp_path / "tools.zip")
+    with open(path, "wb") as f:
+        f.write(DATA[:100])
+    downloader().download(server.url, path, log=lambda line: None)
+    assert open(path, "rb").read() == DATA
+
+
+def test_complete_file_kept_without_range_support(server, tmp_path):
+    server.ranged = False
+    path = str(tmp_path / "tools.zip")
+    with open(path, "wb") as f:
+        f.write(DATA)
+    downloader().download(server.url, path, log=lambda line: None)
+    assert server.ranges == ["bytes=0-0"]
+
+
+def test_stream_without_range_support(server, tmp_path):
+    server.ranged = False
+    path = str(tmp_path / "tools.zip")
+    downloader().download(server.url, path, hashlib.sha256(DATA).hexdigest(), log=lambda line: None)
+    assert open(path, "rb").read() == DATA
+
+
+def test_checksum_mismatch(server, tmp_path):
+    path = str(tmp_path / "tools.zip")
+    with pytest.raises(DownloadError):
+        downloader().download(server.url, path, "0" * 64, log=lambda line: None)
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".part")
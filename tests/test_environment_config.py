@@ -0,0 +1,94 @@
+import sys
+import types
+
+import environment_config
+from environment_config import (merge_path, missing_requirements, normalize_entry, parse_path, plan_environment,
+                                split_path, variable, write_machine_variables)
+
+SDK = r"C:\Users\dev\AppData\Local\Android\Sdk"
+FLUTTER = r"C:\flutter"
+REQUIRED = [r"C:\flutter\bin", SDK + r"\emulator", SDK + r"\platform-tools", SDK + r"\cmdline-tools\latest\bin"]
+
+
+def test_split_path_drops_blanks_and_quotes():
+    assert split_path(r'C:\a;; "C:\b" ;C:\c;') == [r"C:\a", r"C:\b", r"C:\c"]
+    assert split_path(None) == []
+
+
+def test_parse_path_keeps_the_first_of_each_entry():
+    assert parse_path(r"C:\Tools;c:\tools\;C:\Other;C:\TOOLS") == [r"C:\Tools", r"C:\Other"]
+
+
+def test_entries_compare_normalised(monkeypatch):
+    monkeypatch.setenv("FLUTTER_ROOT", FLUTTER)
+    assert normalize_entry(r"%FLUTTER_ROOT%\bin") == normalize_entry(r'"c:\FLUTTER\bin\"')
+    assert normalize_entry(SDK + r"\emulator-old") != normalize_entry(SDK + r"\emulator")
+
+
+def test_variable_names_are_case_insensitive():
+    assert variable({"PATH": "x"}, "Path") == "x"
+    assert variable({}, "Path") is None
+
+
+def test_nothing_to_do():
+    variables = {"ANDROID_HOME": SDK + "\\", "Path": r"C:\Windows;" + ";".join(entry.upper() for entry in REQUIRED)}
+    assert missing_requirements(variables, SDK, FLUTTER) == []
+    assert plan_environment(variables, SDK, FLUTTER) == ({}, [])
+
+
+def test_only_missing_entries_are_appended():
+    path = r"C:\Windows;C:\flutter\bin;C:\Windows\;" + SDK + r"\emulator-old"
+    changes, added = plan_environment({"ANDROID_HOME": SDK, "Path": path}, SDK, FLUTTER)
+    assert added == REQUIRED[1:]
+    assert changes == {"Path": ";".join([r"C:\Windows", r"C:\flutter\bin", SDK + r"\emulator-old"] + REQUIRED[1:])}
+
+
+def test_android_home_alone():
+    variables = {"ANDROID_HOME": r"D:\OldSdk", "Path": ";".join(REQUIRED)}
+    assert plan_environment(variables, SDK, FLUTTER) == ({"ANDROID_HOME": SDK}, [])
+
+
+def test_merge_path_keeps_the_newer_value():
+    assert merge_path(r"C:\Windows;C:\Git\cmd", [r"C:\flutter\bin", "c:\\git\\cmd\\"]) == r"C:\Windows;C:\Git\cmd;C:\flutter\bin"
+    assert merge_path(None, [r"C:\flutter\bin"]) == r"C:\flutter\bin"
+
+
+class FakeRegistryKey:
+    # The HKLM Environment key, with Path changed by another installer since it was first read
+    def __init__(self, values):
+        self.values = values
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def fake_winreg(values):
+    key = FakeRegistryKey(values)
+    module = types.SimpleNamespace(
+        HKEY_LOCAL_MACHINE=0, KEY_READ=1, KEY_WRITE=2, REG_SZ=1, REG_EXPAND_SZ=2,
+        OpenKey=lambda *args: key,
+        QueryValueEx=lambda key, name: key.values[name],
+        SetValueEx=lambda key, name, reserved, value_type, value: key.values.__setitem__(name, (value, value_type)))
+    return module, key
+
+
+def test_path_is_merged_into_the_value_read_back_before_writing(monkeypatch):
+    current = {"Path": (r"C:\Windows", 2)}
+    changes, added = plan_environment({"Path": r"C:\Windows"}, SDK, FLUTTER)
+    # Chocolatey added Git after the step read Path
+    winreg, key = fake_winreg({"Path": (r"C:\Windows;C:\Program Files\Git\cmd", 2)})
+    monkeypatch.setitem(sys.modules, "winreg", winreg)
+    monkeypatch.setattr(environment_config, "broadcast_environment_change", lambda: None)
+    write_machine_variables(changes, current, added)
+    assert key.values["Path"] == (";".join([r"C:\Windows", r"C:\Program Files\Git\cmd"] + REQUIRED), 2)
+    assert key.values["ANDROID_HOME"] == (SDK, 1)
+
+
+def test_environment_runs_after_chocolatey_and_its_packages():
+    from install_steps import build_install_plan
+    steps = {s.step_id: s for s in build_install_plan(sdk_root="sdk")}
+    assert set(steps["environment"].after) == {"chocolatey", "git", "openjdk", "androidstudio"}
+    assert steps["environment"].depends_on == ()
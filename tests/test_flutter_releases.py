@@ -0,0 +1,108 @@
+import http.client
+import json
+import subprocess
+
+import pytest
+
+import flutter_releases
+from flutter_releases import FlutterReleaseIndex, parse_release_tag
+
+MANIFEST = {
+    "base_url": "https://storage.googleapis.com/flutter_infra_release/releases",
+    "releases": [
+        {"version": "3.24.5", "channel": "stable", "hash": "dec2ee5", "sha256": "a" * 64,
+         "archive": "stable/windows/flutter_windows_3.24.5-stable.zip", "dart_sdk_version": "3.5.4"},
+        {"version": "3.27.0-0.2.pre", "channel": "beta", "hash": "8e5ee1a"},
+        {"version": "3.24.0", "channel": "stable", "hash": "80c2e84"},
+        {"version": "v1.12.13+hotfix.9", "channel": "stable", "hash": "f139b11"},
+    ],
+}
+
+LS_REMOTE = (
+    "80c2e84\trefs/tags/3.24.0\n"
+    "8e5ee1a\trefs/tags/3.27.0-0.2.pre\n"
+    "b0ab8f1\trefs/tags/3.3.10\n"
+    "f139b11\trefs/tags/v1.12.13+hotfix.9\n"
+    "1111111\trefs/tags/v2.0.0-rc1\n"
+)
+
+
+@pytest.mark.parametrize("tag, key", [
+    ("3.24.0", (3, 24, 0, 0)),
+    ("3.3.10", (3, 3, 10, 0)),
+    ("v1.12.13+hotfix.9", (1, 12, 13, 9)),
+    ("v1.9.1+hotfix.6", (1, 9, 1, 6)),
+    ("3.27.0-0.2.pre", None),
+    ("2.0.0-rc1", None),
+    ("stable", None),
+    ("3.24", None),
+])
+def test_parse_release_tag(tag, key):
+    assert parse_release_tag(tag) == key
+
+
+def fake_git(stdout, calls=None):
+    def run(args, **kwargs):
+        if calls is not None:
+            calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout, "")
+    return run
+
+
+def test_git_refs_are_filtered_and_sorted_numerically(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(flutter_releases.subprocess, "run", fake_git(LS_REMOTE, calls))
+    index = FlutterReleaseIndex(path=str(tmp_path / "index.json"))
+    assert index._refresh_from_git() == 3
+    # x.y.0 releases are kept and 3.3.10 sorts below 3.24.0
+    assert index.versions() == ["3.24.0", "3.3.10", "v1.12.13+hotfix.9"]
+    assert calls[0][-2:] == ["refs/tags/[0-9]*", "refs/tags/v[0-9]*"]
+    # Known refs are not added again
+    assert index._refresh_from_git() == 0
+
+
+def test_manifest_refresh_is_cached_on_disk_and_revalidated(tmp_path, stub_server):
+    body = json.dumps(MANIFEST).encode()
+
+    def manifest(handler):
+        if handler.headers.get("If-None-Match") == '"m1"':
+            return 304, {}, b""
+        return 200, {"ETag": '"m1"', "Content-Type": "application/json"}, body
+
+    stub_server.routes["/releases_windows.json"] = manifest
+    path = str(tmp_path / "index.json")
+    index = FlutterReleaseIndex(path=path, manifest_url=stub_server.url("/releases_windows.json"))
+    assert index.refresh() == 3
+    assert index.versions() == ["3.24.5", "3.24.0", "v1.12.13+hotfix.9"]
+    assert index.archive_url("3.24.5") == MANIFEST["base_url"] + "/stable/windows/flutter_windows_3.24.5-stable.zip"
+    assert index.archive_url("3.24.0") is None
+
+    reloaded = FlutterReleaseIndex(path=path, manifest_url=stub_server.url("/releases_windows.json"))
+    assert reloaded.versions() == index.versions()
+    assert reloaded.release("3.24.5")["key"] == (3, 24, 5, 0)
+    assert reloaded.release("3.24.5")["sha256"] == "a" * 64
+    assert reloaded.refresh() == 0
+    assert stub_server.requests[-1][1].get("If-None-Match") == '"m1"'
+
+
+def test_corrupt_index_starts_empty(tmp_path):
+    path = tmp_path / "index.json"
+    path.write_text("{broken")
+    assert FlutterReleaseIndex(path=str(path)).versions() == []
+
+
+@pytest.mark.parametrize("error", [
+    http.client.RemoteDisconnected("Remote end closed connection without response"),
+    http.client.IncompleteRead(b"{"),
+    OSError("unreachable"),
+    ValueError("bad JSON"),
+])
+def test_manifest_failures_fall_back_to_git(tmp_path, monkeypatch, error):
+    def broken(url, validators=None, timeout=30):
+        raise error
+
+    monkeypatch.setattr(flutter_releases, "fetch_url", broken)
+    monkeypatch.setattr(flutter_releases.subprocess, "run", fake_git(LS_REMOTE))
+    index = FlutterReleaseIndex(path=str(tmp_path / "index.json"))
+    assert index.refresh() == 3
+    assert index.versions()[0] == "3.24.0"
@@ -0,0 +1,92 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from flutter_sdk import FlutterSdkFetcher
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+ENV = dict(os.environ, GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1",
+           GIT_AUTHOR_NAME="test", GIT_AUTHOR_EMAIL="test@example.com",
+           GIT_COMMITTER_NAME="test", GIT_COMMITTER_EMAIL="test@example.com")
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git"] + list(args), cwd=cwd, env=ENV, check=True, capture_output=True, text=True).stdout
+
+
+class Context:
+    def __init__(self):
+        self.commands = []
+        self.lines = []
+
+    def log(self, line):
+        self.lines.append(line)
+
+    def run(self, args, env=None):
+        self.commands.append(args[3:])
+        return subprocess.run(args, env=env, capture_output=True).returncode
+
+
+def commit(work, name, text, tag=None):
+    with open(os.path.join(work, name), "w") as f:
+        f.write(text)
+    git("add", name, cwd=work)
+    git("commit", "--quiet", "-m", f"Update {name}", cwd=work)
+    if tag:
+        git("tag", tag, cwd=work)
+    git("push", "--quiet", "--tags", "origin", "stable", cwd=work)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    # A bare "flutter.git" with a mirror that is one commit behind it
+    bare = str(tmp_path / "flutter.git")
+    git("init", "--quiet", "--bare", bare)
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    work = str(tmp_path / "work")
+    git("clone", "--quiet", bare, work)
+    git("checkout", "--quiet", "-b", "stable", cwd=work)
+    commit(work, "version", "3.24.4", tag="3.24.4")
+    commit(work, "README.md", "Flutter")
+    mirror = str(tmp_path / "mirror.git")
+    git("clone", "--quiet", "--mirror", bare, mirror)
+    commit(work, "version", "3.24.5", tag="3.24.5")
+    return "file://" + bare.replace(os.sep, "/"), mirror
+
+
+def test_release_tag_is_fetched_shallow(tmp_path, remote):
+    url, _ = remote
+    destination = str(tmp_path / "flutter")
+    FlutterSdkFetcher(Context(), repo_url=url, mirror="", env=ENV).fetch_git("3.24.5", destination)
+    assert open(os.path.join(destination, "version")).read() == "3.24.5"
+    assert git("rev-list", "--count", "HEAD", cwd=destination).strip() == "1"
+    assert git("describe", "--tags", cwd=destination).strip() == "3.24.5"
+    assert not os.path.exists(destination + ".partial")
+
+
+def test_channel_seeded_from_a_mirror_that_is_behind(tmp_path, remote):
+    url, mirror = remote
+    context = Context()
+    destination = str(tmp_path / "flutter")
+    FlutterSdkFetcher(context, repo_url=url, mirror=mirror, env=ENV).fetch_git("stable", destination)
+    assert open(os.path.join(destination, "version")).read() == "3.24.5"
+    assert open(os.path.join(destination, "README.md")).read() == "Flutter"
+    # The mirror's commit is checked out before the remote is asked for the difference
+    seed = context.commands.index(["checkout", "--quiet", "--force", "--detach", "refs/remotes/origin/stable"])
+    fetch = context.commands.index(["fetch", "--filter=blob:none", "origin",
+                                    "+refs/heads/stable:refs/remotes/origin/stable"])
+    assert seed < fetch
+    assert git("remote", cwd=destination).split() == ["origin"]
+    assert git("rev-list", "--count", "HEAD", cwd=destination).strip() == "3"
+
+
+def test_mirror_without_the_tag_falls_back_to_the_remote(tmp_path, remote):
+    url, mirror = remote
+    context = Context()
+    destination = str(tmp_path / "flutter")
+    FlutterSdkFetcher(context, repo_url=url, mirror=mirror, env=ENV).fetch_git("3.24.5", destination)
+    assert open(os.path.join(destination, "version")).read() == "3.24.5"
+    assert any("does not have 3.24.5" in line for line in context.lines)
@@ -0,0 +1,87 @@
+import os
+
+from install_journal import RUNNING, InstallJournal
+from install_orchestrator import FAILED, OK, SKIPPED, InstallOrchestrator, InstallStep
+
+
+class Plan:
+    # Two steps whose actions count their runs; sdk-packages checks a marker file
+    def __init__(self, tmp_path, ndk="27.2", fail=()):
+        self.runs = []
+        self.marker = tmp_path / "ndk" / "source.properties"
+        self.fail = set(fail)
+        self.steps = [
+            InstallStep("cmdline-tools", "Command-line Tools", self.action("cmdline-tools"),
+                        inputs={"sdk_root": str(tmp_path)}, verify=lambda outputs: True),
+            InstallStep("sdk-packages", "NDK", self.action("sdk-packages"), ["cmdline-tools"],
+                        inputs={"ndk": ndk}, verify=lambda outputs: self.marker.exists()),
+            InstallStep("flutter-doctor", "Flutter Doctor", self.action("flutter-doctor"), ["sdk-packages"]),
+        ]
+
+    def action(self, step_id):
+        def run(context):
+            self.runs.append(step_id)
+            if step_id == "sdk-packages":
+                self.marker.parent.mkdir(parents=True, exist_ok=True)
+                self.marker.write_text("Pkg.Revision = 27.2")
+                context.output(ndk="27.2.12479018")
+            return FAILED if step_id in self.fail else OK
+        return run
+
+    def run(self, journal):
+        self.log = []
+        orchestrator = InstallOrchestrator(self.steps, journal=journal,
+                                           on_log=lambda step_id, line: self.log.append(line))
+        return orchestrator, orchestrator.run()
+
+
+def test_finished_steps_are_skipped_after_a_failure(tmp_path):
+    path = str(tmp_path / "journal.json")
+    plan = Plan(tmp_path, fail={"flutter-doctor"})
+    plan.run(InstallJournal(path))
+    assert os.path.exists(path)
+
+    again = Plan(tmp_path)
+    orchestrator, results = again.run(InstallJournal(path))
+    assert results == {"cmdline-tools": SKIPPED, "sdk-packages": SKIPPED, "flutter-doctor": OK}
+    assert again.runs == ["flutter-doctor"]
+    # Outputs of a skipped step come from the journal
+    assert orchestrator.outputs["sdk-packages"] == {"ndk": "27.2.12479018"}
+    # Success removes the journal
+    assert not os.path.exists(path)
+
+
+def test_steps_rerun_when_inputs_change_or_results_are_gone(tmp_path):
+    path = str(tmp_path / "journal.json")
+    Plan(tmp_path, fail={"flutter-doctor"}).run(InstallJournal(path))
+
+    changed = Plan(tmp_path, ndk="28.0", fail={"flutter-doctor"})
+    changed.run(InstallJournal(path))
+    assert changed.runs == ["sdk-packages", "flutter-doctor"]
+
+    changed.marker.unlink()
+    gone = Plan(tmp_path, ndk="28.0")
+    gone.run(InstallJournal(path))
+    assert gone.runs == ["sdk-packages", "flutter-doctor"]
+    assert any("results are gone" in line for line in gone.log)
+
+
+def test_interrupted_step_is_reported(tmp_path):
+    path = str(tmp_path / "journal.json")
+    journal = InstallJournal(path)
+    journal.begin("sdk-packages", {"ndk": "27.2"})
+    assert InstallJournal(path).interrupted("sdk-packages")
+    assert InstallJournal(path).steps["sdk-packages"]["status"] == RUNNING
+
+    plan = Plan(tmp_path)
+    plan.run(InstallJournal(path))
+    assert "sdk-packages" in plan.runs
+    assert any("previous run stopped during this step" in line for line in plan.log)
+
+
+def test_unreadable_journal_starts_over(tmp_path):
+    path = tmp_path / "journal.json"
+    path.write_text("{not json")
+    assert InstallJournal(str(path)).steps == {}
+    path.write_text('{"format": 2, "steps": {"git": {"status": "ok"}}}')
+    assert InstallJournal(str(path)).done() == []
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from install_orchestrator import BLOCKED, FAILED, OK, InstallOrchestrator, InstallStep, simulated_executor
+
+
+def step(step_id, depends_on=(), after=()):
+    return InstallStep(step_id, step_id.title(), None, depends_on, after=after)
+
+
+def run(steps, failures=(), durations=None):
+    finished = []
+    orchestrator = InstallOrchestrator(steps, executor=simulated_executor(durations or {}, failures),
+                                       on_event=lambda event: event["event"] == "end" and finished.append(event["step"]))
+    return orchestrator.run(), finished
+
+
+def test_failure_blocks_dependents_transitively():
+    steps = [step("chocolatey"), step("git", ["chocolatey"]), step("flutter", ["git"]),
+             step("cmdline-tools"), step("sdk-packages", ["cmdline-tools"])]
+    results, _ = run(steps, failures={"chocolatey"})
+    assert results == {"chocolatey": FAILED, "git": BLOCKED, "flutter": BLOCKED,
+                       "cmdline-tools": OK, "sdk-packages": OK}
+
+
+def test_after_orders_without_blocking():
+    steps = [step("flutter"), step("androidstudio"), step("doctor", ["flutter"], after=["androidstudio"])]
+    results, finished = run(steps, failures={"androidstudio"}, durations={"androidstudio": 0.05})
+    assert results == {"flutter": OK, "androidstudio": FAILED, "doctor": OK}
+    assert finished.index("androidstudio") < finished.index("doctor")
+
+
+def test_unknown_dependency_and_cycle_are_rejected():
+    with pytest.raises(ValueError):
+        InstallOrchestrator([step("git", ["chocolatey"])])
+    with pytest.raises(ValueError):
+        InstallOrchestrator([step("a", ["b"]), step("b", after=["a"])])
+
+
+def test_doctor_only_depends_on_what_it_needs():
+    from install_steps import build_install_plan
+    steps = {s.step_id: s for s in build_install_plan(sdk_root="sdk")}
+    doctor = steps["flutter-doctor"]
+    assert sorted(doctor.depends_on) == ["flutter", "flutter-precache", "sdk-packages"]
+    assert set(doctor.depends_on + doctor.after) == set(steps) - {"flutter-doctor"}
+
+    failures = {"androidstudio"}
+    results, _ = run(list(steps.values()), failures=failures)
+    assert results["flutter-doctor"] == OK
+    results, _ = run(list(steps.values()), failures={"sdk-packages"})
+    assert results["flutter-doctor"] == BLOCKED
+
+
+def test_waiting_steps_do_not_take_worker_slots():
+    # Two package steps wait on a shared run that only the pooled step can finish;
+    # if they took the single slot the install would stall
+    shared_run = threading.Event()
+
+    def wait_for_run(context):
+        return OK if shared_run.wait(5) else FAILED
+
+    def work(context):
+        shared_run.set()
+
+    steps = [InstallStep("git", "Git", wait_for_run, pooled=False),
+             InstallStep("openjdk", "OpenJDK", wait_for_run, pooled=False),
+             InstallStep("cmdline-tools", "Command-line Tools", work)]
+    results = InstallOrchestrator(steps, max_workers=1).run()
+    assert results == {"git": OK, "openjdk": OK, "cmdline-tools": OK}
+
+
+def test_package_steps_are_not_pooled():
+    from install_steps import build_install_plan
+    steps = {s.step_id: s for s in build_install_plan(sdk_root="sdk")}
+    assert not steps["git"].pooled and not steps["androidstudio"].pooled
+    assert steps["flutter"].pooled and steps["chocolatey"].pooled
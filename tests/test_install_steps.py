@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from install_orchestrator import FAILED, OK
+from install_steps import FLUTTER_ROOT, build_install_plan, flutter_precache_action
+
+
+class FakeContext:
+    def __init__(self, lines=(), code=0):
+        self.lines = lines
+        self.code = code
+        self.commands = []
+        self.items_seen = []
+        self.logged = []
+
+    def log(self, line):
+        self.logged.append(line)
+
+    def items(self, done, total, detail=None):
+        self.items_seen.append((done, total, detail))
+
+    def run(self, args, input=None, env=None, cwd=None, on_line=None):
+        self.commands.append(args)
+        for line in self.lines:
+            on_line(line)
+        return self.code
+
+
+@pytest.mark.parametrize("platforms, flags", [
+    (["android"], ["--android"]),
+    (["android", "windows", "web"], ["--android", "--windows", "--web"]),
+    (["web"], ["--web"]),
+])
+def test_precache_flags_follow_the_platforms(platforms, flags):
+    context = FakeContext()
+    assert flutter_precache_action(platforms)(context) == OK
+    assert context.commands == [[os.path.join(FLUTTER_ROOT, "bin", "flutter.bat"), "precache"] + flags]
+
+
+def test_precache_reports_downloads_and_failures():
+    context = FakeContext(lines=["Downloading sky_engine...", "Building flutter tool...", "  done"], code=1)
+    assert flutter_precache_action(["web"])(context) == FAILED
+    assert [(done, detail) for done, _, detail in context.items_seen] == [(1, "sky_engine"), (2, "flutter tool")]
+    # 8 shared items and 2 for web
+    assert context.items_seen[0][1] == 10
+
+
+def plan_steps(**kwargs):
+    return {step.step_id: step for step in build_install_plan(sdk_root="sdk", **kwargs)}
+
+
+def test_precache_step_inputs_and_doctor_dependency():
+    steps = plan_steps(versions={"flutter": "3.24.5"}, precache_platforms=["web", "android"])
+    precache = steps["flutter-precache"]
+    assert list(precache.depends_on) == ["flutter"]
+    assert precache.inputs == {"flutter": "3.24.5", "platforms": ["android", "web"]}
+    assert precache.verify is not None
+    assert "flutter-precache" in steps["flutter-doctor"].depends_on
+
+
+def test_no_precache_step_without_platforms():
+    steps = plan_steps(precache_platforms=[])
+    assert "flutter-precache" not in steps
+    doctor = steps["flutter-doctor"]
+    assert sorted(doctor.depends_on) == ["flutter", "sdk-packages"]
+    assert set(doctor.depends_on + doctor.after) == set(steps) - {"flutter-doctor"}
+
+
+def test_no_precache_step_from_a_bundle():
+    class Bundle:
+        profile = {"flutter": "3.24.5", "git": "2.45.1", "openjdk": "17.0.12", "android_studio": "2024.1.1.12",
+                   "ndk": "27.2.12479018", "components": []}
+
+        def archive(self, key):
+            return "https://example.test/flutter.zip", "0" * 64, None
+
+        def chocolatey_package(self):
+            return "bundle/chocolatey.2.3.0.nupkg"
+
+        def chocolatey_source(self):
+            return "bundle"
+
+        def find(self, key):
+            return {"file": f"{key}.zip", "version": self.profile.get(key)}
+
+        def path(self, artifact):
+            return os.path.join("bundle", artifact["file"])
+
+    steps = plan_steps(bundle=Bundle(), precache_platforms=["android"])
+    assert "flutter-precache" not in steps
+    assert "flutter-precache" not in steps["flutter-doctor"].depends_on
@@ -0,0 +1,92 @@
+import threading
+
+from log_pipeline import LogPipeline, TextWidgetLog
+
+
+class FakeText:
+    # The parts of a Tk Text widget TextWidgetLog uses; after() callbacks run when tick() is called
+    def __init__(self):
+        self.text = ""
+        self.callbacks = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.callbacks[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        del self.callbacks[after_id]
+
+    def tick(self):
+        callbacks, self.callbacks = self.callbacks, {}
+        for callback in callbacks.values():
+            callback()
+
+    def insert(self, index, text):
+        self.text += text
+
+    def index(self, index):
+        return f"{self.text.count(chr(10)) + 1}.0"
+
+    def delete(self, start, end):
+        lines = self.text.split("\n")
+        self.text = "\n".join(lines[int(end.split(".")[0]) - 1:])
+
+    def see(self, index):
+        pass
+
+
+def test_drain_is_bounded_and_ordered():
+    pipeline = LogPipeline()
+    for i in range(10):
+        pipeline.push(f"{i}\n")
+    assert pipeline.drain(max_lines=4) == ["0\n", "1\n", "2\n", "3\n"]
+    assert len(pipeline.drain()) == 6
+    assert pipeline.drain() == []
+
+
+def test_lines_from_another_thread_arrive_in_one_insert_per_tick():
+    widget = FakeText()
+    pipeline = LogPipeline()
+    batches = []
+    log = TextWidgetLog(widget, pipeline, on_batch=batches.append)
+    log.start()
+    writer = threading.Thread(target=lambda: [pipeline.push(f"line {i}\n") for i in range(100)])
+    writer.start()
+    writer.join()
+    widget.tick()
+    assert len(batches) == 1 and len(batches[0]) == 100
+    assert widget.text.startswith("line 0\n") and widget.text.endswith("line 99\n")
+
+
+def test_old_lines_are_trimmed():
+    widget = FakeText()
+    pipeline = LogPipeline()
+    log = TextWidgetLog(widget, pipeline, max_lines=10)
+    for i in range(25):
+        pipeline.push(f"line {i}\n")
+    log.flush()
+    assert widget.text.count("\n") <= 10
+    assert widget.text.endswith("line 24\n")
+    assert log.stats["trimmed"] > 0
+
+
+def test_one_tick_loop_and_stop_ends_it():
+    widget = FakeText()
+    pipeline = LogPipeline()
+    ticks = []
+    log = TextWidgetLog(widget, pipeline, on_tick=lambda: ticks.append(1))
+    log.start()
+    log.start()
+    assert len(widget.callbacks) == 1
+    widget.tick()
+    assert len(widget.callbacks) == 1 and ticks == [1]
+
+    pipeline.push("done\n")
+    log.stop()
+    assert widget.callbacks == {}
+    assert widget.text == "done\n"
+    # A later run starts a fresh loop
+    log.start()
+    assert len(widget.callbacks) == 1
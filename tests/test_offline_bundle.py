@@ -0,0 +1,188 @@
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+
+import artifact_cache
+import install_steps
+from install_orchestrator import OK, InstallOrchestrator, InstallStep
+from offline_bundle import BundleError, OfflineBundle, export_bundle, resolve_artifacts
+
+BASE = "https://artifacts.test"
+NUSPEC = ('<?xml version="1.0"?><package xmlns="http://schemas.microsoft.com/packaging/2015/06/nuspec.xsd">'
+          '<metadata><id>{id}</id><version>{version}</version><dependencies>{dependencies}</dependencies></metadata></package>')
+# Package id -> (version, dependencies)
+PACKAGES = {
+    "chocolatey": ("2.3.0", []),
+    "git": ("2.45.1", [("git.install", "[2.45.1]")]),
+    "git.install": ("2.45.1", []),
+    "openjdk": ("17.0.12", []),
+    "androidstudio": ("2024.1.1.12", []),
+}
+
+
+def make_zip(files, modes=None):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            info = zipfile.ZipInfo(name)
+            info.external_attr = (modes or {}).get(name, 0o644) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, data)
+    return buffer.getvalue()
+
+
+def digest(data, algorithm):
+    return hashlib.new(algorithm, data).hexdigest()
+
+
+class Artifacts:
+    # Synthetic archives and nupkgs, served by URL
+    def __init__(self):
+        self.files = {
+            install_steps.CHOCOLATEY_INSTALL_SCRIPT: b"Write-Output 'install chocolatey'\n",
+            f"{BASE}/flutter_windows_3.24.5-stable.zip": make_zip({
+                "flutter/bin/flutter.bat": "@echo flutter", "flutter/bin/cache/dart-sdk/bin/dart.exe": os.urandom(4096)}),
+            f"{BASE}/commandlinetools-win_latest.zip": make_zip({
+                "cmdline-tools/bin/sdkmanager.bat": "#!/bin/sh\ncat >/dev/null\necho licenses accepted\n"},
+                {"cmdline-tools/bin/sdkmanager.bat": 0o755}),
+            f"{BASE}/android-ndk-r27c-windows.zip": make_zip({
+                "android-ndk-r27c/source.properties": "Pkg.Revision = 27.2.12479018",
+                "android-ndk-r27c/toolchains/llvm/clang.exe": os.urandom(4096)}),
+        }
+        for package_id, (version, dependencies) in PACKAGES.items():
+            entries = "".join(f'<dependency id="{d}" version="{v}"/>' for d, v in dependencies)
+            nuspec = NUSPEC.format(id=package_id, version=version, dependencies=entries)
+            self.files[self.package_url(package_id, version)] = make_zip({
+                f"{package_id}.nuspec": nuspec, "tools/chocolateyInstall.ps1": "Write-Output 'install'"})
+        self.downloads = []
+
+    @staticmethod
+    def package_url(package_id, version):
+        return f"{BASE}/api/v2/package/{package_id}/{version}"
+
+    def download(self, url, path, checksum=None, algorithm="sha256"):
+        self.downloads.append(url)
+        data = self.files[url]
+        if checksum:
+            assert digest(data, algorithm) == checksum
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+class Feed:
+    def package(self, package_id, version=None):
+        latest, dependencies = PACKAGES[package_id]
+        assert version in (None, latest)
+        return {"id": package_id, "version": latest, "url": Artifacts.package_url(package_id, latest),
+                "dependencies": dependencies}
+
+
+class Releases:
+    def __init__(self, artifacts):
+        self.archive = f"{BASE}/flutter_windows_3.24.5-stable.zip"
+        self.sha256 = digest(artifacts.files[self.archive], "sha256")
+
+    def versions(self):
+        return ["3.24.5"]
+
+    def archive_url(self, version):
+        return self.archive if version == "3.24.5" else None
+
+    def release(self, version):
+        return {"sha256": self.sha256}
+
+
+class Repository:
+    def __init__(self, artifacts):
+        self.archives = {}
+        for path, name in (("ndk;27.2.12479018", "android-ndk-r27c-windows.zip"),
+                           ("cmdline-tools;latest", "commandlinetools-win_latest.zip")):
+            url = f"{BASE}/{name}"
+            self.archives[path] = {"url": url, "checksum": digest(artifacts.files[url], "sha1"), "algorithm": "sha1"}
+
+    def ensure_loaded(self):
+        return True
+
+    def latest_ndk(self):
+        return "27.2.12479018"
+
+    def archive(self, path):
+        return self.archives.get(path)
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError("an offline install must not download")
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache, "_cache", None)
+    artifacts = Artifacts()
+    versions = {"flutter": "stable", "git": "2.45.1", "openjdk": "17.0.12", "android_studio": "latest",
+                "ndk": "latest", "components": []}
+    profile, resolved = resolve_artifacts(versions, Releases(artifacts), Repository(artifacts), Feed())
+    root = str(tmp_path / "bundle")
+    export_bundle(root, profile, resolved, download=artifacts.download, log=lambda line: None)
+    return root, artifacts
+
+
+def test_export_resolves_every_artifact(exported):
+    root, artifacts = exported
+    bundle = OfflineBundle(root)
+    assert bundle.profile["flutter"] == "3.24.5"
+    assert bundle.profile["ndk"] == "27.2.12479018"
+    assert bundle.profile["android_studio"] == "2024.1.1.12"
+    packages = sorted(a["package"] for a in bundle.artifacts if a["kind"] == "nupkg")
+    assert packages == sorted(PACKAGES)
+    assert sorted(artifacts.downloads) == sorted(artifacts.files)
+    assert bundle.chocolatey_package().endswith("chocolatey.2.3.0.nupkg")
+
+
+def test_re_export_downloads_nothing(exported):
+    root, artifacts = exported
+    bundle = OfflineBundle(root)
+    before = len(artifacts.downloads)
+    profile, resolved = resolve_artifacts(bundle.profile, Releases(artifacts), Repository(artifacts), Feed())
+    export_bundle(root, profile, resolved, download=artifacts.download, log=lambda line: None)
+    assert len(artifacts.downloads) == before
+
+
+def test_verify_reports_a_flipped_byte(exported):
+    root, _ = exported
+    bundle = OfflineBundle(root)
+    bundle.verify(log=lambda line: None)
+    ndk = bundle.path(bundle.find("ndk"))
+    with open(ndk, "r+b") as f:
+        f.seek(100)
+        byte = f.read(1)
+        f.seek(100)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    with pytest.raises(BundleError, match="corrupt"):
+        bundle.verify(log=lambda line: None)
+
+
+def test_mounted_bundle_installs_without_network(exported, tmp_path, monkeypatch):
+    root, _ = exported
+    monkeypatch.setattr(install_steps, "ChunkedDownloader", no_network)
+    bundle = OfflineBundle(root)
+    bundle.mount()
+    sdk = str(tmp_path / "sdk")
+    plan = {step.step_id: step for step in install_steps.build_install_plan(bundle=bundle, sdk_root=sdk)}
+    assert plan["sdk-packages"].inputs == {"sdk_root": sdk, "ndk": "27.2.12479018"}
+
+    url, sha256, _ = bundle.archive("flutter")
+    flutter_root = str(tmp_path / "flutter")
+    steps = [
+        InstallStep("flutter", "Flutter SDK", install_steps.flutter_action("3.24.5", flutter_root, (url, sha256),
+                                                                           use_archive=True)),
+        plan["cmdline-tools"],
+        InstallStep("sdk-packages", "NDK", plan["sdk-packages"].action, ["cmdline-tools"]),
+    ]
+    results = InstallOrchestrator(steps).run()
+    assert results == {"flutter": OK, "cmdline-tools": OK, "sdk-packages": OK}
+    assert os.path.isfile(os.path.join(flutter_root, "bin", "cache", "dart-sdk", "bin", "dart.exe"))
+    assert os.path.isfile(os.path.join(sdk, "ndk", "27.2.12479018", "source.properties"))
+    assert artifact_cache.artifact_cache().misses == 0
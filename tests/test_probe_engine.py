@@ -0,0 +1,59 @@
+import threading
+import time
+
+from probe_engine import TIMED_OUT, ProbeEngine
+
+
+def hanging(release):
+    def probe():
+        release.wait(10)
+        return "Installed"
+    return probe
+
+
+def test_results_and_details():
+    engine = ProbeEngine(max_workers=2)
+    engine.register("git", lambda: ("Installed", "2.45.1"))
+    engine.register("choco", lambda: "Not Installed")
+    engine.register("broken", lambda: 1 / 0)
+    reported = []
+    results = engine.run(lambda name, status, detail: reported.append(name))
+    assert results == {"git": "Installed", "choco": "Not Installed", "broken": "Error"}
+    assert engine.details["git"] == "2.45.1"
+    assert sorted(reported) == ["broken", "choco", "git"]
+
+
+def test_hanging_probe_times_out_and_the_queued_probes_still_report():
+    release = threading.Event()
+    engine = ProbeEngine(max_workers=1)
+    engine.register("hung", hanging(release), timeout=0.3)
+    engine.register("git", lambda: ("Installed", "2.45.1"), timeout=0.3)
+    engine.register("flutter", lambda: "Not Installed", timeout=0.3)
+    started = time.monotonic()
+    try:
+        results = engine.run(names=["hung", "git", "flutter"])
+    finally:
+        release.set()
+    assert results == {"hung": TIMED_OUT, "git": "Installed", "flutter": "Not Installed"}
+    assert time.monotonic() - started < 3
+
+
+def test_every_slot_held_by_a_hung_probe():
+    release = threading.Event()
+    engine = ProbeEngine(max_workers=2)
+    for name in ("hung1", "hung2", "hung3"):
+        engine.register(name, hanging(release), timeout=0.2)
+    engine.register("git", lambda: "Installed", timeout=0.2)
+    try:
+        results = engine.run()
+    finally:
+        release.set()
+    assert results["git"] == "Installed"
+    assert [results[name] for name in ("hung1", "hung2", "hung3")] == [TIMED_OUT] * 3
+
+
+def test_only_named_probes_run():
+    engine = ProbeEngine()
+    engine.register("git", lambda: "Installed")
+    engine.register("flutter", lambda: 1 / 0)
+    assert engine.run(names=["git"]) == {"git": "Installed"}
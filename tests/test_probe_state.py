@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+import system_probes
+from probe_state import ProbeStateStore, fingerprint
+from system_probes import run_system_check
+
+
+@pytest.fixture
+def version_file(tmp_path):
+    path = tmp_path / "git" / "VERSION"
+    path.parent.mkdir()
+    path.write_text("2.45.1")
+    return path
+
+
+def test_fingerprint_follows_the_files_it_reads(version_file):
+    before = fingerprint(files=[str(version_file)])
+    assert fingerprint(files=[str(version_file)]) == before
+    version_file.write_text("2.46.0")
+    assert fingerprint(files=[str(version_file)]) != before
+    assert fingerprint(files=[str(version_file) + ".missing"]) != before
+
+
+def test_stored_result_is_current_until_the_fingerprint_moves(tmp_path, version_file):
+    store = ProbeStateStore(path=str(tmp_path / "probe_state.json"))
+    digest = fingerprint(files=[str(version_file)])
+    store.update({"Git": {"fingerprint": digest, "status": "Installed", "version": "2.45.1"}})
+    known = store.load()["Git"]
+    assert known["version"] == "2.45.1"
+    assert store.is_current(known, digest)
+    version_file.write_text("2.46.0")
+    assert not store.is_current(known, fingerprint(files=[str(version_file)]))
+
+
+def test_expired_result_is_not_current(tmp_path):
+    path = tmp_path / "probe_state.json"
+    store = ProbeStateStore(path=str(path), max_age=60)
+    store.update({"Git": {"fingerprint": "abc", "status": "Installed", "version": "2.45.1"}})
+    assert store.is_current(store.load()["Git"], "abc")
+    state = json.loads(path.read_text())
+    state["components"]["Git"]["checked_at"] -= 61
+    path.write_text(json.dumps(state))
+    assert not store.is_current(store.load()["Git"], "abc")
+
+
+@pytest.mark.parametrize("content, loaded", [
+    ("{not json", {}),
+    ('{"format": 1, "components": ["Git"]}', {}),
+    ('{"format": 1, "components": {"Git": "Installed"}}', {}),
+    ('{"format": 99, "components": {}}', {}),
+    ('{"format": 1, "components": {"Git": {"status": "Installed"}}}', {"Git": {"status": "Installed"}}),
+])
+def test_corrupt_state_file_is_never_reused(tmp_path, content, loaded):
+    path = tmp_path / "probe_state.json"
+    path.write_text(content)
+    store = ProbeStateStore(path=str(path))
+    assert store.load() == loaded
+    assert not any(store.is_current(known, "abc") for known in loaded.values())
+    # The next update rewrites the file in the current format
+    store.update({"Git": {"fingerprint": "abc", "status": "Installed", "version": "2.45.1"}})
+    assert store.is_current(store.load()["Git"], "abc")
+
+
+class FakeComponent:
+    # A component whose probe counts its calls and whose fingerprint is a version file
+    def __init__(self, version_file):
+        self.version_file = version_file
+        self.calls = 0
+        self.probe_timeout = 5
+
+    def probe(self):
+        self.calls += 1
+        with open(self.version_file) as f:
+            return "Installed", f.read().strip()
+
+    def fingerprint(self):
+        return fingerprint(files=[self.version_file])
+
+
+@pytest.fixture
+def git(version_file, monkeypatch):
+    component = FakeComponent(str(version_file))
+    monkeypatch.setattr(system_probes, "component_named", lambda name: component)
+    return component
+
+
+def check(store, touched=()):
+    reported = {}
+    results = run_system_check(["Git"], lambda name, status, detail: reported.update({name: (status, detail)}),
+                               store=store, incremental=True, touched=frozenset(touched))
+    assert reported == results
+    return results
+
+
+def test_unchanged_fingerprint_reuses_the_stored_result(tmp_path, git):
+    store = ProbeStateStore(path=str(tmp_path / "probe_state.json"))
+    assert check(store) == {"Git": ("Installed", "2.45.1")}
+    assert check(store) == {"Git": ("Installed", "2.45.1")}
+    assert git.calls == 1
+    # A touched component is probed even when nothing it looks at changed
+    check(store, touched=["Git"])
+    assert git.calls == 2
+
+
+def test_changed_fingerprint_probes_again(tmp_path, git):
+    store = ProbeStateStore(path=str(tmp_path / "probe_state.json"))
+    check(store)
+    with open(git.version_file, "w") as f:
+        f.write("2.46.0")
+    assert check(store) == {"Git": ("Installed", "2.46.0")}
+    assert git.calls == 2
+    assert store.load()["Git"]["version"] == "2.46.0"
@@ -0,0 +1,91 @@
+import pytest
+
+from progress_protocol import ProgressTracker, format_bytes, format_duration, format_line, parse_line
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_line():
+    assert parse_line('##installer-progress {"event": "start", "step": "git"}\n') == {"event": "start", "step": "git"}
+    assert parse_line("Installing git...") is None
+    assert parse_line("##installer-progress {not json") is None
+    assert parse_line('##installer-progress ["event"]') is None
+    assert parse_line('##installer-progress {"step": "git"}') is None
+
+
+def test_format_line_round_trips():
+    assert parse_line(format_line("end", step="git", status="ok")) == {"event": "end", "step": "git", "status": "ok"}
+
+
+def test_formatting():
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KB"
+    assert format_duration(59) == "59s"
+    assert format_duration(125) == "2m 5s"
+    assert format_duration(3720) == "1h 2m"
+
+
+def test_weighted_fraction():
+    tracker = ProgressTracker(clock=Clock())
+    assert not tracker.has_plan()
+    tracker.feed(format_line("plan", steps=[{"id": "git", "title": "Git", "weight": 1},
+                                            {"id": "flutter", "title": "Flutter SDK", "weight": 3}]))
+    tracker.feed(format_line("start", step="flutter"))
+    tracker.feed(format_line("bytes", step="flutter", done=50, total=100))
+    assert tracker.fraction() == pytest.approx(1.5 / 4)
+    tracker.feed(format_line("end", step="git", status="ok"))
+    assert tracker.fraction() == pytest.approx(2.5 / 4)
+
+
+def test_items_never_complete_a_step():
+    tracker = ProgressTracker(clock=Clock())
+    tracker.apply({"event": "start", "step": "flutter-precache"})
+    tracker.apply({"event": "items", "step": "flutter-precache", "done": 30, "total": 20, "detail": "sky_engine"})
+    assert tracker.fraction() == pytest.approx(0.95)
+    assert "sky_engine" in tracker.describe()
+
+
+def test_parallel_steps_are_tracked_separately():
+    clock = Clock()
+    tracker = ProgressTracker(clock=clock)
+    tracker.apply({"event": "plan", "steps": [{"id": "flutter", "title": "Flutter SDK", "weight": 1},
+                                              {"id": "cmdline-tools", "title": "Command-line Tools", "weight": 1},
+                                              {"id": "git", "title": "Git", "weight": 1}]})
+    tracker.apply({"event": "start", "step": "flutter"})
+    tracker.apply({"event": "start", "step": "cmdline-tools"})
+    tracker.apply({"event": "bytes", "step": "flutter", "done": 0, "total": 1000})
+    tracker.apply({"event": "bytes", "step": "cmdline-tools", "done": 0, "total": 100})
+    clock.now = 1.0
+    tracker.apply({"event": "bytes", "step": "flutter", "done": 100, "total": 1000})
+    tracker.apply({"event": "bytes", "step": "cmdline-tools", "done": 10, "total": 100})
+
+    snapshot = tracker.snapshot()
+    assert [step["id"] for step in snapshot["steps"]] == ["flutter", "cmdline-tools"]
+    assert tracker.steps["flutter"]["throughput"] == pytest.approx(100)
+    assert tracker.steps["cmdline-tools"]["throughput"] == pytest.approx(10)
+    assert snapshot["throughput"] == pytest.approx(110)
+    # Each download at its own rate: 9s left for both, not 900 bytes at the mixed rate
+    assert snapshot["step_eta"] == pytest.approx(9)
+
+    # One step ending leaves the other running
+    tracker.apply({"event": "end", "step": "cmdline-tools", "status": "ok"})
+    snapshot = tracker.snapshot()
+    assert [step["id"] for step in snapshot["steps"]] == ["flutter"]
+    assert snapshot["throughput"] == pytest.approx(100)
+    assert "Flutter SDK" in tracker.describe()
+    assert "Command-line Tools" not in tracker.describe()
+
+
+def test_eta_from_remaining_weight():
+    clock = Clock()
+    tracker = ProgressTracker(clock=clock)
+    tracker.apply({"event": "plan", "steps": [{"id": "a", "weight": 1}, {"id": "b", "weight": 3}]})
+    clock.now = 10.0
+    tracker.apply({"event": "end", "step": "a", "status": "ok"})
+    assert tracker.snapshot()["eta"] == pytest.approx(30)
@@ -0,0 +1,40 @@
+import re
+
+from startup_report import StartupReport
+
+
+def test_each_import_is_timed_on_its_own():
+    report = StartupReport()
+    with report.importing("json"):
+        import json  # noqa: F401
+    with report.importing("xml.dom.minidom"):
+        import xml.dom.minidom  # noqa: F401
+    report.mark("window")
+    assert [name for name, _ in report.imports] == ["json", "xml.dom.minidom"]
+    assert all(seconds >= 0 for _, seconds in report.imports)
+    assert re.search(r"imports \(json \d+ ms, xml\.dom\.minidom \d+ ms\), window \d+ ms$", report.summary())
+
+
+def test_write_appends_one_line_to_the_log_without_printing(tmp_path, capsys):
+    log = tmp_path / "flutter_installer.log"
+    log.write_text("previous install\n")
+    report = StartupReport()
+    with report.importing("json"):
+        pass
+    report.mark("first_paint")
+    report.write(str(log))
+    # Only once per launch
+    report.write(str(log))
+
+    lines = log.read_text().splitlines()
+    assert lines[0] == "previous install"
+    assert len(lines) == 2
+    assert re.match(r"\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\] Startup \(source\): imports \(json \d+ ms\), first_paint \d+ ms$",
+                    lines[1])
+    assert capsys.readouterr().out == ""
+
+
+def test_write_reports_an_unwritable_log(tmp_path, capsys):
+    report = StartupReport()
+    report.write(str(tmp_path / "missing" / "flutter_installer.log"))
+    assert capsys.readouterr().out.startswith("Error writing startup report:")
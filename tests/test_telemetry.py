@@ -0,0 +1,131 @@
+import json
+
+import pytest
+
+import cli
+import telemetry
+
+
+def step(run, name, start, end, depends_on=(), status="ok"):
+    return {"type": "span", "run": run, "kind": "step", "name": name, "start": start, "end": end,
+            "duration": end - start, "status": status, "depends_on": list(depends_on)}
+
+
+def install(run, machine, duration, flutter_start=20.0, status="ok"):
+    # chocolatey -> git -> flutter -> doctor, with sdk-packages off the critical path
+    return [
+        {"type": "run", "run": run, "command": "install", "machine": machine, "start": 0.0},
+        step(run, "chocolatey", 0.0, 10.0),
+        step(run, "git", 10.0, 20.0, ["chocolatey"]),
+        step(run, "sdk-packages", 10.0, 15.0, ["chocolatey"]),
+        step(run, "flutter", flutter_start, flutter_start + 40.0, ["git"]),
+        step(run, "flutter-doctor", flutter_start + 40.0, flutter_start + 50.0, ["flutter", "sdk-packages"]),
+        {"type": "span", "run": run, "kind": "download", "name": "flutter.zip", "start": 20.0, "end": 24.0,
+         "duration": 4.0, "status": "ok", "bytes": 8 * 1048576},
+        {"type": "end", "run": run, "end": duration, "duration": duration, "status": status,
+         "profile": {"flutter": "3.24.5"}},
+    ]
+
+
+def write(path, entries, tail=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.write(tail)
+    return str(path)
+
+
+def test_percentile():
+    values = list(range(10, 0, -1))
+    assert telemetry.percentile(values, 0.5) == 6
+    assert telemetry.percentile(values, 0.9) == 10
+    assert telemetry.percentile(values, 1.0) == 10
+    assert telemetry.percentile([], 0.5) is None
+
+
+def test_critical_path_includes_the_wait_for_a_worker():
+    spans = install("a", "BUILD-1", 80.0, flutter_start=25.0)[1:-1]
+    assert telemetry.critical_path(spans) == [
+        {"step": "chocolatey", "duration": 10.0, "waited": 0.0},
+        {"step": "git", "duration": 10.0, "waited": 0.0},
+        {"step": "flutter", "duration": 40.0, "waited": 5.0},
+        {"step": "flutter-doctor", "duration": 10.0, "waited": 0.0},
+    ]
+    assert telemetry.critical_path([]) == []
+
+
+def test_summarize_phases_critical_path_and_groups(tmp_path):
+    path = write(tmp_path / "a.spans.jsonl",
+                 install("a", "BUILD-1", 70.0) + install("b", "BUILD-1", 90.0, flutter_start=30.0, status="failed")
+                 + install("c", "BUILD-2", 60.0, flutter_start=25.0)
+                 + [{"type": "run", "run": "d", "command": "check", "machine": "BUILD-2"},
+                    {"type": "span", "run": "d", "kind": "probe", "name": "Git", "start": 0.0, "end": 1.0,
+                     "duration": 1.0, "status": "Timed Out"},
+                    {"type": "end", "run": "d", "end": 1.0, "duration": 1.0, "status": "failed"}])
+    summary = telemetry.summarize(telemetry.load_runs([path]))
+    assert summary["runs"] == 4 and summary["installs"] == 3
+
+    phases = {(phase["kind"], phase["name"]): phase for phase in summary["slowest_phases"]}
+    assert summary["slowest_phases"][0]["name"] == "flutter"
+    assert phases[("download", "flutter.zip")]["mb_per_s"] == 2.0
+    assert phases[("probe", "Git")]["failed"] == 1
+    doctor = phases[("step", "flutter-doctor")]
+    assert (doctor["count"], doctor["median"], doctor["max"], doctor["total"]) == (3, 10.0, 10.0, 30.0)
+
+    critical = summary["critical_path"]
+    assert [entry["step"] for entry in critical["steps"]] == ["chocolatey", "git", "flutter", "flutter-doctor"]
+    assert (critical["runs"], critical["variants"]) == (3, 1)
+    # flutter waited 0, 10 and 5 seconds for a worker after git finished
+    assert [entry["median_waited"] for entry in critical["steps"]] == [0.0, 0.0, 5.0, 0.0]
+
+    assert summary["groups"] == {
+        "BUILD-1": {"installs": 2, "succeeded": 1, "median_duration": 90.0, "max_duration": 90.0,
+                    "slowest_step": "flutter"},
+        "BUILD-2": {"installs": 1, "succeeded": 1, "median_duration": 60.0, "max_duration": 60.0,
+                    "slowest_step": "flutter"},
+    }
+    by_version = telemetry.summarize(telemetry.load_runs([path]), group_by="flutter")
+    assert list(by_version["groups"]) == ["3.24.5"]
+    assert list(telemetry.summarize(telemetry.load_runs([path]), group_by="arch")["groups"]) == ["unknown"]
+
+
+def test_truncated_and_malformed_lines_are_skipped(tmp_path):
+    entries = install("a", "BUILD-1", 70.0)
+    entries[1:1] = [
+        {"type": "span", "run": "a", "kind": "step", "name": "git"},
+        {"type": "span", "run": "a", "kind": "command", "name": "git.exe", "start": 0.0, "end": 1.0,
+         "duration": "1.0"},
+        {"type": "span", "run": ["a"], "kind": "step", "name": "git", "start": 0.0, "end": 1.0, "duration": 1.0},
+        ["not", "an", "entry"],
+    ]
+    path = write(tmp_path / "a.spans.jsonl", entries, tail='{"type": "span", "run": "a", "kind": "st')
+    summary = telemetry.summarize(telemetry.load_runs([path]))
+    assert summary["installs"] == 1
+    assert ("command", "git.exe") not in {(phase["kind"], phase["name"]) for phase in summary["slowest_phases"]}
+    assert [entry["step"] for entry in summary["critical_path"]["steps"]][-1] == "flutter-doctor"
+
+
+def test_report_reads_folders_of_span_files(capsys, tmp_path):
+    for machine in ("BUILD-1", "BUILD-2"):
+        (tmp_path / machine).mkdir()
+        write(tmp_path / machine / "flutter_installer.spans.jsonl", install(machine.lower(), machine, 70.0))
+    code = cli.main(["report", str(tmp_path), "--top", "2"])
+    out, err = capsys.readouterr()
+    assert code == cli.EXIT_OK
+    result = json.loads(out)
+    assert result["command"] == "report" and result["installs"] == 2
+    assert len(result["slowest_phases"]) == 2
+    assert sorted(result["groups"]) == ["BUILD-1", "BUILD-2"]
+    assert "Critical path (2 of 2 installs; 1 variants):" in err
+    assert "Installs by machine:" in err
+
+
+@pytest.mark.parametrize("content", [None, ""])
+def test_report_without_runs_fails(capsys, tmp_path, content):
+    path = tmp_path / "flutter_installer.spans.jsonl"
+    if content is not None:
+        path.write_text(content)
+    code = cli.main(["report", str(path), "--quiet"])
+    result = json.loads(capsys.readouterr().out)
+    assert code == cli.EXIT_FAILED
+    assert result["runs"] == 0 and result["critical_path"] == {}
@@ -0,0 +1,87 @@
+import os
+
+import tool_detection
+from tool_detection import (ExecutableResolver, chocolatey_package_version, detect_chocolatey, detect_java, detect_ndk,
+                            detect_sdk_package, read_properties, resolver)
+
+
+def touch(path, text=""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def test_resolver_follows_path_order(tmp_path):
+    first = touch(tmp_path / "first" / "git.exe")
+    touch(tmp_path / "second" / "git.exe")
+    path = os.pathsep.join([str(tmp_path / "missing"), str(tmp_path / "first"), str(tmp_path / "second")])
+    assert ExecutableResolver(path, ".EXE").which("git") == first
+
+
+def test_resolver_tries_pathext_in_order(tmp_path):
+    bat = touch(tmp_path / "bin" / "flutter.bat")
+    touch(tmp_path / "bin" / "flutter")
+    assert ExecutableResolver(str(tmp_path / "bin"), ".EXE;.BAT").which("flutter") == bat
+    # Without PATHEXT only the bare name matches; an explicit extension is looked up as given
+    assert ExecutableResolver(str(tmp_path / "bin"), "").which("flutter") == str(tmp_path / "bin" / "flutter")
+    assert ExecutableResolver(str(tmp_path / "bin"), ".EXE").which("flutter.bat") == bat
+
+
+def test_resolver_skips_directories(tmp_path):
+    (tmp_path / "a" / "java.exe").mkdir(parents=True)
+    found = touch(tmp_path / "b" / "java.exe")
+    path = os.pathsep.join([str(tmp_path / "a"), str(tmp_path / "b")])
+    assert ExecutableResolver(path, ".EXE").which("java") == found
+
+
+def test_shared_resolver_is_rebuilt_when_path_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool_detection, "_resolver", None)
+    monkeypatch.setenv("PATH", str(tmp_path / "old"))
+    monkeypatch.setenv("PATHEXT", ".EXE")
+    shared = resolver()
+    assert resolver() is shared
+    assert tool_detection.which("choco") is None
+
+    choco = touch(tmp_path / "new" / "choco.exe")
+    monkeypatch.setenv("PATH", str(tmp_path / "new"))
+    assert resolver() is not shared
+    assert tool_detection.which("choco") == choco
+
+
+def test_jdk_release_file(tmp_path):
+    home = tmp_path / "jdk-17"
+    java = touch(home / "bin" / "java.exe")
+    touch(home / "release", 'IMPLEMENTOR="Microsoft"\nJAVA_VERSION="17.0.12"\n')
+    assert detect_java(str(home)) == (java, "17.0.12", "release")
+    assert read_properties(str(tmp_path / "missing")) is None
+
+
+def test_chocolatey_nuspec_version(tmp_path, monkeypatch):
+    root = tmp_path / "chocolatey"
+    touch(root / "lib" / "git.install" / "git.install.nuspec",
+          '<?xml version="1.0"?><package><metadata><id>git.install</id>\n<version> 2.45.1 </version></metadata></package>')
+    assert chocolatey_package_version("git.install", str(root)) == "2.45.1"
+    assert chocolatey_package_version("openjdk", str(root)) is None
+
+    choco = touch(root / "bin" / "choco.exe")
+    touch(root / "lib" / "chocolatey" / "chocolatey.nuspec", "<version>2.3.0</version>")
+    # Not on PATH: found in the Chocolatey folder
+    monkeypatch.setenv("PATH", "")
+    assert detect_chocolatey(str(root)) == (choco, "2.3.0", "nuspec")
+
+
+def test_source_properties(tmp_path):
+    package = tmp_path / "sdk" / "cmdline-tools" / "latest"
+    touch(package / "source.properties", "Pkg.Desc=Android SDK Command-line Tools\nPkg.Revision=16.0\n")
+    assert detect_sdk_package(str(package)) == (str(package), "16.0", "source.properties")
+    assert detect_sdk_package(str(tmp_path / "sdk" / "platform-tools")) is None
+
+
+def test_detect_ndk_picks_the_newest_revision(tmp_path):
+    sdk = tmp_path / "sdk"
+    assert detect_ndk(str(sdk)) is None
+    touch(sdk / "ndk" / "25.1.8937393" / "source.properties", "Pkg.Revision = 25.1.8937393\n")
+    touch(sdk / "ndk" / "27.2.12479018" / "source.properties", "Pkg.Revision = 27.2.12479018\n")
+    touch(sdk / "ndk" / "26.3.11579264" / "source.properties", "Pkg.Revision = 26.3.11579264\n")
+    (sdk / "ndk" / "broken").mkdir()
+    assert detect_ndk(str(sdk)) == (str(sdk / "ndk"), "27.2.12479018", "source.properties")
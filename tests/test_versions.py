@@ -0,0 +1,85 @@
+import pytest
+
+from versions import Version, VersionIndex, parse_or_none, satisfies, sort_versions
+
+
+def v(text):
+    return Version.parse(text)
+
+
+@pytest.mark.parametrize("lower, higher", [
+    ("1.2.9", "1.2.10"),
+    ("17.0.8", "17.0.12"),
+    ("1.0.0-beta.2", "1.0.0-beta.11"),
+    ("1.0.0-alpha", "1.0.0-alpha.1"),
+    ("1.0.0-alpha.1", "1.0.0-alpha.beta"),
+    ("1.0.0-rc.1", "1.0.0"),
+    ("3.24.5", "29.0.14206865"),
+])
+def test_precedence(lower, higher):
+    assert v(lower) < v(higher)
+    assert v(higher) > v(lower)
+
+
+def test_trailing_zeros_and_prefix():
+    assert v("17") == v("17.0.0")
+    assert hash(v("17")) == hash(v("17.0"))
+    assert v("v2.45.1") == v("2.45.1")
+    assert v("2.45.1").major == 2 and v("2.45.1").minor == 45
+
+
+def test_build_metadata_only_breaks_ties():
+    assert v("1.0.0+1") < v("1.0.0+2") < v("1.0.1")
+    assert v("1.0.0+1") != v("1.0.0")
+
+
+def test_invalid_versions():
+    with pytest.raises(ValueError):
+        Version.parse("latest")
+    assert parse_or_none("stable") is None
+    assert parse_or_none("1..2") is None
+
+
+def test_series():
+    assert v("17.0.12").in_series((17,))
+    assert v("17").in_series((17, 0))
+    assert not v("18.0.1").in_series((17,))
+    bound = Version.series_upper_bound((17,))
+    assert v("17.99.99") < bound < v("18.0.0-alpha")
+
+
+def test_sort_versions():
+    assert sort_versions(["1.2", "latest", "1.10", "1.9"]) == ["1.10", "1.9", "1.2", "latest"]
+    assert sort_versions(["1.10", "1.9"], newest_first=False) == ["1.9", "1.10"]
+    assert sort_versions(["ndk;25.1", "ndk;27.0", "ndk;26.3"], prefix="ndk;") == ["ndk;27.0", "ndk;26.3", "ndk;25.1"]
+
+
+def test_index_newest():
+    index = VersionIndex(["11.0.2", "17.0.8", "17.0.12", "18.0.0-rc.1", "21.0.1", "not-a-version"])
+    assert len(index) == 5
+    assert index.newest().text == "21.0.1"
+    assert index.newest((17,)).text == "17.0.12"
+    assert index.newest((18,)) is None
+    assert index.newest((18,), include_prerelease=True).text == "18.0.0-rc.1"
+    assert index.newest((16,)) is None
+
+
+def test_index_add_and_contains():
+    index = VersionIndex(["17.0.8"])
+    index.add("17.0.13")
+    assert index.newest((17,)).text == "17.0.13"
+    assert "17.0.8" in index
+    assert "17.0.8.0" in index
+    assert "17.0.9" not in index
+    assert "latest" not in index
+
+
+def test_satisfies():
+    assert satisfies("17.0.8", "17")
+    assert satisfies("17.0.8", "17.0.8")
+    assert satisfies("17.0.8.1", "17.0.8")
+    assert satisfies("17", "17.0.0")
+    assert not satisfies("17.0.8", "17.0.9")
+    assert not satisfies("18.0.1", "17")
+    assert not satisfies("17.0.8-beta", "17")
+    assert satisfies("latest-ish", "latest-ish")
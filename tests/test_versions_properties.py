@@ -0,0 +1,123 @@
+import itertools
+import random
+
+import pytest
+
+from versions import Version, VersionIndex, sort_versions
+
+# Property checks over generated versions. The generator is seeded, so a
+# failure names the seed that reproduces it.
+SEEDS = range(5)
+IDENTIFIERS = ["alpha", "beta", "rc", "pre", "x-1", "0", "1", "2", "10", "11"]
+
+
+def random_version(rng):
+    # Few distinct values per part, so equal and near-equal versions come up often
+    release = [rng.choice([0, 1, 2, 10]) for _ in range(rng.randint(1, 4))]
+    text = ".".join(map(str, release))
+    if rng.random() < 0.4:
+        text += "-" + ".".join(rng.choice(IDENTIFIERS) for _ in range(rng.randint(1, 3)))
+    if rng.random() < 0.2:
+        text += "+" + ".".join(rng.choice(IDENTIFIERS) for _ in range(rng.randint(1, 2)))
+    if rng.random() < 0.1:
+        text = "v" + text
+    return text
+
+
+def generated(seed, count=120):
+    rng = random.Random(seed)
+    return [random_version(rng) for _ in range(count)]
+
+
+def reference_compare(a, b):
+    # Semver 11 precedence written out step by step, with the extensions the
+    # Version class documents: trailing zeros ignored, build metadata breaks ties
+    def release(v):
+        parts = list(v.release)
+        while len(parts) > 1 and parts[-1] == 0:
+            parts.pop()
+        return parts
+
+    def identifiers(x, y):
+        for p, q in zip(x, y):
+            if p == q:
+                continue
+            if p.isdigit() and q.isdigit():
+                return -1 if int(p) < int(q) else 1
+            if p.isdigit() != q.isdigit():
+                return -1 if p.isdigit() else 1
+            return -1 if p < q else 1
+        return (len(x) > len(y)) - (len(x) < len(y))
+
+    ra, rb = release(a), release(b)
+    if ra != rb:
+        return -1 if ra < rb else 1
+    if a.prerelease != b.prerelease:
+        if not a.prerelease or not b.prerelease:
+            return 1 if not a.prerelease else -1
+        return identifiers(a.prerelease, b.prerelease)
+    return identifiers(a.build, b.build)
+
+
+def compare(a, b):
+    return (a > b) - (a < b)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_parse_and_str_round_trip(seed):
+    for text in generated(seed):
+        version = Version.parse(text)
+        assert str(version) == text
+        assert Version.parse(str(version)) == version
+        # The parts rebuild an equal version without the optional "v"
+        rebuilt = ".".join(map(str, version.release))
+        if version.prerelease:
+            rebuilt += "-" + ".".join(version.prerelease)
+        if version.build:
+            rebuilt += "+" + ".".join(version.build)
+        assert Version.parse(rebuilt) == version
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_ordering_matches_the_reference(seed):
+    versions = [Version.parse(text) for text in generated(seed, 60)]
+    for a, b in itertools.product(versions, repeat=2):
+        assert compare(a, b) == reference_compare(a, b), (seed, a, b)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_ordering_is_antisymmetric_and_consistent_with_equality(seed):
+    versions = [Version.parse(text) for text in generated(seed, 60)]
+    for a, b in itertools.product(versions, repeat=2):
+        # Exactly one of <, ==, > holds, and equal versions hash alike
+        assert [a < b, a == b, a > b].count(True) == 1
+        assert (a <= b and b <= a) == (a == b)
+        if a == b:
+            assert hash(a) == hash(b)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_ordering_is_transitive(seed):
+    versions = [Version.parse(text) for text in generated(seed, 30)]
+    for a, b, c in itertools.product(versions, repeat=3):
+        if a <= b and b <= c:
+            assert a <= c, (seed, a, b, c)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_sorting_agrees_with_pairwise_order(seed):
+    texts = generated(seed, 500)
+    ordered = [Version.parse(text) for text in sort_versions(texts, newest_first=False)]
+    assert all(a <= b for a, b in zip(ordered, ordered[1:]))
+    assert sorted(sort_versions(texts)) == sorted(texts)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_index_newest_matches_a_linear_scan(seed):
+    texts = generated(seed, 300)
+    index = VersionIndex(texts)
+    versions = [Version.parse(text) for text in texts]
+    for major in (0, 1, 2, 10, 3):
+        stable = [v for v in versions if v.in_series((major,)) and not v.prerelease]
+        newest = index.newest((major,))
+        assert newest == (max(stable) if stable else None)
@@ -0,0 +1,63 @@
+import os
+import zipfile
+
+import pytest
+
+from zip_extract import UnsafeArchiveError, common_top_level, extract_zip
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+def test_extract_with_auto_prefix(tmp_path):
+    archive = make_zip(tmp_path / "ndk.zip", {
+        "android-ndk-r27c/source.properties": "Pkg.Revision = 27.2.12479018\n",
+        "android-ndk-r27c/toolchains/llvm/clang.exe": b"\0" * 5000,
+        "android-ndk-r27c/empty/": "",
+    })
+    destination = str(tmp_path / "ndk" / "27.2.12479018")
+    progress = []
+    count, total = extract_zip(archive, destination, strip_prefix="auto", workers=2,
+                               progress=lambda done, total: progress.append(done))
+    assert (count, total) == (2, 5000 + 29)
+    assert open(os.path.join(destination, "source.properties")).read().startswith("Pkg.Revision")
+    assert os.path.isdir(os.path.join(destination, "empty"))
+    assert progress[-1] == total
+    assert not os.path.exists(destination + ".partial")
+
+
+def test_replaces_an_existing_tree(tmp_path):
+    destination = tmp_path / "cmdline-tools" / "latest"
+    destination.mkdir(parents=True)
+    (destination / "stale.txt").write_text("old")
+    archive = make_zip(tmp_path / "tools.zip", {"cmdline-tools/bin/sdkmanager.bat": "@echo off"})
+    extract_zip(archive, str(destination), strip_prefix="cmdline-tools")
+    assert sorted(os.listdir(destination)) == ["bin"]
+    assert not os.path.exists(str(destination) + ".old")
+
+
+@pytest.mark.parametrize("name", [
+    "../evil.txt",
+    "sdk/../../evil.txt",
+    "/etc/evil.txt",
+    "\\\\server\\share\\evil.txt",
+    "C:/Windows/evil.txt",
+    "sdk\\..\\..\\evil.txt",
+])
+def test_members_outside_the_destination_are_refused(tmp_path, name):
+    archive = make_zip(tmp_path / "evil.zip", {"ok.txt": "fine", name: "evil"})
+    destination = tmp_path / "out"
+    with pytest.raises(UnsafeArchiveError):
+        extract_zip(archive, str(destination))
+    assert not destination.exists()
+    assert not (tmp_path / "evil.txt").exists()
+
+
+def test_common_top_level():
+    assert common_top_level(["flutter/", "flutter/bin/flutter.bat"]) == "flutter"
+    assert common_top_level(["a/x", "b/y"]) is None
+    assert common_top_level(["README", "bin/tool"]) is None